@@ -0,0 +1,131 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_not_equal, assert_true, raises
+
+from wa.framework.output import ArtifactStore, JobOutput
+from wa.utils.misc import sha256
+
+
+def _write(path, text):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as wfh:
+        wfh.write(text)
+
+
+class TestArtifactStore(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store = ArtifactStore(os.path.join(self.tempdir, 'store'), owner='run1')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_deduplicate(self):
+        first = os.path.join(self.tempdir, 'job1', 'file.txt')
+        second = os.path.join(self.tempdir, 'job2', 'file.txt')
+        other = os.path.join(self.tempdir, 'job3', 'file.txt')
+        _write(first, 'same')
+        _write(second, 'same')
+        _write(other, 'different')
+
+        digest = self.store.add(first)
+        assert_equal(self.store.add(second), digest)
+        assert_not_equal(self.store.add(other), digest)
+
+        stored = os.stat(self.store.get_object_path(digest))
+        assert_equal(os.stat(first).st_ino, stored.st_ino)
+        assert_equal(os.stat(second).st_ino, stored.st_ino)
+        with open(second) as fh:
+            assert_equal(fh.read(), 'same')
+
+        assert_equal(self.store.get_references(digest),
+                     [('run1', first), ('run1', second)])
+        # Nothing is left behind by linking into place.
+        assert_equal(os.listdir(os.path.dirname(second)), ['file.txt'])
+        assert_equal(stat.S_IMODE(stored.st_mode), 0o444)
+
+    def test_output_stored_when_complete(self):
+        path = os.path.join(self.tempdir, 'job1')
+        output = JobOutput(path, 'id', 'label', 1, 0)
+        output.artifact_store = self.store
+        artifact_path = os.path.join(path, 'poller.csv')
+        _write(artifact_path, 'raw')
+        output.add_artifact('poller', artifact_path, kind='data')
+        assert_equal(output.get_artifact('poller').digest, None)
+
+        # e.g. the poller adjusting its timestamps after adding the artifact.
+        _write(artifact_path, 'adjusted')
+        output.store_artifacts()
+
+        digest = output.get_artifact('poller').digest
+        assert_equal(digest, sha256(artifact_path))
+        with open(self.store.get_object_path(digest)) as fh:
+            assert_equal(fh.read(), 'adjusted')
+
+    def test_unshare(self):
+        outputs = []
+        for name in ['job1', 'job2']:
+            path = os.path.join(self.tempdir, name)
+            output = JobOutput(path, name, name, 1, 0)
+            output.artifact_store = self.store
+            _write(os.path.join(path, 'results.csv'), 'results')
+            _write(os.path.join(path, 'trace', 'data'), 'trace')
+            output.add_artifact('trace', 'trace', kind='data')
+            output.add_artifact('csv', 'results.csv', kind='data')
+            output.store_artifacts()
+            outputs.append(output)
+        digest = outputs[0].get_artifact('csv').digest
+        assert_equal(outputs[1].get_artifact('csv').digest, digest)
+
+        # e.g. "wa process" re-running the csv processor.
+        outputs[0].unshare_artifacts()
+        assert_equal(outputs[0].get_artifact('csv').digest, None)
+        assert_equal(outputs[0].get_artifact('trace').digest, None)
+        _write(outputs[0].get_path('results.csv'), 'rewritten')
+        _write(outputs[0].get_path('trace/data'), 'rewritten')
+        for path in [outputs[1].get_path('results.csv'),
+                     outputs[1].get_path('trace/data'),
+                     self.store.get_object_path(digest)]:
+            with open(path) as fh:
+                assert_true(fh.read() in ['results', 'trace'])
+        # Nothing is left behind by unsharing.
+        assert_equal(sorted(os.listdir(outputs[0].basepath)), ['results.csv', 'trace'])
+
+        outputs[0].store_artifacts()
+        assert_equal(outputs[0].get_artifact('csv').digest,
+                     sha256(outputs[0].get_path('results.csv')))
+
+    def test_directory(self):
+        for name in ['a', 'b']:
+            _write(os.path.join(self.tempdir, name, 'x', 'data'), 'data')
+            _write(os.path.join(self.tempdir, name, 'y'), 'y')
+        digest_a = self.store.add(os.path.join(self.tempdir, 'a'))
+        digest_b = self.store.add(os.path.join(self.tempdir, 'b'))
+        assert_equal(digest_a, digest_b)
+        assert_true(os.path.isfile(os.path.join(self.tempdir, 'b', 'x', 'data')))
+
+    @raises(ValueError)
+    def test_bad_link_method(self):
+        ArtifactStore(self.tempdir, link='symlink')
@@ -0,0 +1,60 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from nose.tools import assert_equal
+
+from wa.framework.target.assistant import LogcatStreamer
+
+
+class TestLogcatStreamer(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.streamer = LogcatStreamer(None)
+        self.streamer.buffer_file = os.path.join(self.directory, 'buffer')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def append(self, text):
+        with open(self.streamer.buffer_file, 'a') as fh:
+            fh.write(text)
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name)) as fh:
+            return fh.read()
+
+    def test_slices(self):
+        outfile = os.path.join(self.directory, 'empty.log')
+        assert_equal(self.streamer.write_log(outfile, self.streamer.mark()), 0)
+        assert_equal(self.read('empty.log'), '')
+
+        self.append('before\n')
+        start = self.streamer.mark()
+        self.append('job 1\n')
+        end = self.streamer.write_log(os.path.join(self.directory, 'job1.log'), start)
+        self.append('job 2\n')
+        self.streamer.write_log(os.path.join(self.directory, 'job2.log'), end)
+        assert_equal(self.read('job1.log'), 'job 1\n')
+        assert_equal(self.read('job2.log'), 'job 2\n')
+
+        self.streamer.stop()
+        assert_equal(sorted(os.listdir(self.directory)), ['empty.log', 'job1.log', 'job2.log'])
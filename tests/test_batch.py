@@ -0,0 +1,99 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+# pylint: disable=R0201
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_false, assert_raises, assert_true
+
+from wa.framework.exception import TargetError
+from wa.framework.target.batch import CommandBatch
+
+
+class MockTarget(object):
+
+    def __init__(self, working_directory):
+        self.working_directory = working_directory
+        self.executed = []
+        self.pushed = []
+
+    def get_workpath(self, name):
+        return os.path.join(self.working_directory, name)
+
+    def execute(self, command, check_exit_code=True, as_root=False):  # pylint: disable=unused-argument
+        self.executed.append(command)
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        return process.communicate()[0].decode('utf-8')
+
+    def push(self, source, dest):
+        self.pushed.append(dest)
+        shutil.copy(source, dest)
+
+
+class TestCommandBatch(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.target = MockTarget(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_batch(self):
+        path = os.path.join(self.directory, 'value')
+        with open(path, 'w') as wfh:
+            wfh.write('42\n')
+
+        batch = CommandBatch(self.target)
+        echo = batch.execute('echo one; echo two')
+        no_newline = batch.execute('printf x')
+        value = batch.read_value(path, kind=int)
+        exists = batch.file_exists(path)
+        missing = batch.file_exists(path + '.missing')
+        failed = batch.execute('echo error >&2; exit 3', check_exit_code=False)
+        assert_raises(RuntimeError, lambda: echo.value)
+        batch.flush()
+
+        assert_equal(len(self.target.executed), 1)
+        assert_equal(echo.value, 'one\ntwo\n')
+        assert_equal(no_newline.value, 'x')
+        assert_equal(value.value, 42)
+        assert_true(exists.value)
+        assert_false(missing.value)
+        assert_equal(failed.exit_code, 3)
+        assert_equal(failed.output, 'error\n')
+
+    def test_error(self):
+        batch = CommandBatch(self.target)
+        first = batch.execute('exit 1')
+        second = batch.execute('echo ok')
+        assert_raises(TargetError, batch.flush)
+        # Commands after the failing one are still executed.
+        assert_equal(second.value, 'ok\n')
+        assert_raises(TargetError, lambda: first.value)
+
+    def test_long_script(self):
+        batch = CommandBatch(self.target)
+        batch.max_command_length = 100
+        results = [batch.execute('echo {}'.format(i)) for i in range(10)]
+        batch.flush()
+        assert_equal([r.value for r in results], ['{}\n'.format(i) for i in range(10)])
+        assert_equal(len(self.target.pushed), 1)
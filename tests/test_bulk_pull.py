@@ -0,0 +1,116 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+# pylint: disable=R0201
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_false, assert_true
+
+from wa.framework.exception import TargetError
+from wa.framework.target.bulk import BulkPull
+
+
+class MockTarget(object):
+
+    path = posixpath
+    busybox = ''
+
+    def __init__(self, working_directory, archive=True):
+        self.working_directory = working_directory
+        self.archive = archive
+        self.commands = []
+        self.pulls = []
+
+    def get_workpath(self, name):
+        return self.path.join(self.working_directory, name)
+
+    def execute(self, command, as_root=False):  # pylint: disable=unused-argument
+        self.commands.append(command)
+        if not self.archive:
+            raise TargetError('tar: not found')
+        try:
+            return subprocess.check_output(command, shell=True)
+        except subprocess.CalledProcessError as e:
+            raise TargetError(str(e))
+
+    def pull(self, source, dest, as_root=False):  # pylint: disable=unused-argument
+        self.pulls.append(source)
+        if not os.path.exists(source):
+            raise TargetError('{} does not exist'.format(source))
+        shutil.copy(source, dest)
+
+
+class TestBulkPull(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'source')
+        for name in ['a/1', 'a/2', 'b/1', 'c']:
+            path = os.path.join(self.source, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as wfh:
+                wfh.write(name)
+        self.work = os.path.join(self.directory, 'work')
+        os.makedirs(self.work)
+        self.dest = os.path.join(self.directory, 'dest')
+        os.makedirs(self.dest)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _pull(self, target, **kwargs):
+        bulk_pull = BulkPull(target, **kwargs)
+        bulk_pull.add(os.path.join(self.source, 'a'), self.dest)
+        bulk_pull.add(os.path.join(self.source, 'b', '*'), self.dest)
+        bulk_pull.add(os.path.join(self.source, 'c'), os.path.join(self.dest, 'renamed'))
+        bulk_pull.add(os.path.join(self.source, 'missing'), self.dest)
+        return bulk_pull.execute()
+
+    def _check_dest(self):
+        assert_equal(sorted(os.listdir(self.dest)), ['1', 'a', 'renamed'])
+        assert_equal(sorted(os.listdir(os.path.join(self.dest, 'a'))), ['1', '2'])
+        with open(os.path.join(self.dest, 'renamed')) as fh:
+            assert_equal(fh.read(), 'c')
+
+    def test_archive(self):
+        target = MockTarget(self.work)
+        missing = self._pull(target)
+        assert_equal(missing, [os.path.join(self.source, 'missing')])
+        self._check_dest()
+        assert_equal(len(target.pulls), 1)
+        assert_equal(os.listdir(self.work), [])
+
+    def test_staged(self):
+        target = MockTarget(self.work)
+        self._pull(target, stage=True)
+        self._check_dest()
+        assert_equal(os.listdir(self.work), [])
+
+    def test_fallback(self):
+        target = MockTarget(self.work, archive=False)
+        bulk_pull = BulkPull(target)
+        bulk_pull.add(os.path.join(self.source, 'c'), self.dest)
+        bulk_pull.add(os.path.join(self.source, 'missing'), self.dest)
+        assert_equal(bulk_pull.execute(), [os.path.join(self.source, 'missing')])
+        assert_true(os.path.isfile(os.path.join(self.dest, 'c')))
+        assert_equal(len(target.pulls), 2)
+        assert_false(bulk_pull)
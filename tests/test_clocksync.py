@@ -0,0 +1,100 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+# pylint: disable=R0201
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_almost_equal, assert_is_none, assert_raises
+
+from wa.framework.clocksync import (ClockEstimate, ClockSync, estimate_offset,
+                                    get_clock_sync)
+from wa.framework.exception import HostError, TargetError
+from wa.utils.serializer import write_pod
+
+
+class MockTarget(object):
+
+    def __init__(self, offset, delays, output=None):
+        self.offset = offset
+        self.delays = list(delays)
+        self.output = output
+
+    def execute(self, command):  # pylint: disable=unused-argument
+        # The clock is read at the start of each call, so only the reading
+        # without a delay before returning is accurate.
+        now = time.time() + self.offset
+        time.sleep(self.delays.pop(0))
+        if self.output is not None:
+            return self.output
+        return '{:.9f}\n'.format(now)
+
+
+class MockOutput(object):
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def get_artifact_path(self, name):  # pylint: disable=unused-argument
+        if self.path is None:
+            raise HostError('Artifact "clock_sync" not found')
+        return self.path
+
+
+class TestClockSync(TestCase):
+
+    def test_estimate_offset(self):
+        target = MockTarget(100, [0.02, 0.02, 0, 0.02])
+        estimate = estimate_offset(target, probes=4)
+        assert_almost_equal(estimate.offset, 100, delta=0.005)
+        assert estimate.rtt < 0.01
+
+        target = MockTarget(0, [0], output='date: not found\n')
+        assert_raises(TargetError, estimate_offset, target, probes=1)
+
+    def test_mapping(self):
+        sync = ClockSync('uptime')
+        assert_equal(sync.drift, 0)
+        sync.add(ClockEstimate(1000, -900, 0.002))
+        assert_equal(sync.to_target(1010), 110)
+        sync.add(ClockEstimate(2000, -899, 0.004))
+        assert_almost_equal(sync.drift, 0.001)
+        assert_almost_equal(sync.error, 0.002)
+
+        assert_almost_equal(sync.to_target(1500), 600.5)
+        for host_time in [0, 1000, 1234.5, 3000]:
+            assert_almost_equal(sync.to_host(sync.to_target(host_time)), host_time)
+
+        copy = ClockSync.from_pod(sync.to_pod())
+        assert_equal(copy.clock, 'uptime')
+        assert_almost_equal(copy.to_target(1500), 600.5)
+
+    def test_get_clock_sync(self):
+        directory = tempfile.mkdtemp()
+        try:
+            sync = ClockSync('uptime')
+            sync.add(ClockEstimate(1000, -900, 0.002))
+            path = os.path.join(directory, 'clock_sync.json')
+            write_pod({'clocks': [sync.to_pod()]}, path)
+
+            assert_equal(get_clock_sync(MockOutput(path), 'uptime').offset, -900)
+            assert_is_none(get_clock_sync(MockOutput(path), 'realtime'))
+            assert_is_none(get_clock_sync(MockOutput(), 'uptime'))
+        finally:
+            shutil.rmtree(directory)
@@ -1,7 +1,24 @@
+import logging
+import re
 import unittest
 from nose.tools import assert_equal
 
+from wa.framework.configuration.core import JobSpec, RebootPolicy, RunConfiguration
+from wa.framework.configuration.execution import (permute_by_cost,
+                                                  get_total_transition_cost)
 from wa.utils.misc import merge_config_values
+from wa.utils.types import toggle_set
+
+
+def make_spec(id, workload, iterations=2, runtime_parameters=None,  # pylint: disable=redefined-builtin
+              augmentations=None):
+    spec = JobSpec()
+    spec.id = id
+    spec.workload_name = workload
+    spec.iterations = iterations
+    spec.runtime_parameters.update(runtime_parameters or {})
+    spec.augmentations = toggle_set(augmentations or [])
+    return spec
 
 
 class TestConfigUtils(unittest.TestCase):
@@ -23,3 +40,45 @@ class TestConfigUtils(unittest.TestCase):
             if v2 is not None:
                 assert_equal(type(result), type(v2))
 
+
+
+class TestExecutionOrder(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_by_cost(self):
+        specs = [make_spec('a', 'dhrystone', runtime_parameters={'freq': 1}),
+                 make_spec('b', 'memcpy', runtime_parameters={'freq': 2}),
+                 make_spec('c', 'dhrystone', runtime_parameters={'freq': 1}, iterations=3),
+                 make_spec('d', 'memcpy', runtime_parameters={'freq': 2},
+                           augmentations=['trace-cmd'])]
+        result = list(permute_by_cost(specs))
+        assert_equal([(s.id, i) for s, i in result],
+                     [('a', 1), ('c', 1), ('b', 1), ('d', 1),
+                      ('d', 2), ('b', 2), ('a', 2), ('c', 2),
+                      ('c', 3)])
+        assert_equal(get_total_transition_cost(result), 1 + 16 + 3 + 3 + 16 + 1)
+
+    def test_reboot_on_each_spec(self):
+        specs = [make_spec('a', 'dhrystone'), make_spec('b', 'dhrystone')]
+        result = list(permute_by_cost(specs, RebootPolicy('each_spec')))
+        assert_equal([(s.id, i) for s, i in result],
+                     [('a', 1), ('b', 1), ('b', 2), ('a', 2)])
+        assert_equal(get_total_transition_cost(result, RebootPolicy('each_spec')), 202)
+
+    def test_documented_example(self):
+        # The example given in the description of "execution_order".
+        point = [p for p in RunConfiguration.config_points if p.name == 'execution_order'][0]
+        by_cost = point.description.split('``"by_cost"``')[1]
+        documented = re.search(r'(X\.A1, .*)', by_cost).group(1)
+
+        specs = [make_spec('X.A', 'dhrystone', runtime_parameters={'freq': 1}),
+                 make_spec('X.B', 'memcpy', runtime_parameters={'freq': 2}),
+                 make_spec('Y.A', 'dhrystone', runtime_parameters={'freq': 2}),
+                 make_spec('Y.B', 'memcpy', runtime_parameters={'freq': 1})]
+        result = list(permute_by_cost(specs))
+        assert_equal(', '.join('{}{}'.format(s.id, i) for s, i in result), documented)
@@ -0,0 +1,112 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_almost_equal, raises
+
+from wa.framework.configuration.core import ConvergenceCriteria
+from wa.framework.convergence import (ConvergenceTracker, find_outliers,
+                                      relative_half_width, stdev)
+from wa.framework.exception import ConfigError
+
+
+class MockSpec(object):
+
+    def __init__(self, **criteria):
+        self.id = 'spec'
+        self.convergence = ConvergenceCriteria(criteria)
+
+
+class TestConvergenceCriteria(TestCase):
+
+    def test_criteria(self):
+        criteria = ConvergenceCriteria('execution_time')
+        assert_equal(criteria.metric, 'execution_time')
+        assert_equal(criteria.threshold, 0.05)
+        assert_equal(criteria.max_iterations, 20)
+
+        criteria = ConvergenceCriteria({'metric': 'score', 'threshold': '0.1',
+                                        'warmup': 2, 'exclude_outliers': 'yes'})
+        assert_equal(criteria.threshold, 0.1)
+        assert_equal(criteria.warmup, 2)
+        assert_true(criteria.exclude_outliers)
+        assert_equal(ConvergenceCriteria.from_pod(criteria.to_pod()).to_pod(),
+                     criteria.to_pod())
+
+    @raises(ConfigError)
+    def test_missing_metric(self):
+        ConvergenceCriteria({'threshold': 0.1})
+
+    @raises(ConfigError)
+    def test_unknown_criteria(self):
+        ConvergenceCriteria({'metric': 'score', 'tolerance': 0.1})
+
+    @raises(ConfigError)
+    def test_bad_confidence(self):
+        ConvergenceCriteria({'metric': 'score', 'confidence': 0.8})
+
+
+class TestStatistics(TestCase):
+
+    def test_half_width(self):
+        assert_almost_equal(stdev([2, 4, 4, 4, 5, 5, 7, 9]), 2.138, places=3)
+        # t(0.95, 3) * stdev / sqrt(n) / mean
+        assert_almost_equal(relative_half_width([9, 9, 11, 11], 0.95),
+                            3.182 * 1.1547 / 2 / 10, places=3)
+        assert_equal(relative_half_width([10], 0.95), None)
+        assert_equal(relative_half_width([0, 0], 0.95), None)
+
+    def test_outliers(self):
+        assert_equal(find_outliers([10, 11, 10, 12, 11, 30]), [5])
+        assert_equal(find_outliers([10, 30, 10]), [])
+
+
+class TestConvergenceTracker(TestCase):
+
+    def test_converged(self):
+        tracker = ConvergenceTracker(MockSpec(metric='score', threshold=0.05, warmup=1))
+        tracker.start()
+        tracker.add(1, 50)
+        tracker.add(2, 100)
+        assert_true(tracker.needs_more(2))
+        tracker.add(3, 101)
+        tracker.add(4, 100)
+        assert_false(tracker.needs_more(4))
+        assert_equal(tracker.stop_reason, 'converged')
+        assert_equal(tracker.to_pod()['count'], 3)
+
+    def test_limits(self):
+        tracker = ConvergenceTracker(MockSpec(metric='score', max_iterations=3))
+        tracker.start()
+        for i, value in enumerate([1, 10, 100]):
+            tracker.add(i + 1, value)
+        assert_false(tracker.needs_more(3))
+        assert_equal(tracker.stop_reason, 'max_iterations')
+
+        tracker = ConvergenceTracker(MockSpec(metric='score', max_duration=0))
+        tracker.start()
+        tracker.add(1, 1)
+        assert_false(tracker.needs_more(1))
+        assert_equal(tracker.stop_reason, 'max_duration')
+
+    def test_outliers(self):
+        tracker = ConvergenceTracker(MockSpec(metric='score', exclude_outliers=True))
+        for i, value in enumerate([100, 101, 100, 300, 99, 100]):
+            tracker.add(i + 1, value)
+        assert_equal(tracker.outliers, [4])
+        assert_equal(tracker.samples, [100, 101, 100, 99, 100])
+        assert_true(tracker.converged)
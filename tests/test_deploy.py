@@ -0,0 +1,108 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+# pylint: disable=R0201
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import TestCase
+
+from nose.tools import assert_equal
+
+from wa.framework.target.deploy import Deployer
+
+
+class MockTarget(object):
+
+    path = posixpath
+    busybox = ''
+
+    def __init__(self, directory):
+        self.executables_directory = os.path.join(directory, 'bin')
+        os.makedirs(self.executables_directory)
+        self._installed_binaries = {}
+        self.pushed = []
+
+    def execute(self, command):
+        return subprocess.check_output(command, shell=True).decode('utf-8')
+
+    def push(self, source, dest):
+        self.pushed.append(dest)
+        shutil.copy(source, dest)
+
+    def install(self, filepath, timeout=None, with_name=None):  # pylint: disable=unused-argument
+        destpath = self.path.join(self.executables_directory,
+                                  with_name or os.path.basename(filepath))
+        self.push(filepath, destpath)
+        self._installed_binaries[os.path.basename(destpath)] = destpath
+        return destpath
+
+
+class TestDeployer(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = os.path.join(self.directory, 'cache')
+        self.host = os.path.join(self.directory, 'host')
+        os.makedirs(self.host)
+        self.assets = [os.path.join(self.host, name) for name in ['a', 'b']]
+        for path in self.assets:
+            self._write(path, path)
+        self.target = MockTarget(os.path.join(self.directory, 'target'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, path, text):
+        with open(path, 'w') as wfh:
+            wfh.write(text)
+
+    def _deploy(self, deployer):
+        files = [(p, os.path.join(self.target.executables_directory, os.path.basename(p)))
+                 for p in self.assets]
+        return [os.path.basename(p) for p in deployer.deploy(files)]
+
+    def test_deploy(self):
+        assert_equal(self._deploy(Deployer(self.target, self.cache)), ['a', 'b'])
+        # Unchanged files are not pushed, including by later runs.
+        assert_equal(self._deploy(Deployer(self.target, self.cache)), [])
+        assert_equal(self._deploy(Deployer(self.target, self.cache)), [])
+
+        # Files that change on the host or the target are pushed again.
+        self._write(self.assets[0], 'changed')
+        time.sleep(0.01)
+        self._write(os.path.join(self.target.executables_directory, 'b'), 'changed')
+        assert_equal(self._deploy(Deployer(self.target, self.cache)), ['a', 'b'])
+        assert_equal(self._deploy(Deployer(self.target, self.cache)), [])
+
+        # Without a cache, files are always pushed.
+        assert_equal(self._deploy(Deployer(self.target)), ['a', 'b'])
+
+    def test_install(self):
+        deployer = Deployer(self.target, self.cache)
+        deployer.attach()
+        self.target.install(self.assets[0])
+        self.target.install(self.assets[0], with_name='c')
+        assert_equal(len(self.target.pushed), 2)
+
+        self.target._installed_binaries = {}  # pylint: disable=protected-access
+        path = self.target.install(self.assets[0])
+        assert_equal(path, os.path.join(self.target.executables_directory, 'a'))
+        assert_equal(len(self.target.pushed), 2)
+        assert_equal(self.target._installed_binaries, {'a': path})  # pylint: disable=protected-access
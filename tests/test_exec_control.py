@@ -21,7 +21,8 @@ from nose.tools import assert_equal, assert_raises
 
 from wa.utils.exec_control import (init_environment, reset_environment,
                                    activate_environment, once,
-                                   once_per_class, once_per_instance)
+                                   once_per_class, once_per_instance,
+                                   forget_instance)
 
 class TestClass(object):
 
@@ -352,3 +353,16 @@ class OncePerInstanceEnvironmentTest(TestCase):
         asc.initilize_once_per_instance()
         asc.initilize_once_per_instance()
         assert_equal(asc.count, 2)
+
+    def test_forget_instance(self):
+        t1 = TestClass()
+        t2 = TestClass()
+
+        t1.initilize_once_per_instance()
+        t2.initilize_once_per_instance()
+        forget_instance(t1)
+
+        t1.initilize_once_per_instance()
+        assert_equal(t1.count, 2)
+        t2.initilize_once_per_instance()
+        assert_equal(t2.count, 1)
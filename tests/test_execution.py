@@ -0,0 +1,513 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+from devlib import LocalLinuxTarget
+from devlib.host import LocalConnection
+from mock.mock import Mock, patch
+from nose.tools import assert_equal, assert_true, assert_false, raises
+
+from wa.framework import pluginloader
+from wa.framework.configuration.core import Status
+from wa.framework.configuration.execution import ConfigManager
+from wa.framework.configuration.parsers import AgendaParser
+
+from wa.framework.exception import ConfigError
+from wa.framework.execution import ExecutionContext, Executor, JobDispatcher, Runner
+from wa.framework.job import Job
+from wa.framework.output import JobOutput, Result, RunOutput, init_run_output
+from wa.framework.output_processor import ProcessorManager
+from wa.framework.resource import ResourceResolver
+from wa.framework.run import JobState
+from wa.framework.target.descriptor import get_target_description, instantiate_assistant
+from wa.framework.target.manager import TargetManager
+from wa.output_processors.csvproc import CsvReportProcessor
+
+
+NUM_JOBS = 50
+
+
+class MockJob(object):
+
+    def __init__(self, id, iteration, retries=0):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.iteration = iteration
+        self.retries = retries
+
+
+class MockConfigManager(object):
+
+    def __init__(self, jobs, run_config=None):
+        self.jobs = jobs
+        self.run_config = run_config
+
+
+class MockRunConfig(object):
+
+    max_retries = 2
+    retry_on_status = [Status.FAILED, Status.PARTIAL]
+
+
+class MockRunState(object):
+
+    def __init__(self, jobs):
+        self.jobs = {(j.id, j.iteration): JobState(j.id, j.id, j.iteration, Status.PENDING)
+                     for j in jobs}
+
+
+class MockRunOutput(object):
+
+    def __init__(self, jobs):
+        self.state = MockRunState(jobs)
+        self.jobs = []
+        self.events = []
+
+    def add_event(self, message):
+        self.events.append(message)
+
+
+class MockSpec(object):
+
+    def __init__(self, augmentations):
+        self.augmentations = augmentations
+
+
+class MockRunInfo(object):
+
+    run_name = 'resumed'
+
+
+class MockProcessedRunOutput(object):
+
+    kind = 'run'
+
+    def __init__(self, basepath):
+        self.basepath = basepath
+        self.info = MockRunInfo()
+        self.result = Result()
+        self.artifacts = []
+
+    def get_path(self, subpath):
+        return os.path.join(self.basepath, subpath)
+
+    def add_artifact(self, name, path, kind, *args, **kwargs):  # pylint: disable=unused-argument
+        self.artifacts.append(name)
+
+
+class MockProcessingContext(object):
+
+    def __init__(self, run_output, resumed_outputs):
+        self.cm = None
+        self.output = run_output
+        self.run_output = run_output
+        self.target_info = None
+        self.resumed_outputs = resumed_outputs
+
+
+def make_context(jobs, dispatcher, name):
+    context = ExecutionContext.__new__(ExecutionContext)
+    context.cm = MockConfigManager(jobs)
+    context.job_queue = list(jobs)
+    context.dispatcher = dispatcher.connect(name)
+    return context
+
+
+def drain(dispatcher, name):
+    jobs = [MockJob('job', i) for i in range(NUM_JOBS)]
+    context = make_context(jobs, dispatcher, name)
+    while context.claim_next_job():
+        context.job_queue.pop(0)
+
+
+class TestJobDispatcher(TestCase):
+
+    def test_allocation(self):
+        dispatcher = JobDispatcher()
+        workers = [multiprocessing.Process(target=drain, args=(dispatcher, 'target{}'.format(i)))
+                   for i in range(3)]
+        for worker in workers:
+            worker.start()
+        claims = {}
+        while any(w.is_alive() for w in workers):
+            dispatcher.collect_claims(claims, timeout=0.1)
+        for worker in workers:
+            worker.join()
+            assert_equal(worker.exitcode, 0)
+        dispatcher.collect_claims(claims)
+
+        assert_equal(sorted(claims), [('job', i) for i in range(NUM_JOBS)])
+
+    def test_claim_next_job(self):
+        dispatcher = JobDispatcher()
+        jobs = [MockJob('a', 1), MockJob('b', 1), MockJob('c', 1)]
+        context = make_context(jobs, dispatcher, 'target1')
+        context.job_queue.remove(jobs[1])  # e.g. failed to initialize
+
+        dispatcher.next_index(len(jobs))  # allocated elsewhere
+        assert_true(context.claim_next_job())
+        assert_equal(context.job_queue[0], jobs[2])
+
+        retry = MockJob('c', 1, retries=1)
+        context.job_queue = [retry, jobs[0]]
+        assert_true(context.claim_next_job())
+        assert_equal(context.job_queue[0], retry)
+
+        context.job_queue = [jobs[0]]
+        assert_false(context.claim_next_job())
+        assert_equal(context.job_queue, [])
+        claims = dispatcher.collect_claims({}, timeout=1)
+        assert_equal(claims, {('b', 1): 'target1', ('c', 1): 'target1'})
+
+
+class TestResume(TestCase):
+
+    def _saved_state(self, id, status, retries=0):  # pylint: disable=redefined-builtin
+        state = JobState(id, id, 1, status)
+        state.retries = retries
+        return state
+
+    def test_resume_jobs(self):
+        jobs = [MockJob(name, 1) for name in ['ok', 'partial', 'exhausted',
+                                              'failed', 'running', 'new']]
+        context = ExecutionContext.__new__(ExecutionContext)
+        context.cm = MockConfigManager(list(jobs), MockRunConfig())
+        context.run_output = MockRunOutput(jobs)
+        context.run_output.jobs = [MockJob(name, 1) for name in ['ok', 'partial', 'exhausted']]
+        context.successful_jobs = 0
+        context.failed_jobs = 0
+        saved = [self._saved_state('ok', Status.OK),
+                 self._saved_state('partial', Status.PARTIAL, retries=2),
+                 self._saved_state('exhausted', Status.FAILED, retries=2),
+                 self._saved_state('failed', Status.FAILED, retries=1),
+                 self._saved_state('running', Status.RUNNING)]
+        saved_states = {(s.id, s.iteration): s for s in saved}
+
+        Executor().resume_jobs(context, saved_states)
+
+        assert_equal([j.id for j in context.cm.jobs], ['failed', 'running', 'new'])
+        assert_equal([j.retries for j in context.cm.jobs], [2, 0, 0])
+        assert_equal(context.successful_jobs, 2)
+        assert_equal(context.failed_jobs, 1)
+        states = context.run_output.state.jobs
+        assert_equal(states[('exhausted', 1)].status, Status.FAILED)
+        assert_equal(states[('failed', 1)].retries, 2)
+        assert_equal(states[('failed', 1)].status, Status.PENDING)
+        assert_equal([o.id for o in context.resumed_outputs], ['ok', 'partial', 'exhausted'])
+
+    def test_process_resumed_outputs(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            run_output = MockProcessedRunOutput(tempdir)
+            resumed = []
+            for i, name in enumerate(['ok', 'exhausted']):
+                os.makedirs(os.path.join(tempdir, name))
+                job_output = JobOutput(os.path.join(tempdir, name), name, name, 1, 0)
+                job_output.spec = MockSpec({'csv': 'csv'})
+                job_output.add_metric('score', i)
+                resumed.append(job_output)
+            proc = CsvReportProcessor()
+            pm = ProcessorManager(threads=1)
+            pm.install(proc, None)
+            runner = Runner(MockProcessingContext(run_output, resumed), pm)
+            pm.initialize()
+
+            runner.process_resumed_outputs()
+            new_output = JobOutput(os.path.join(tempdir, 'new'), 'new', 'new', 1, 0)
+            new_output.add_metric('score', 2)
+            proc.process_job_output(new_output, None, run_output)
+
+            with open(run_output.get_path('results.csv')) as fh:
+                rows = [line.strip().split(',') for line in fh.readlines()[1:]]
+            assert_equal([r[0] for r in rows], ['ok', 'exhausted', 'new'])
+            assert_equal(run_output.artifacts, ['run_result_csv'])
+        finally:
+            shutil.rmtree(tempdir)
+
+
+class MockJobSpec(object):
+
+    def __init__(self, id, iterations):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.label = id
+        self.classifiers = {}
+        self.workload_name = id
+        self.workload_parameters = {}
+        self.iterations = iterations
+
+
+class MockWorkload(object):
+
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+        self.logger = logging.getLogger(name)
+
+    def init_resources(self, context):  # pylint: disable=unused-argument
+        self.events.append(('init_resources', self.name))
+
+    def validate(self):
+        self.events.append(('validate', self.name))
+
+    def initialize(self, context):  # pylint: disable=unused-argument
+        self.events.append(('initialize', self.name))
+
+    def finalize(self, context):  # pylint: disable=unused-argument
+        self.events.append(('finalize', self.name))
+
+
+class MockTargetManager(object):
+
+    target = None
+    is_responsive = True
+
+
+class MockJobRunState(object):
+
+    def __init__(self):
+        self.jobs = []
+
+    def add_job(self, job):
+        self.jobs.append(job)
+
+    def update_job(self, job):
+        pass
+
+
+class MockStateOutput(object):
+
+    def write_state(self):
+        pass
+
+
+class TestDeferredLoading(TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.failing = set()
+        self.patcher = patch.object(pluginloader, 'get_workload', self._get_workload)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        Job._workload_cache.clear()
+
+    def _get_workload(self, name, target, **params):  # pylint: disable=unused-argument
+        self.events.append(('get_workload', name))
+        if name in self.failing:
+            raise RuntimeError('Could not load {}'.format(name))
+        return MockWorkload(name, self.events)
+
+    def _make_context(self, specs):
+        context = ExecutionContext.__new__(ExecutionContext)
+        context.cm = ConfigManager()
+        context.cm.run_config.set('defer_workload_loading', True)
+        context.cm.run_config.set('execution_order', 'by_workload')
+        context.cm.run_config.set('bail_on_init_failure', False)
+        context.tm = MockTargetManager()
+        context.run_state = MockJobRunState()
+        context.completed_jobs = []
+        context.current_job = None
+        context.run_output = MockStateOutput()
+        context.logger = logging.getLogger('context')
+        with patch.object(context.cm.jobs_config, 'generate_job_specs', return_value=specs):
+            context.cm.generate_jobs(context)
+        context.job_queue = list(context.cm.jobs)
+        return context
+
+    def test_lazy_loading(self):
+        context = self._make_context([MockJobSpec('a', 2), MockJobSpec('b', 1)])
+        # Workloads are only validated when jobs are generated.
+        assert_equal(self.events, [('get_workload', 'a'), ('validate', 'a'),
+                                   ('get_workload', 'b'), ('validate', 'b')])
+        assert_true(all(j.workload is None for j in context.job_queue))
+
+        del self.events[:]
+        assert_true(context.load_next_job())
+        assert_equal(self.events, [('get_workload', 'a'), ('init_resources', 'a'),
+                                   ('validate', 'a'), ('initialize', 'a')])
+        assert_true(context.job_queue[0].workload is not None)
+        assert_true(context.job_queue[1].workload is None)
+        assert_equal(context.job_queue[0].status, Status.PENDING)
+
+        # Subsequent iterations reuse the loaded workload.
+        context.completed_jobs.append(context.job_queue.pop(0))
+        del self.events[:]
+        assert_true(context.load_next_job())
+        assert_equal(self.events, [('initialize', 'a')])
+        assert_true(context.job_queue[0].workload is context.completed_jobs[0].workload)
+
+    def test_release_after_last_job(self):
+        context = self._make_context([MockJobSpec('a', 2), MockJobSpec('b', 1)])
+        runner = Runner(context, None)
+        # As at the end of a run, each job for the spec is finalized.
+        finalized = [[], [('finalize', 'a')] * 2, [('finalize', 'b')]]
+        for expected_events in finalized:
+            context.load_next_job()
+            job = context.job_queue.pop(0)
+            context.completed_jobs.append(job)
+            del self.events[:]
+            runner.release_workload(job)
+            assert_equal(self.events, expected_events)
+        assert_true(all(j.workload is None for j in context.completed_jobs))
+        assert_equal(Job._workload_cache, {})
+
+    def test_load_failure(self):
+        context = self._make_context([MockJobSpec('a', 2), MockJobSpec('b', 1)])
+        self.failing.add('a')
+        failed = context.job_queue[0]
+
+        assert_false(context.load_next_job())
+        assert_equal(failed.status, Status.FAILED)
+        assert_equal([j.id for j in context.job_queue], ['b'])
+        assert_equal([(j.id, j.status) for j in context.completed_jobs],
+                     [('a', Status.SKIPPED)])
+
+        assert_true(context.load_next_job())
+        assert_equal(context.job_queue[0].status, Status.PENDING)
+
+    def test_no_prefetching(self):
+        # Workloads are not loaded in advance, so there is nothing to prefetch.
+        context = self._make_context([MockJobSpec('a', 1)])
+        context.cm.run_config.set('prefetch_resources', 2)
+        context.resolver = ResourceResolver()
+        context.prefetcher = None
+        context.run_output = Mock()
+        context.start_run()
+        assert_true(context.prefetcher is None)
+        assert_false(context.resolver.cache_enabled)
+
+    @raises(RuntimeError)
+    def test_load_failure_bail(self):
+        context = self._make_context([MockJobSpec('a', 1)])
+        context.cm.run_config.set('bail_on_init_failure', True)
+        self.failing.add('a')
+        context.load_next_job()
+
+
+class StandInConnection(LocalConnection):
+
+    # Commands are run as the current user, as an unrooted connection refuses
+    # commands that ask for root if the tests are run by root.
+
+    def execute(self, command, timeout=None, check_exit_code=True,
+                as_root=False, strip_colors=True):
+        return super(StandInConnection, self).execute(command, timeout, check_exit_code,
+                                                      False, strip_colors)
+
+    def background(self, command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                   as_root=False):
+        return super(StandInConnection, self).background(command, stdout, stderr, False)
+
+
+class StandInTargetManager(TargetManager):
+    """Manages a local target standing in for one of the boards in a pool."""
+
+    def _init_target(self):
+        self.target = LocalLinuxTarget(connection_settings={'unrooted': True},
+                                       working_directory=self.parameters['working_directory'],
+                                       load_default_modules=False,
+                                       conn_cls=StandInConnection,
+                                       connect=False)
+        self.is_responsive = True
+        self.target.connect()
+        self.target.setup()
+        tdesc = get_target_description(self.target_name)
+        self.assistant = instantiate_assistant(tdesc, self.parameters, self.target)
+
+
+class TestDevicePool(TestCase):
+
+    boards = ['board1', 'board2', 'board3']
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _get_config(self, **run_config):
+        pool = [{'name': name, 'working_directory': os.path.join(self.tempdir, name)}
+                for name in self.boards]
+        config = OrderedDict([('device', 'generic_local'),
+                              ('device_pool', pool),
+                              ('augmentations', ['~~', 'csv', 'execution_time']),
+                              ('cache_target_info', False),
+                              ('cache_deployments', False)])
+        config.update(run_config)
+        agenda = {'config': config,
+                  'workloads': [{'id': 'wk1', 'name': 'idle', 'iterations': 4,
+                                 'params': {'duration': 0}},
+                                {'id': 'wk2', 'name': 'idle', 'iterations': 2,
+                                 'params': {'duration': 0}}]}
+        config_manager = ConfigManager()
+        AgendaParser().load(config_manager, agenda, 'test')
+        return config_manager
+
+    @patch('wa.framework.execution.TargetManager', StandInTargetManager)
+    def test_execute_on_pool(self):
+        config_manager = self._get_config()
+        path = os.path.join(self.tempdir, 'output')
+        Executor().execute(config_manager, init_run_output(path, config_manager))
+
+        output = RunOutput(path)
+        keys = [('wk1', i) for i in range(1, 5)] + [('wk2', i) for i in range(1, 3)]
+        assert_equal(sorted((j.id, j.iteration) for j in output.jobs), keys)
+        assert_equal(output.status, Status.OK)
+        targets = set()
+        for job_output in output.jobs:
+            assert_equal(job_output.status, Status.OK)
+            assert_true(os.path.isdir(job_output.basepath))
+            target = job_output.classifiers['target']
+            assert_true(target in self.boards)
+            targets.add(target)
+            # The job output has been moved from the target's output.
+            target_path = os.path.join(path, '__targets', target,
+                                       os.path.basename(job_output.basepath))
+            assert_false(os.path.exists(target_path))
+            metric = job_output.get_metric('execution_time')
+            assert_equal(metric.classifiers['target'], target)
+        assert_true(len(targets) > 1)
+
+        # Targets only load the workloads for the jobs they have claimed.
+        for target in targets:
+            ran = set((j.id, j.iteration) for j in output.jobs
+                      if j.classifiers['target'] == target)
+            loaded = set()
+            with open(os.path.join(path, '__targets', target, 'run.log')) as fh:
+                for match in re.finditer(r'Loading job (\S+) \(\S+\) \[(\d+)\]', fh.read()):
+                    loaded.add((match.group(1), int(match.group(2))))
+            assert_true(loaded)
+            assert_true(loaded.issubset(ran))
+
+        # Output processing is performed on the merged output.
+        with open(os.path.join(path, 'results.csv')) as fh:
+            rows = [line.split(',')[:3] for line in fh.readlines()[1:]]
+        assert_equal(sorted((r[0], int(r[2])) for r in rows), keys)
+
+    @raises(ConfigError)
+    def test_time_budget(self):
+        config_manager = self._get_config(time_budget='1h')
+        path = os.path.join(self.tempdir, 'output')
+        Executor().execute(config_manager, init_run_output(path, config_manager))
@@ -0,0 +1,105 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import subprocess
+import threading
+import time
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_is_none
+
+from wa.framework.exception import TargetError
+from wa.framework.target.manager import TargetHeartbeat, TargetManager
+
+
+class MockTarget(object):
+
+    def __init__(self, command=None):
+        self.command = command
+        self.started = 0
+
+    def background(self, command):
+        self.started += 1
+        return subprocess.Popen(self.command or command, shell=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def make_manager(heartbeat):
+    tm = TargetManager.__new__(TargetManager)
+    tm.heartbeat = heartbeat
+    tm.is_responsive = True
+    return tm
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestTargetHeartbeat(TestCase):
+
+    def test_responsive(self):
+        target = MockTarget()
+        heartbeat = TargetHeartbeat(target, 0.05, timeout=1)
+        heartbeat.start()
+        time.sleep(0.5)
+        heartbeat.stop()
+        assert_false(heartbeat.is_alive())
+        assert_false(heartbeat.failed)
+        assert_true(len(heartbeat.probes) > 1)
+        # A single process on the target is used for all checks.
+        assert_equal(target.started, 1)
+        assert_is_none(heartbeat.process)
+
+    def test_unresponsive(self):
+        heartbeat = TargetHeartbeat(MockTarget('sleep 10'), 0.05, timeout=0.1)
+        tm = make_manager(heartbeat)
+        heartbeat.start()
+        wait_for(lambda: heartbeat.failed)
+        assert_true(heartbeat.failed)
+        assert_equal(len(heartbeat.probes), TargetHeartbeat.max_failures)
+        assert_is_none(tm.get_heartbeat_error())
+
+        # The failure is acted on by the main thread, which stops the heartbeat.
+        raised = False
+        try:
+            tm.check_heartbeat()
+        except TargetError:
+            raised = True
+        assert_true(raised)
+        assert_false(tm.is_responsive)
+        heartbeat.join(1)
+        assert_false(heartbeat.is_alive())
+        assert_false(heartbeat.interrupted)
+        tm.check_heartbeat()
+
+    def test_interrupt(self):
+        heartbeat = TargetHeartbeat(MockTarget('sleep 10'), 0.05, timeout=0.1)
+        heartbeat.interrupt_delay = 0.1
+        tm = make_manager(heartbeat)
+        error = None
+        try:
+            heartbeat.start()
+            # e.g. blocked waiting on the target
+            threading.Event().wait(5)
+        except KeyboardInterrupt:
+            error = tm.get_heartbeat_error()
+        heartbeat.join(1)
+        assert_true(isinstance(error, TargetError))
+        assert_false(tm.is_responsive)
+        # Subsequent interrupts are from the user.
+        assert_is_none(tm.get_heartbeat_error())
@@ -0,0 +1,240 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from unittest import TestCase
+
+from mock.mock import patch
+from nose.tools import assert_equal, assert_false, assert_is_none
+
+from wa.framework.target.assistant import LogcatStreamer
+from wa.utils.android import LogcatParser, LogcatLogLevel, log_level_map
+
+
+logger = logging.getLogger('test-logcat')
+
+BENCHMARK_LINES = 50000
+
+
+def reference_parse_line(line, year):
+    """The straightforward strptime()-based parser, used as a baseline."""
+    line = line.strip()
+    if not line or line.startswith('-') or ': ' not in line:
+        return None
+    metadata, message = line.split(': ', 1)
+    parts = metadata.split(None, 5)
+    try:
+        ts = ' '.join([parts.pop(0), parts.pop(0)])
+        timestamp = datetime.strptime(ts, '%m-%d %H:%M:%S.%f').replace(year=year)
+        pid = int(parts.pop(0))
+        tid = int(parts.pop(0))
+        level = LogcatLogLevel.levels[log_level_map.index(parts.pop(0))]
+        tag = (parts.pop(0) if parts else '').strip()
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return (timestamp, pid, tid, level, tag, message)
+
+
+def generate_logcat(filepath, nlines, seed=42):
+    rng = random.Random(seed)
+    tags = ['ActivityManager', 'UX_PERF', 'TextView', 'chatty', 'InputReader']
+    with open(filepath, 'w') as wfh:
+        wfh.write('--------- beginning of main\n')
+        for i in range(nlines):
+            tag = rng.choice(tags)
+            if tag == 'UX_PERF':
+                message = 'action_{} {} {}'.format(i % 7, rng.choice(['start', 'end']),
+                                                   i * 1000000)
+            else:
+                message = 'message {}: some text'.format(i)
+            wfh.write('{:02d}-{:02d} {:02d}:{:02d}:{:02d}.{:03d} {:5d} {:5d} {} {:<8}: {}\n'.format(
+                rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+                rng.randint(0, 59), rng.randint(0, 59), rng.randint(0, 999),
+                rng.randint(1, 32768), rng.randint(1, 32768),
+                rng.choice(log_level_map), tag, message))
+
+
+def as_tuple(event):
+    return (event.timestamp, event.pid, event.tid, event.level, event.tag, event.message)
+
+
+class TestLogcatParser(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.mkdtemp()
+        cls.logfile = os.path.join(cls.tempdir, 'logcat.log')
+        generate_logcat(cls.logfile, BENCHMARK_LINES)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempdir)
+
+    def test_parse_line(self):
+        parser = LogcatParser(year=2018)
+        event = parser.parse_line('06-24 17:05:12.345  2462  2470 D TextView: 5:05: now\n')
+        assert_equal(event.timestamp, datetime(2018, 6, 24, 17, 5, 12, 345000))
+        assert_equal(event.pid, 2462)
+        assert_equal(event.tid, 2470)
+        assert_equal(event.level, LogcatLogLevel.debug)
+        assert_equal(event.tag, 'TextView')
+        assert_equal(event.message, '5:05: now')
+
+        event = parser.parse_line('06-24 17:05:12.345678  1  2 W Tag With Spaces : msg')
+        assert_equal(event.timestamp.microsecond, 345678)
+        assert_equal(event.tag, 'Tag With Spaces')
+
+        assert_is_none(parser.parse_line('--------- beginning of main'))
+        assert_is_none(parser.parse_line(''))
+
+    def test_invalid_lines(self):
+        parser = LogcatParser()
+        logging.disable(logging.WARNING)
+        try:
+            for line in ['D/TextView( 2462): 5:05',
+                         '06-24 17:05:12.3x5  2462  2470 D TextView: x',
+                         '06-24 17:05:12.345  2462  2470 Q TextView: x']:
+                assert_is_none(parser.parse_line(line))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_matches_reference(self):
+        parser = LogcatParser(year=2018)
+        with open(self.logfile) as fh:
+            expected = [e for e in (reference_parse_line(l, 2018) for l in fh) if e]
+        assert_equal([as_tuple(e) for e in parser.parse(self.logfile)], expected)
+
+        columns = parser.parse_columns(self.logfile)
+        assert_equal(list(zip(*[columns[c] for c in LogcatParser.columns])), expected)
+
+        tagged = LogcatParser(tags=['UX_PERF'], year=2018)
+        assert_equal([as_tuple(e) for e in tagged.parse(self.logfile)],
+                     [e for e in expected if e[4] == 'UX_PERF'])
+
+    def test_benchmark(self):
+        with open(self.logfile) as fh:
+            lines = fh.readlines()
+        year = datetime.now().year
+
+        start = time.time()
+        for line in lines:
+            reference_parse_line(line, year)
+        reference_time = time.time() - start
+
+        parser = LogcatParser()
+        start = time.time()
+        for line in lines:
+            parser.parse_line(line)
+        fast_time = time.time() - start
+
+        start = time.time()
+        parser.parse_columns(self.logfile)
+        columns_time = time.time() - start
+
+        tagged = LogcatParser(tags=['UX_PERF'])
+        start = time.time()
+        for _ in tagged.parse(self.logfile):
+            pass
+        tagged_time = time.time() - start
+
+        # Timings are only logged, as they are not reliable on a loaded host;
+        # the results are checked by test_matches_reference.
+        logger.info('Parsing {} lines: strptime {:.3f}s, parse_line {:.3f}s, '
+                    'parse_columns {:.3f}s, UX_PERF only {:.3f}s'.format(
+                        len(lines), reference_time, fast_time, columns_time,
+                        tagged_time))
+
+
+class MockConnection(object):
+
+    adb_server = 'adbhost'
+
+
+class MockAndroidTarget(object):
+
+    adb_name = 'device'
+    conn = MockConnection()
+
+
+def wait_for_exit(process, timeout=5):
+    end = time.time() + timeout
+    while process.poll() is None and time.time() < end:
+        time.sleep(0.05)
+
+
+class TestLogcatStreamer(TestCase):
+
+    def setUp(self):
+        self.commands = []
+        self.lines = iter(['first', 'second'])
+        self.patcher = patch('wa.framework.target.assistant.get_adb_command',
+                             self._get_adb_command)
+        self.patcher.start()
+        self.streamer = LogcatStreamer(MockAndroidTarget())
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.streamer.stop()
+        shutil.rmtree(self.tempdir)
+
+    def _get_adb_command(self, device, command, timeout=None, adb_server=None):  # pylint: disable=unused-argument
+        self.commands.append((device, command, adb_server))
+        # Stands in for logcat, exiting as if the target had rebooted.
+        return 'echo {}'.format(next(self.lines))
+
+    def _read(self, name):
+        with open(os.path.join(self.tempdir, name)) as fh:
+            return fh.read()
+
+    def test_restart(self):
+        self.streamer.start()
+        assert_equal(self.commands, [('device', 'logcat', 'adbhost')])
+        wait_for_exit(self.streamer.process)
+        start = self.streamer.mark()
+        assert_equal(start, len('first\n'))
+
+        self.streamer.start()
+        wait_for_exit(self.streamer.process)
+        assert_equal(len(self.commands), 2)
+        end = self.streamer.write_log(os.path.join(self.tempdir, 'log'), start)
+        assert_equal(self._read('log'), 'second\n')
+        assert_equal(end, self.streamer.mark())
+
+        self.streamer.stop()
+        assert_is_none(self.streamer.process)
+        assert_false(os.path.exists(self.streamer.buffer_file))
+
+    def test_write_log(self):
+        assert_equal(self.streamer.mark(), 0)
+        with open(self.streamer.buffer_file, 'w') as wfh:
+            wfh.write('one\n')
+        offset = self.streamer.write_log(os.path.join(self.tempdir, 'one'), 0)
+        with open(self.streamer.buffer_file, 'a') as wfh:
+            wfh.write('two\nthree\n')
+        end = self.streamer.write_log(os.path.join(self.tempdir, 'two'), offset)
+        self.streamer.write_log(os.path.join(self.tempdir, 'empty'), end)
+
+        assert_equal(self._read('one'), 'one\n')
+        assert_equal(self._read('two'), 'two\nthree\n')
+        assert_equal(self._read('empty'), '')
+        assert_equal(end, len('one\ntwo\nthree\n'))
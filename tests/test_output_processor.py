@@ -0,0 +1,192 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import logging
+import threading
+import time
+from unittest import TestCase
+
+from nose.tools import assert_equal
+
+from wa.framework.output import Output
+from wa.framework.instrument import hostside
+from wa.framework.output_processor import (OutputProcessor, ProcessorManager,
+                                           JobOutputPipeline)
+
+
+class MockOutput(Output):
+
+    def __init__(self, id=None):  # pylint: disable=super-init-not-called,redefined-builtin
+        self.id = id
+        self.added = []
+        self.written = False
+        self.threads = set()
+
+    def add_metric(self, name, value, units=None, lower_is_better=False,
+                   classifiers=None):
+        self.added.append(name)
+        self.threads.add(threading.current_thread().name)
+
+    @property
+    def metrics(self):
+        return list(self.added)
+
+    def write_result(self):
+        self.written = True
+        self.threads.add(threading.current_thread().name)
+
+
+class MockProcessor(OutputProcessor):
+
+    name = 'mock'
+    concurrent = True
+    reads_results = False
+
+    def __init__(self, name, delay=0, **kwargs):
+        super(MockProcessor, self).__init__(**kwargs)
+        self.name = name
+        self.delay = delay
+        self.seen = None
+        self.thread = None
+
+    def process_job_output(self, output, target_info, run_output):
+        self.thread = threading.current_thread()
+        self.seen = output.metrics
+        time.sleep(self.delay)
+        output.add_metric(self.name, 1)
+
+
+class Failing(MockProcessor):
+
+    def process_job_output(self, output, target_info, run_output):
+        super(Failing, self).process_job_output(output, target_info, run_output)
+        raise RuntimeError('{} failed'.format(self.name))
+
+
+class Reader(MockProcessor):
+
+    reads_results = True
+
+
+class Exclusive(MockProcessor):
+
+    concurrent = False
+
+
+class HostSide(MockProcessor):
+
+    concurrent = False
+
+    def __init__(self, name, **kwargs):
+        super(HostSide, self).__init__(name, **kwargs)
+        self.processed = []
+
+    @hostside
+    def process_job_output(self, output, target_info, run_output):
+        time.sleep(self.delay)
+        self.processed.append(output.id)
+        output.add_metric(self.name, 1)
+
+
+class ProcessContext(object):
+
+    def __init__(self):
+        self.job_output = MockOutput()
+        self.run_output = None
+        self.target_info = None
+
+
+class TestProcessorManager(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _process(self, processors, threads=4):
+        pm = ProcessorManager(threads=threads)
+        pm.processors = processors
+        context = ProcessContext()
+        pm.process_job_output(context)
+        return context.job_output.added
+
+    def test_merge_order(self):
+        procs = [MockProcessor('slow', delay=0.1), MockProcessor('fast')]
+        assert_equal(self._process(procs), ['slow', 'fast'])
+        assert_equal(procs[0].seen, [])
+        assert_equal(procs[1].seen, [])
+
+    def test_readers_wait(self):
+        procs = [MockProcessor('a', delay=0.05), MockProcessor('b'),
+                 Reader('reader'), Exclusive('last')]
+        assert_equal(self._process(procs), ['a', 'b', 'reader', 'last'])
+        assert_equal(procs[2].seen, ['a', 'b'])
+        assert_equal(procs[3].seen, ['a', 'b', 'reader'])
+        assert_equal(procs[3].thread, threading.current_thread())
+
+    def test_dependencies(self):
+        first = MockProcessor('first')
+        first.dependencies = ['second']
+        second = MockProcessor('second', delay=0.05)
+        assert_equal(self._process([first, second]), ['second', 'first'])
+        assert_equal(first.seen, ['second'])
+
+    def test_sequential(self):
+        procs = [MockProcessor('a'), MockProcessor('b')]
+        assert_equal(self._process(procs, threads=1), ['a', 'b'])
+        assert_equal(procs[1].seen, ['a'])
+
+    def test_failures(self):
+        logging.disable(logging.ERROR)
+        for threads in [1, 4]:
+            procs = [MockProcessor('a'), Failing('b'), Exclusive('c'), Failing('d')]
+            pm = ProcessorManager(threads=threads)
+            pm.processors = procs
+            failed = pm.process_job_output(ProcessContext())
+            assert_equal(failed, [procs[1], procs[3]])
+
+
+class TestJobOutputPipeline(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_pipeline(self):
+        pm = ProcessorManager(threads=1)
+        pm.processors = [MockProcessor('inline'), HostSide('background', delay=0.01)]
+        assert_equal(pm.get_hostside(), pm.processors[1:])
+
+        pipeline = JobOutputPipeline(pm, 1)
+        pipeline.start()
+        outputs = []
+        for i in range(5):
+            context = ProcessContext()
+            context.job_output = MockOutput(i)
+            outputs.append(context.job_output)
+            pipeline.submit(context, pm.get_hostside())
+        pipeline.wait()
+        assert_equal(pm.processors[1].processed, list(range(5)))
+        pipeline.stop()
+
+        for output in outputs:
+            assert_equal(output.added, ['background'])
+            assert_equal(output.written, True)
+            # Output is only modified by the main thread.
+            assert_equal(output.threads, set([threading.current_thread().name]))
@@ -0,0 +1,115 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+from wa.framework.planning import DurationIndex, plan_jobs
+from wa.utils.serializer import write_pod
+
+
+def make_spec(id, workload='idle', **params):  # pylint: disable=redefined-builtin
+    return {'id': id, 'workload_name': workload, 'workload_parameters': params,
+            'runtime_parameters': {}}
+
+
+def make_output(path, uuid, specs, jobs, run_duration=10.0, finished=True):
+    os.makedirs(os.path.join(path, '__meta'))
+    write_pod({'uuid': uuid, 'duration': run_duration,
+               'end_time': '2018-01-01' if finished else None},
+              os.path.join(path, '__meta', 'run_info.json'))
+    write_pod({'jobs': specs}, os.path.join(path, '__meta', 'jobs.json'))
+    write_pod({'status': 'OK', 'jobs': jobs}, os.path.join(path, '.run_state.json'))
+
+
+class MockJob(object):
+
+    def __init__(self, id, iteration):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.iteration = iteration
+
+
+class TestDurationIndex(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_estimate(self):
+        index = DurationIndex()
+        index.add(make_spec('a', duration=1), 10)
+        index.add(make_spec('a', duration=1), 20)
+        index.add(make_spec('b', duration=5), 60)
+        assert_equal(index.estimate(make_spec('x', duration=1)), 15)
+        assert_equal(index.estimate(make_spec('x', duration=2)), 30)
+        assert_equal(index.estimate(make_spec('x', workload='dhrystone')), None)
+        assert_equal(index.mean, 30)
+
+    def test_update(self):
+        specs = [make_spec('a', duration=1), make_spec('b', duration=2)]
+        make_output(os.path.join(self.tempdir, 'run1'), 'uuid1', specs,
+                    [{'id': 'a', 'status': 'OK', 'duration': 2.0},
+                     {'id': 'b', 'status': 'OK', 'duration': 4.0},
+                     {'id': 'b', 'status': 'FAILED', 'duration': 1.0}])
+        # Job durations not recorded
+        make_output(os.path.join(self.tempdir, 'old', 'run2'), 'uuid2', specs,
+                    [{'id': 'a', 'status': 'OK'}, {'id': 'a', 'status': 'OK'}])
+        make_output(os.path.join(self.tempdir, 'run3'), 'uuid3', specs,
+                    [{'id': 'a', 'status': 'OK', 'duration': 100.0}], finished=False)
+
+        index = DurationIndex()
+        assert_equal(index.update([self.tempdir]), 2)
+        assert_equal(index.estimate(specs[0]), 4.0)
+        assert_equal(index.estimate(specs[1]), 4.0)
+
+        filepath = os.path.join(self.tempdir, 'cache', 'durations.json')
+        index.save(filepath)
+        index = DurationIndex.load(filepath)
+        assert_equal(index.update([self.tempdir]), 0)
+        assert_equal(index.estimate(specs[0]), 4.0)
+        assert_true('uuid1' in index.runs)
+        assert_false('uuid3' in index.runs)
+
+        # Nested outputs are only found by a recursive search.
+        index = DurationIndex()
+        assert_equal(index.update([self.tempdir], recursive=False), 1)
+        assert_equal(index.runs, set(['uuid1']))
+        assert_equal(index.update([os.path.join(self.tempdir, 'old')], recursive=False), 1)
+
+
+class TestPlanJobs(TestCase):
+
+    def test_plan(self):
+        jobs = [MockJob(i, n) for n in [1, 2, 3] for i in ['a', 'b', 'c']]
+        estimates = {'a': 10, 'b': 50, 'c': 20}
+
+        selected, skipped = plan_jobs(jobs, estimates, 1000)
+        assert_equal(selected, jobs)
+        assert_equal(skipped, [])
+
+        selected, skipped = plan_jobs(jobs, estimates, 125)
+        assert_equal([(j.id, j.iteration) for j in selected],
+                     [('a', 1), ('b', 1), ('c', 1), ('a', 2), ('c', 2), ('a', 3)])
+        assert_equal(len(skipped), 3)
+
+        selected, _ = plan_jobs(jobs, estimates, 5)
+        assert_equal(selected, [])
@@ -0,0 +1,192 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock.mock import patch
+from nose.tools import assert_equal, assert_true, assert_false
+
+from wa.commands.process import ProcessCommand, ProcessingFingerprints
+from wa.framework.output import Artifact
+from wa.framework.output_processor import OutputProcessor
+
+
+class MockOutput(object):
+
+    def __init__(self, basepath):
+        self.basepath = basepath
+        self.metadir = os.path.join(basepath, '__meta')
+        self.artifacts = []
+
+    def get_path(self, subpath):
+        return os.path.join(self.basepath, subpath)
+
+    def write_result(self):
+        pass
+
+    def unshare_artifacts(self):
+        pass
+
+
+class MockSpec(object):
+
+    augmentations = []
+
+
+class MockJobOutput(MockOutput):
+
+    id = 'job'
+    label = 'job'
+    iteration = 1
+    spec = MockSpec()
+
+
+class MockRunOutput(MockOutput):
+
+    augmentations = []
+    target_info = None
+
+    def __init__(self, basepath, jobs):
+        super(MockRunOutput, self).__init__(basepath)
+        self.jobs = jobs
+
+
+class MockRunConfig(object):
+
+    processor_threads = 1
+
+
+class MockSettings(object):
+
+    artifact_store = None
+
+
+class MockConfig(object):
+
+    plugin_cache = None
+    settings = MockSettings()
+    run_config = MockRunConfig()
+
+    def __init__(self, processors):
+        self.processors = processors
+
+    def get_processors(self):
+        return self.processors
+
+
+class MockArgs(object):
+
+    recursive = False
+    additional_processors = None
+    force = False
+
+
+class RecordingProcessor(OutputProcessor):
+
+    def __init__(self, name, fail=False):
+        super(RecordingProcessor, self).__init__()
+        self.name = name
+        self.fail = fail
+        self.processed = []
+
+    def process_job_output(self, output, target_info, run_output):  # pylint: disable=unused-argument
+        self.processed.append(output.id)
+        if self.fail:
+            raise RuntimeError('{} failed'.format(self.name))
+
+
+class MockProcessor(object):
+
+    name = 'mock'
+
+    def __init__(self, **config):
+        self.config = config
+
+    def get_config(self):
+        return self.config
+
+
+class TestProcessingFingerprints(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.run_output = MockOutput(self.tempdir)
+        os.makedirs(self.run_output.metadir)
+        self.job_output = MockOutput(os.path.join(self.tempdir, 'job-1'))
+        os.makedirs(self.job_output.basepath)
+        self.trace = os.path.join(self.job_output.basepath, 'trace.txt')
+        with open(self.trace, 'w') as wfh:
+            wfh.write('trace')
+        self.job_output.artifacts.append(Artifact('trace', 'trace.txt', 'raw'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_fingerprints(self):
+        proc = MockProcessor(param=1)
+        fingerprints = ProcessingFingerprints(self.run_output)
+        assert_false(fingerprints.is_current(self.job_output, proc))
+
+        fingerprints.update(self.job_output, [proc])
+        fingerprints.write()
+        fingerprints = ProcessingFingerprints(self.run_output)
+        assert_true(fingerprints.is_current(self.job_output, proc))
+        assert_false(fingerprints.is_current(self.job_output, MockProcessor(param=2)))
+
+        with open(self.trace, 'a') as wfh:
+            wfh.write('more trace')
+        assert_false(fingerprints.is_current(self.job_output, proc))
+
+
+class TestProcessCommand(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        job_output = MockJobOutput(os.path.join(self.tempdir, 'job-1'))
+        self.run_output = MockRunOutput(self.tempdir, [job_output])
+        os.makedirs(self.run_output.metadir)
+        os.makedirs(job_output.basepath)
+        self.command = ProcessCommand.__new__(ProcessCommand)
+        self.command.logger = logging.getLogger('process')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    @patch('wa.commands.process.log.add_file')
+    def test_failed_processor_retried(self, _):
+        ok = RecordingProcessor('ok')
+        failing = RecordingProcessor('failing', fail=True)
+        config = MockConfig([ok, failing])
+        logging.disable(logging.ERROR)
+        try:
+            self.command.process_run(config, MockArgs(), self.run_output)
+        finally:
+            logging.disable(logging.NOTSET)
+        assert_equal(ok.processed, ['job'])
+        assert_equal(failing.processed, ['job'])
+
+        # Only the processor that failed is run again.
+        failing.fail = False
+        self.command.process_run(config, MockArgs(), self.run_output)
+        assert_equal(ok.processed, ['job'])
+        assert_equal(failing.processed, ['job', 'job'])
+
+        self.command.process_run(config, MockArgs(), self.run_output)
+        assert_equal(failing.processed, ['job', 'job'])
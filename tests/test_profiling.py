@@ -0,0 +1,75 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import unittest
+
+from nose.tools import assert_equal, assert_true, assert_is_none
+
+from wa.framework import profiling, signal
+
+
+class MockJob(object):
+
+    id = 'wk1'
+    iteration = 1
+
+
+class TestPhaseProfiler(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.disable()
+
+    def test_wrap(self):
+        with signal.wrap('JOB_TARGET_CONFIG'):
+            pass
+        assert_is_none(profiling.get_profiler())
+
+        profiler = profiling.enable()
+        profiler.start_job(MockJob())
+        with signal.wrap('JOB'):
+            with signal.wrap('WORKLOAD_EXECUTION'):
+                pass
+            try:
+                with signal.wrap('WORKLOAD_TEARDOWN'):
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+        profiler.end_job()
+        with signal.wrap('RUN_OUTPUT_PROCESSED'):
+            pass
+
+        assert_equal([(t.job, t.name) for t in profiler.timings],
+                     [('wk1-1', 'WORKLOAD_EXECUTION'), ('wk1-1', 'WORKLOAD_TEARDOWN'),
+                      ('wk1-1', 'JOB'), (None, 'RUN_OUTPUT_PROCESSED')])
+        assert_true(profiling.disable() is profiler)
+
+    def test_summary(self):
+        profiler = profiling.PhaseProfiler()
+        profiler.job = 'wk1-1'
+        profiler.record('phase', 'WORKLOAD_EXECUTION', 0, 3.0)
+        profiler.record('callback', 'trace.start', 0, 0.5)
+        profiler.record('phase', 'JOB', 0, 4.0)
+        profiler.job = 'wk1-2'
+        profiler.record('phase', 'WORKLOAD_EXECUTION', 0, 1.0)
+        profiler.record('phase', 'JOB', 0, 2.0)
+
+        assert_equal(profiler.get_job_summary(),
+                     [('wk1-1', 4.0, 3.0, 1.0), ('wk1-2', 2.0, 1.0, 1.0)])
+        assert_equal(profiler.get_phase_summary()[0], ('phase', 'WORKLOAD_EXECUTION', 2, 4.0))
+        assert_true('33.3%' in profiler.format_summary())
+
+        pod = profiling.PhaseProfiler.from_pod(profiler.to_pod())
+        assert_equal(pod.get_job_summary(), profiler.get_job_summary())
@@ -0,0 +1,219 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+from wa.framework import quiet
+from wa.framework.instrument import ManagedCallback
+from wa.framework.resource import ResourcePrefetcher
+from wa.utils.serializer import read_pod
+
+
+class MockConnection(object):
+
+    def execute(self, command):
+        return command
+
+
+class MockTarget(object):
+    """Has a connection per thread, as devlib targets do."""
+
+    @property
+    def conn(self):
+        tid = id(threading.current_thread())
+        if tid not in self._connections:
+            self._connections[tid] = self.get_connection()
+        return self._connections[tid]
+
+    def __init__(self):
+        self._connections = {}
+
+    def get_connection(self):
+        return MockConnection()
+
+
+class MockTargetManager(object):
+
+    def __init__(self):
+        self.target = MockTarget()
+        self.is_responsive = True
+
+
+class MockContext(object):
+
+    def __init__(self, output_directory):
+        self.tm = MockTargetManager()
+        self.output_directory = output_directory
+        self.artifacts = {}
+
+    def add_artifact(self, name, path, kind, description=None):  # pylint: disable=unused-argument
+        self.artifacts[name] = path
+
+
+class MockInstrument(object):
+
+    name = 'poller'
+    is_enabled = True
+    concurrent = False
+
+
+class MockResolver(object):
+
+    def get_resolved_paths(self):
+        return []
+
+
+class MockWorkload(object):
+
+    name = 'mock'
+
+    def __init__(self):
+        self.prefetched = False
+
+    def prefetch_resources(self, resolver):  # pylint: disable=unused-argument
+        self.prefetched = True
+
+
+class TestQuietWindow(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        quiet.enable()
+
+    def tearDown(self):
+        quiet.disable()
+        shutil.rmtree(self.directory)
+
+    def test_window(self):
+        context = MockContext(self.directory)
+        target = context.tm.target
+        conn = target.conn
+        deferred = []
+
+        def interact(command, declare=None):
+            if declare:
+                with quiet.allowed(declare):
+                    target.conn.execute(command)
+            else:
+                target.conn.execute(command)
+
+        with quiet.window(context):
+            assert_true(quiet.is_quiet())
+            assert_equal(conn.execute('workload'), 'workload')
+            quiet.defer(deferred.append, 'deferred')
+            for args in [('instrument', 'poller'), ('debug',)]:
+                thread = threading.Thread(target=interact, args=args)
+                thread.start()
+                thread.join()
+            assert_equal(deferred, [])
+
+        assert_false(quiet.is_quiet())
+        assert_equal(deferred, ['deferred'])
+        assert_false('execute' in conn.__dict__)
+        assert_false('get_connection' in target.__dict__)
+
+        report = read_pod(context.artifacts['quiet_window'])
+        assert_equal(report['calls'], 3)
+        assert_equal(report['undeclared'], 1)
+        assert_equal(report['deferred'], 1)
+        assert_equal([(r['args'], r['declared']) for r in report['records']],
+                     [(['workload'], 'workload'), (['instrument'], 'poller'),
+                      (['debug'], None)])
+
+        # Outside of a window, interactions happen immediately.
+        quiet.defer(deferred.append, 'immediate')
+        assert_equal(deferred, ['deferred', 'immediate'])
+
+    def test_thread_connections(self):
+        context = MockContext(self.directory)
+        target = context.tm.target
+        connected = threading.Event()
+        poll = threading.Event()
+        polled = threading.Event()
+        connections = []
+
+        def poll_target(name):
+            connections.append(target.conn)
+            connected.set()
+            poll.wait()
+            target.conn.execute(name)
+            polled.set()
+
+        # One thread connects before the window, and one during it.
+        before = threading.Thread(target=poll_target, args=('before',))
+        before.start()
+        connected.wait()
+        with quiet.window(context):
+            during = threading.Thread(target=poll_target, args=('during',))
+            during.start()
+            poll.set()
+            before.join()
+            during.join()
+        for conn in connections:
+            assert_false('execute' in conn.__dict__)
+        assert_equal(len(set(id(c) for c in connections)), 2)
+
+        report = read_pod(context.artifacts['quiet_window'])
+        assert_equal(report['undeclared'], 2)
+        assert_equal(sorted(r['args'][0] for r in report['records']), ['before', 'during'])
+
+    def test_instrument_callbacks(self):
+        context = MockContext(self.directory)
+        target = context.tm.target
+        poll = threading.Event()
+        polled = threading.Event()
+
+        def poll_target():
+            poll.wait()
+            target.conn.execute('poll')
+            polled.set()
+
+        def start(context):
+            threading.Thread(target=poll_target).start()
+
+        def update(context):
+            context.tm.target.conn.execute('update')
+
+        ManagedCallback(MockInstrument(), start)(context)
+        with quiet.window(context):
+            poll.set()
+            polled.wait()
+            ManagedCallback(MockInstrument(), update)(context)
+
+        report = read_pod(context.artifacts['quiet_window'])
+        assert_equal(report['undeclared'], 0)
+        assert_equal([(r['args'], r['declared']) for r in report['records']],
+                     [(['poll'], 'poller'), (['update'], 'poller')])
+
+    def test_prefetch(self):
+        context = MockContext(self.directory)
+        prefetcher = ResourcePrefetcher(MockResolver())
+        workload = MockWorkload()
+        prefetcher.start()
+        try:
+            with quiet.window(context):
+                prefetcher.prefetch([workload])
+                prefetcher.wait()
+                assert_false(workload.prefetched)
+            prefetcher.wait()
+            assert_true(workload.prefetched)
+        finally:
+            prefetcher.stop()
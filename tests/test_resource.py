@@ -0,0 +1,151 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_is_none
+
+from wa.framework.plugin import Parameter
+from wa.framework.resource import File, ResourceResolver, ResourcePrefetcher
+
+
+class MockOwner(object):
+
+    name = 'owner'
+    parameters = [Parameter('version')]
+
+    def __init__(self, version=None):
+        self.version = version
+
+
+class MockWorkload(object):
+
+    name = 'mock'
+
+    def __init__(self, path):
+        self.path = path
+
+    def prefetch_resources(self, resolver):
+        resolver.get(File(MockOwner(), self.path))
+
+
+class TestResourceResolver(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.lookups = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.resolver = ResourceResolver()
+        self.resolver.register(self._source, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _source(self, resource):
+        self.lookups.append(resource.path)
+        if resource.path == 'slow':
+            self.started.set()
+            self.release.wait()
+        path = os.path.join(self.tempdir, resource.path)
+        if os.path.isfile(path):
+            return path
+
+    def _write(self, name, text):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'w') as wfh:
+            wfh.write(text)
+        return path
+
+    def test_cache(self):
+        path = self._write('file.txt', 'data')
+        self.resolver.enable_cache()
+        assert_equal(self.resolver.get(File(MockOwner(), 'file.txt')), path)
+        assert_equal(self.resolver.get(File(MockOwner(), 'file.txt')), path)
+        assert_is_none(self.resolver.get(File(MockOwner(), 'missing'), strict=False))
+        assert_is_none(self.resolver.get(File(MockOwner(), 'missing'), strict=False))
+        assert_equal(self.lookups, ['file.txt', 'missing', 'missing'])
+
+        assert_equal(self.resolver.get_md5(path), hashlib.md5(b'data').hexdigest())
+
+    def test_cache_key(self):
+        self._write('file.txt', 'data')
+        self.resolver.enable_cache()
+        self.resolver.get(File(MockOwner('1'), 'file.txt'))
+        self.resolver.get(File(MockOwner('1'), 'file.txt'))
+        self.resolver.get(File(MockOwner('2'), 'file.txt'))
+        assert_equal(self.lookups, ['file.txt', 'file.txt'])
+
+    def test_cache_disabled(self):
+        self._write('file.txt', 'data')
+        self.resolver.get(File(MockOwner(), 'file.txt'))
+        self.resolver.get(File(MockOwner(), 'file.txt'))
+        assert_equal(self.lookups, ['file.txt', 'file.txt'])
+        assert_equal(self.resolver.get_resolved_paths(), [])
+
+    def test_prefetch(self):
+        self._write('a', 'a')
+        self._write('b', 'b')
+        workloads = [MockWorkload('a'), MockWorkload('b'), MockWorkload('c')]
+        self.resolver.enable_cache()
+        prefetcher = ResourcePrefetcher(self.resolver)
+        prefetcher.start()
+        prefetcher.prefetch(workloads[:2])
+        prefetcher.prefetch(workloads)
+        prefetcher.wait()
+        prefetcher.stop()
+        assert_equal(self.lookups, ['a', 'b', 'c'])
+
+        self.resolver.get(File(MockOwner(), 'a'))
+        self.resolver.get(File(MockOwner(), 'b'))
+        assert_equal(self.lookups, ['a', 'b', 'c'])
+
+    def test_concurrent(self):
+        self._write('slow', 'slow')
+        path = self._write('fast', 'fast')
+        self.resolver.enable_cache()
+        results = []
+
+        def get_slow():
+            results.append(self.resolver.get(File(MockOwner(), 'slow')))
+
+        def get_fast():
+            results.append(self.resolver.get(File(MockOwner(), 'fast')))
+
+        threads = [threading.Thread(target=get_slow) for _ in range(2)]
+        fast = threading.Thread(target=get_fast)
+        try:
+            threads[0].start()
+            self.started.wait()
+            threads[1].start()
+            # Other resources are resolved while the first one is in progress.
+            fast.start()
+            fast.join(5)
+            assert_equal(results, [path])
+        finally:
+            self.release.set()
+            for thread in threads + [fast]:
+                if thread.is_alive():
+                    thread.join()
+        del results[0]
+        # The second request for the same resource waited for the first.
+        assert_equal(self.lookups, ['slow', 'fast'])
+        assert_equal(results, [os.path.join(self.tempdir, 'slow')] * 2)
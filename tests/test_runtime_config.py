@@ -0,0 +1,135 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from nose.tools import assert_equal, assert_false, assert_raises
+
+from devlib.exception import TargetError
+
+from wa.framework.target.runtime_config import SysfileValuesRuntimeConfig, WriteBatch
+from wa.framework.target.runtime_parameter_manager import RuntimeParameterManager
+
+
+class MockTarget(object):
+    """Runs the scripts generated by WriteBatch on the host."""
+
+    is_rooted = True
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.executed = []
+
+    def get_workpath(self, name):
+        return os.path.join(self.directory, name)
+
+    def push(self, source, dest):
+        shutil.copy(source, dest)
+
+    def execute(self, command, check_exit_code=True, as_root=False):  # pylint: disable=unused-argument
+        self.executed.append(command)
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate()[0].decode()
+        if check_exit_code and process.returncode:
+            raise TargetError('{} failed: {}'.format(command, output))
+        return output
+
+
+class SysfileParameterManager(RuntimeParameterManager):
+
+    runtime_config_cls = [SysfileValuesRuntimeConfig]
+
+
+def read_file(path):
+    with open(path) as fh:
+        return fh.read().strip()
+
+
+class TestRuntimeParameterManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.target = MockTarget(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_batched_and_diffed(self):
+        rpm = SysfileParameterManager(self.target)
+        params = {'sysfile_values': {self._path('a'): 1, self._path('b') + '!': 2}}
+
+        rpm.commit_runtime_parameters(params)
+        assert_equal(read_file(self._path('a')), '1')
+        assert_equal(read_file(self._path('b')), '2')
+        assert_equal(len(self.target.executed), 1)
+
+        rpm.commit_runtime_parameters(params)
+        assert_equal(len(self.target.executed), 1)
+
+        rpm.commit_runtime_parameters({'sysfile_values': {self._path('a'): 3}})
+        assert_equal(read_file(self._path('a')), '3')
+        assert_equal(len(self.target.executed), 2)
+
+        rpm.reset_committed_state()
+        rpm.commit_runtime_parameters({'sysfile_values': {self._path('a'): 3}})
+        assert_equal(len(self.target.executed), 3)
+
+    def test_verification(self):
+        # Writing to a directory fails, even as root.
+        readonly = self._path('ro')
+        os.mkdir(readonly)
+        rpm = SysfileParameterManager(self.target)
+        rpm.commit_runtime_parameters({'sysfile_values': {readonly + '!': 1}})
+        with assert_raises(TargetError):
+            rpm.commit_runtime_parameters({'sysfile_values': {readonly: 1}})
+        # State is unknown after a failure, so everything is re-written.
+        with assert_raises(TargetError):
+            rpm.commit_runtime_parameters({'sysfile_values': {readonly: 1}})
+        assert_equal(len(self.target.executed), 3)
+
+    def test_quoting(self):
+        path = self._path("it's a file")
+        value = 'performance; echo "$HOME" `true` | cat'
+        batch = WriteBatch(self.target)
+        batch.write_value(path, value)
+        batch.flush()
+        assert_equal(read_file(path), value)
+        assert_equal(sorted(os.listdir(self.directory)),
+                     sorted(["it's a file", WriteBatch.script_name]))
+
+    def test_optional(self):
+        os.mkdir(self._path('cpu1'))
+        online = self._path('cpu1/online')
+        with open(online, 'w') as wfh:
+            wfh.write('1\n')
+        missing = self._path('cpu0/online')
+        batch = WriteBatch(self.target)
+        batch.write_value(missing, 1, optional=True)
+        batch.write_value(online, 0, optional=True)
+        batch.flush()
+        assert_equal(read_file(online), '0')
+        assert_false(os.path.exists(missing))
+
+        batch.write_value(missing, 1)
+        assert_raises(TargetError, batch.flush)
@@ -1,10 +1,19 @@
+import logging
+import time
 import unittest
 
-from nose.tools import assert_equal, assert_true, assert_false
+from louie import dispatcher
+from nose.tools import assert_equal, assert_true, assert_false, assert_raises
 
 import wa.framework.signal as signal
 
 
+logger = logging.getLogger('test-signal')
+
+BENCHMARK_HANDLERS = 30
+BENCHMARK_SENDS = 2000
+
+
 class Callable(object):
 
     def __init__(self, val):
@@ -61,3 +70,145 @@ class TestPriorityDispatcher(unittest.TestCase):
         assert_true(d['after'])
         assert_true(caught)
         assert_false(d['success'])
+
+    def test_invert_priority(self):
+        sig = signal.Signal('test-inverted', invert_priority=True)
+        signal.connect(Callable(1), sig, priority=1)
+        signal.connect(Callable(2), sig, priority=2)
+        assert_equal([r[1] for r in signal.send(sig)], [1, 2])
+
+    def test_sender_and_disconnect(self):
+        sig = signal.Signal('test-sender')
+        sender = object()
+        specific = Callable('specific')
+        general = Callable('general')
+        signal.connect(general, sig, priority=10)
+        signal.connect(specific, sig, sender=sender)
+        assert_equal([r[1] for r in signal.send(sig, sender)], ['specific', 'general'])
+        assert_equal([r[1] for r in signal.send(sig)], ['general'])
+
+        signal.disconnect(specific, sig, sender=sender)
+        signal.disconnect(specific, sig, sender=sender)
+        assert_equal([r[1] for r in signal.send(sig, sender)], ['general'])
+        signal.disconnect(general, sig)
+        assert_equal(signal.send(sig), [])
+
+    def test_arguments(self):
+        sig = signal.Signal('test-arguments')
+        received = []
+        def positional(context):
+            received.append(('positional', context))
+        def named(context, sender=None):
+            received.append(('named', context, sender))
+        def error(context):
+            raise ValueError(context)
+        def after(context):
+            received.append(('after', context))
+        signal.connect(positional, sig, priority=3)
+        signal.connect(named, sig, priority=2)
+        signal.connect(error, sig, priority=1)
+        signal.connect(after, sig, priority=0)
+        # As with louie, handler errors propagate to the sender.
+        assert_raises(ValueError, signal.send, sig, 'me', 'ctx')
+        assert_equal(received, [('positional', 'ctx'), ('named', 'ctx', 'me')])
+        signal.disconnect(error, sig)
+        signal.send(sig, 'me', 'ctx')
+        assert_equal(received[-1], ('after', 'ctx'))
+
+    def test_concurrent(self):
+        sig = signal.Signal('test-concurrent')
+        events = []
+
+        class Slow(object):
+            concurrent = True
+
+            def __init__(self, name):
+                self.name = name
+
+            def __call__(self, context):
+                events.append(('start', self.name))
+                time.sleep(0.2)
+                events.append(('end', self.name))
+                return self.name
+
+        def marker(context):
+            events.append(('marker', context))
+            return 'marker'
+
+        signal.connect(Slow('a'), sig, priority=20)
+        signal.connect(Slow('b'), sig, priority=10)
+        signal.connect(marker, sig, priority=5)
+        signal.connect(Slow('c'), sig, priority=0)
+        start = time.time()
+        responses = signal.send(sig, dispatcher.Anonymous, 'ctx')
+        duration = time.time() - start
+
+        assert_equal([r[1] for r in responses], ['a', 'b', 'marker', 'c'])
+        # a and b run together, but both complete before the marker.
+        assert_equal(set(events[:2]), set([('start', 'a'), ('start', 'b')]))
+        assert_equal(events[4:], [('marker', 'ctx'), ('start', 'c'), ('end', 'c')])
+        assert_true(duration < 0.55)
+
+    def test_concurrent_error(self):
+        sig = signal.Signal('test-concurrent-error')
+        finished = []
+
+        class Handler(object):
+            concurrent = True
+
+            def __init__(self, name, error=None):
+                self.name = name
+                self.error = error
+
+            def __call__(self, context):
+                if self.error:
+                    raise self.error
+                time.sleep(0.1)
+                finished.append(self.name)
+
+        signal.connect(Handler('a'), sig, priority=20)
+        signal.connect(Handler('b', KeyError('b')), sig, priority=10)
+        signal.connect(Handler('c', ValueError('c')), sig, priority=0)
+        # The first error is raised once all handlers have returned.
+        assert_raises(KeyError, signal.send, sig, dispatcher.Anonymous, 'ctx')
+        assert_equal(finished, ['a'])
+
+
+class Handler(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, context):
+        self.count += 1
+
+
+class TestDispatchBenchmark(unittest.TestCase):
+
+    def test_benchmark(self):
+        sig = signal.Signal('test-benchmark')
+        louie_sig = signal.Signal('test-benchmark-louie')
+        handlers = [Handler() for _ in range(BENCHMARK_HANDLERS)]
+        for i, handler in enumerate(handlers):
+            signal.connect(handler, sig, priority=i)
+            dispatcher.connect(handler, louie_sig)
+        try:
+            start = time.time()
+            for _ in range(BENCHMARK_SENDS):
+                dispatcher.send(louie_sig, dispatcher.Anonymous, 'context')
+            louie_time = time.time() - start
+
+            start = time.time()
+            for _ in range(BENCHMARK_SENDS):
+                signal.send(sig, dispatcher.Anonymous, 'context')
+            fast_time = time.time() - start
+        finally:
+            for handler in handlers:
+                signal.disconnect(handler, sig)
+                dispatcher.disconnect(handler, louie_sig)
+
+        logger.info('Sending {} signals to {} handlers: louie {:.3f}s, '
+                    'signal.send {:.3f}s'.format(BENCHMARK_SENDS, BENCHMARK_HANDLERS,
+                                                 louie_time, fast_time))
+        # Timings are only logged, as they are not reliable on a loaded host.
+        assert_true(all(h.count == 2 * BENCHMARK_SENDS for h in handlers))
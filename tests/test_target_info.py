@@ -0,0 +1,235 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=R0201
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from devlib import TargetError
+from devlib.target import KernelConfig, KernelVersion
+from nose.tools import assert_equal, assert_false
+
+from wa.framework.target.info import (get_target_info, parse_target_info_dump,
+                                      TargetInfoCache)
+from wa.utils.serializer import read_pod
+
+
+NUM_CPUS = 4
+
+SYSFS = {
+    '/sys/kernel/debug/sched_features': 'GENTLE_FAIR_SLEEPERS START_DEBIT',
+    '/sys/devices/system/cpu/cpuidle/current_driver': 'psci_idle',
+    '/sys/devices/system/cpu/cpuidle/current_governor_ro': 'menu',
+}
+for i in range(NUM_CPUS):
+    cpufreq = '/sys/devices/system/cpu/cpu{}/cpufreq/'.format(i)
+    domain = '0 1' if i < 2 else '2 3'
+    SYSFS[cpufreq + 'scaling_available_governors'] = 'performance schedutil'
+    SYSFS[cpufreq + 'related_cpus'] = domain
+    SYSFS[cpufreq + 'scaling_driver'] = 'scpi'
+    if i < 2:
+        SYSFS[cpufreq + 'scaling_available_frequencies'] = '500000 1000000'
+    else:
+        SYSFS[cpufreq + 'stats/time_in_state'] = '2000000 10\n1500000 20\n'
+
+
+class MockCpuinfo(object):
+
+    cpu_names = ['A53'] * 2 + ['A72'] * 2
+    architecture = 'arm64'
+
+    def get_cpu_features(self, i):  # pylint: disable=unused-argument
+        return ['fp', 'asimd']
+
+
+class MockCpufreq(object):
+
+    def __init__(self, target):
+        self.target = target
+
+    def list_governors(self, cpu):
+        return self.target.read_value(self._path(cpu, 'scaling_available_governors')).split()
+
+    def list_frequencies(self, cpu):
+        try:
+            return [int(f) for f in self.target.read_value(
+                self._path(cpu, 'scaling_available_frequencies')).split()]
+        except TargetError:
+            values = iter(self.target.read_value(self._path(cpu, 'stats/time_in_state')).split())
+            return [int(f) for f, _ in reversed(list(zip(values, values)))]
+
+    def get_related_cpus(self, cpu):
+        return [int(c) for c in self.target.read_value(self._path(cpu, 'related_cpus')).split()]
+
+    def get_driver(self, cpu):
+        return self.target.read_value(self._path(cpu, 'scaling_driver'))
+
+    def _path(self, cpu, name):
+        return '/sys/devices/system/cpu/cpu{}/cpufreq/{}'.format(cpu, name)
+
+
+class MockCpuidle(object):
+
+    def __init__(self, target):
+        self.target = target
+
+    def get_driver(self):
+        return self.target.read_value('/sys/devices/system/cpu/cpuidle/current_driver')
+
+    def get_governor(self):
+        return self.target.read_value('/sys/devices/system/cpu/cpuidle/current_governor_ro')
+
+    def get_states(self, cpu):  # pylint: disable=unused-argument
+        return []
+
+
+class MockTarget(object):
+
+    os = 'linux'
+    os_version = {}
+    abi = 'arm64'
+    is_rooted = True
+    busybox = '/data/busybox'
+    kernel_version = KernelVersion('4.14.0 #1 SMP')
+    config = KernelConfig('CONFIG_SMP=y')
+
+    def __init__(self, dump=None):
+        self.dump = dump
+        self.identity = '@@ hostid\n007f0101\n@@ kernel\n4.14.0 #1 SMP\n'
+        self.calls = 0
+        self.cpuinfo = MockCpuinfo()
+        self.cpufreq = MockCpufreq(self)
+        self.cpuidle = MockCpuidle(self)
+
+    def has(self, name):
+        return name in ['cpufreq', 'cpuidle']
+
+    def get_workpath(self, name):
+        return '/data/local/tmp/' + name
+
+    def push(self, source, dest):
+        self.calls += 1
+
+    def read_value(self, path):
+        self.calls += 1
+        if path not in SYSFS:
+            raise TargetError('{} does not exist'.format(path))
+        return SYSFS[path].strip()
+
+    def execute(self, command, **kwargs):  # pylint: disable=unused-argument
+        self.calls += 1
+        if command.startswith('sh '):
+            if self.dump is None:
+                raise TargetError('sh: not found')
+            return self.dump
+        if command.startswith('echo "@@ hostid"'):
+            return self.identity
+        return {'/data/busybox hostid': '007f0101\n',
+                '/data/busybox hostname': 'board\n'}[command]
+
+
+def make_dump(exclude=None):
+    lines = ['@@ hostid', '007f0101', '@@ hostname', 'board']
+    for key, path in [('sched_features', '/sys/kernel/debug/sched_features'),
+                      ('cpuidle/driver', '/sys/devices/system/cpu/cpuidle/current_driver'),
+                      ('cpuidle/governor', '/sys/devices/system/cpu/cpuidle/current_governor_ro')]:
+        lines.extend(['@@ ' + key, SYSFS[path]])
+    for i in range(NUM_CPUS):
+        cpufreq = '/sys/devices/system/cpu/cpu{}/cpufreq/'.format(i)
+        for key, name in [('governors', 'scaling_available_governors'),
+                          ('frequencies', 'scaling_available_frequencies'),
+                          ('time_in_state', 'stats/time_in_state'),
+                          ('related_cpus', 'related_cpus'), ('driver', 'scaling_driver')]:
+            key = 'cpu{}/{}'.format(i, key)
+            if cpufreq + name in SYSFS and key != exclude:
+                lines.extend(['@@ ' + key] + SYSFS[cpufreq + name].strip().split('\n'))
+    return '\n'.join(lines) + '\n'
+
+
+class TestTargetInfo(TestCase):
+
+    def test_parse_dump(self):
+        dump = parse_target_info_dump('junk\n@@ a\n1 2\n@@ b\n@@ c\nx\ny\n\n')
+        assert_equal(dump, {'a': '1 2', 'b': '', 'c': 'x\ny'})
+
+    def test_batch(self):
+        reference_target = MockTarget()
+        reference = get_target_info(reference_target, batch=False).to_pod()
+        assert_equal(reference['cpus'][2]['cpufreq']['available_frequencies'],
+                     [1500000, 2000000])
+
+        target = MockTarget(make_dump())
+        assert_equal(get_target_info(target).to_pod(), reference)
+        assert_equal(target.calls, 2)
+
+        # Items missing from the dump are read individually.
+        target = MockTarget(make_dump(exclude='cpu1/related_cpus'))
+        assert_equal(get_target_info(target).to_pod(), reference)
+        assert_equal(target.calls, 3)
+
+        # As is everything, if the script cannot be run.
+        target = MockTarget()
+        assert_equal(get_target_info(target).to_pod(), reference)
+        assert_equal(target.calls, reference_target.calls + 2)
+
+
+class TestTargetInfoCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cache(self):
+        cache = TargetInfoCache(self.directory)
+        target = MockTarget(make_dump())
+        reference = cache.get_target_info(target).to_pod()
+        assert_equal(os.listdir(self.directory), ['MockTarget-007f0101.json'])
+
+        # Only the identity of the target is checked, and the information
+        # that may change is collected again.
+        target = MockTarget(make_dump())
+        assert_equal(cache.get_target_info(target).to_pod(), reference)
+        assert_equal(target.calls, 2)
+        pod = read_pod(os.path.join(self.directory, 'MockTarget-007f0101.json'))
+        assert_false('is_rooted' in pod['info'])
+
+        target.is_rooted = False
+        info = cache.get_target_info(target)
+        assert_false(info.is_rooted)
+        assert_equal(info.sched_features, reference['sched_features'])
+
+        # A change of kernel invalidates the cached information.
+        target.identity = target.identity.replace('4.14.0', '4.19.0')
+        target.calls = 0
+        cache.get_target_info(target)
+        assert_equal(target.calls, 3)
+        target.calls = 0
+        cache.get_target_info(target)
+        assert_equal(target.calls, 2)
+
+        target.calls = 0
+        TargetInfoCache(self.directory, refresh=True).get_target_info(target)
+        assert_equal(target.calls, 3)
+
+    def test_unidentified_target(self):
+        cache = TargetInfoCache(self.directory)
+        target = MockTarget(make_dump())
+        target.identity = '@@ hostid\n@@ kernel\n4.14.0 #1 SMP\n'
+        cache.get_target_info(target)
+        assert_equal(os.listdir(self.directory), [])
@@ -21,7 +21,7 @@ from nose.tools import raises, assert_equal, assert_not_equal, assert_in, assert
 from nose.tools import assert_true, assert_false, assert_raises, assert_is, assert_list_equal
 
 from wa.utils.types import (list_or_integer, list_or_bool, caseless_string,
-                            arguments, prioritylist, enum, level)
+                            arguments, prioritylist, enum, level, duration)
 
 
 
@@ -149,3 +149,15 @@ class TestEnumLevel(TestCase):
         s = e.one.to_pod()
         l = e.from_pod(s)
         assert_equal(l, e.one)
+
+
+class TestDuration(TestCase):
+
+    def test_duration(self):
+        assert_equal(duration(90), 90)
+        assert_equal(duration('90'), 90)
+        assert_equal(duration('4h'), 4 * 60 * 60)
+        assert_equal(duration('1h 30m'), 90 * 60)
+        assert_equal(duration('1.5m'), 90)
+        assert_raises(ValueError, duration, '4 hours')
+        assert_raises(ValueError, duration, '')
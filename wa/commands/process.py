@@ -13,14 +13,18 @@
 # limitations under the License.
 #
 
+import hashlib
 import os
+from collections import defaultdict
+from multiprocessing import Pool
 
 from wa import Command
 from wa import discover_wa_outputs
 from wa.framework.exception import CommandError
-from wa.framework.output import RunOutput
+from wa.framework.output import ArtifactStore, RunOutput
 from wa.framework.output_processor import ProcessorManager
 from wa.utils import log
+from wa.utils.serializer import read_pod, write_pod, json
 
 
 class ProcessContext(object):
@@ -63,6 +67,14 @@ class ProcessCommand(Command):
                                  all of the previous runs contained within
                                  instead of just processing the root.
                                  """)
+        self.parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                                 help="""
+                                 Process up to N runs in parallel, each in a
+                                 separate process. Jobs within a run are
+                                 always processed by the same process, as
+                                 output processors may aggregate results
+                                 across jobs.
+                                 """)
 
     def execute(self, config, args):
         process_directory = os.path.expandvars(args.directory)
@@ -70,73 +82,221 @@ class ProcessCommand(Command):
         if not os.path.exists(process_directory):
             msg = 'Path `{}` does not exist, please specify a valid path.'
             raise CommandError(msg.format(process_directory))
+        if args.jobs < 1:
+            raise CommandError('Number of jobs must be at least 1.')
         if not args.recursive:
             output_list = [RunOutput(process_directory)]
         else:
             output_list = [output for output in discover_wa_outputs(process_directory)]
 
+        if args.jobs == 1 or len(output_list) < 2:
+            for run_output in output_list:
+                self.process_run(config, args, run_output)
+            return
+
+        global _worker_state  # pylint: disable=global-statement
+        _worker_state = (self, config, args, output_list)
+        # A fresh process is used for each run, so that each run's log file
+        # only gets the messages for that run.
+        pool = Pool(min(args.jobs, len(output_list)), maxtasksperchild=1)
+        try:
+            results = pool.map(_process_run_in_worker, range(len(output_list)), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+            _worker_state = None
+
+        failed = [o.basepath for o, ok in zip(output_list, results) if not ok]
+        if failed:
+            raise CommandError('Failed to process: {}'.format(', '.join(failed)))
+
+    def process_run(self, config, args, run_output):
         pc = ProcessContext()
-        for run_output in output_list:
-            if not args.recursive:
-                self.logger.info('Installing output processors')
-            else:
-                self.logger.info('Install output processors for run in path `{}`'
-                                 .format(run_output.basepath))
-
-            logfile = os.path.join(run_output.basepath, 'process.log')
-            i = 0
-            while os.path.exists(logfile):
-                i += 1
-                logfile = os.path.join(run_output.basepath, 'process-{}.log'.format(i))
-            log.add_file(logfile)
-
-            pm = ProcessorManager(loader=config.plugin_cache)
-            for proc in config.get_processors():
-                pm.install(proc, None)
-            if args.additional_processors:
-                for proc in args.additional_processors:
-                    # Do not add any processors that are already present since
-                    # duplicate entries do not get disabled.
-                    try:
-                        pm.get_output_processor(proc)
-                    except ValueError:
-                        pm.install(proc, None)
-
-            pm.validate()
-            pm.initialize()
-
-            pc.run_output = run_output
-            pc.target_info = run_output.target_info
-            for job_output in run_output.jobs:
-                pc.job_output = job_output
-                pm.enable_all()
-                if not args.force:
-                    for augmentation in job_output.spec.augmentations:
-                        try:
-                            pm.disable(augmentation)
-                        except ValueError:
-                            pass
-
-                msg = 'Processing job {} {} iteration {}'
-                self.logger.info(msg.format(job_output.id, job_output.label,
-                                            job_output.iteration))
-                pm.process_job_output(pc)
-                pm.export_job_output(pc)
+        if not args.recursive:
+            self.logger.info('Installing output processors')
+        else:
+            self.logger.info('Install output processors for run in path `{}`'
+                             .format(run_output.basepath))
+
+        logfile = os.path.join(run_output.basepath, 'process.log')
+        i = 0
+        while os.path.exists(logfile):
+            i += 1
+            logfile = os.path.join(run_output.basepath, 'process-{}.log'.format(i))
+        log.add_file(logfile)
+
+        pm = ProcessorManager(loader=config.plugin_cache,
+                              threads=config.run_config.processor_threads)
+        for proc in config.get_processors():
+            pm.install(proc, None)
+        if args.additional_processors:
+            for proc in args.additional_processors:
+                # Do not add any processors that are already present since
+                # duplicate entries do not get disabled.
+                try:
+                    pm.get_output_processor(proc)
+                except ValueError:
+                    pm.install(proc, None)
+
+        pm.validate()
+
+        fingerprints = ProcessingFingerprints(run_output)
+        job_procs = {}
+        run_procs = self._get_processors(pm, run_output.augmentations, args.force)
+        stale = set()
+        for job_output in run_output.jobs:
+            procs = self._get_processors(pm, job_output.spec.augmentations, args.force)
+            job_procs[job_output] = procs
+            for proc in procs:
+                if args.force or not fingerprints.is_current(job_output, proc):
+                    stale.add(proc)
+        for proc in run_procs:
+            if args.force or not fingerprints.is_current(run_output, proc):
+                stale.add(proc)
+
+        if not stale:
+            self.logger.info('Output is up to date; nothing to process.')
+            return
+        self.logger.debug('Processors to run: {}'.format(
+            ', '.join(p.name for p in pm.processors if p in stale)))
+
+        pm.initialize()
+
+        # Artifacts shared with an artifact store must not be modified in
+        # place.
+        run_output.unshare_artifacts()
+        for job_output in run_output.jobs:
+            job_output.unshare_artifacts()
+
+        pc.run_output = run_output
+        pc.target_info = run_output.target_info
+        # Processors that raised an error are not recorded as having
+        # processed the output, so that they are retried next time.
+        failed = defaultdict(set)
+        for job_output in run_output.jobs:
+            pc.job_output = job_output
+            pm.disable_all()
+            pm.enable([p for p in job_procs[job_output] if p in stale])
+            if not pm.get_enabled():
+                continue
+
+            msg = 'Processing job {} {} iteration {}'
+            self.logger.info(msg.format(job_output.id, job_output.label,
+                                        job_output.iteration))
+            failed[job_output].update(pm.process_job_output(pc))
+            failed[job_output].update(pm.export_job_output(pc))
+
+            job_output.write_result()
+
+        pm.disable_all()
+        pm.enable([p for p in run_procs if p in stale])
+
+        self.logger.info('Processing run')
+        failed[run_output].update(pm.process_run_output(pc))
+        failed[run_output].update(pm.export_run_output(pc))
+        pm.finalize()
 
+        if config.settings.artifact_store:
+            store = ArtifactStore(config.settings.artifact_store,
+                                  link=config.settings.artifact_store_link,
+                                  owner=str(run_output.info.uuid))
+            run_output.set_artifact_store(store)
+            for job_output in run_output.jobs:
+                job_output.store_artifacts()
                 job_output.write_result()
+            run_output.store_artifacts()
+        run_output.write_result()
+
+        for job_output in run_output.jobs:
+            fingerprints.update(job_output, [p for p in job_procs[job_output]
+                                             if p not in failed[job_output]])
+        fingerprints.update(run_output, [p for p in run_procs if p not in failed[run_output]])
+        fingerprints.write()
+        self.logger.info('Done.')
+
+    def _get_processors(self, pm, augmentations, force):
+        # Unless forced, processors that were enabled for the original run
+        # have already been applied to its output.
+        if force:
+            return list(pm.processors)
+        return [p for p in pm.processors if p.name not in augmentations]
+
+
+class ProcessingFingerprints(object):
+    """
+    Keeps track of the state of job and run outputs as it was after they were
+    last processed by each output processor, so that processing can be
+    skipped if neither the output's artifacts nor the processor's
+    configuration have changed since.
+
+    A fingerprint covers the processor's name and parameter values, and the
+    name, path, size and modification time of each of the output's artifacts.
+
+    """
+
+    def __init__(self, run_output):
+        self.filepath = os.path.join(run_output.metadir, 'processed.json')
+        self.run_output = run_output
+        if os.path.isfile(self.filepath):
+            self.records = read_pod(self.filepath)
+        else:
+            self.records = {}
+
+    def is_current(self, output, processor):
+        key = self._get_key(output)
+        recorded = self.records.get(key, {}).get(processor.name)
+        return recorded == self.get_fingerprint(output, processor)
+
+    def update(self, output, processors):
+        entry = self.records.setdefault(self._get_key(output), {})
+        for proc in processors:
+            entry[proc.name] = self.get_fingerprint(output, proc)
+
+    def write(self):
+        write_pod(self.records, self.filepath)
+
+    @staticmethod
+    def get_fingerprint(output, processor):
+        digest = hashlib.sha256()
+        config = json.dumps(processor.get_config(), sort_keys=True)
+        digest.update('{}\n{}\n'.format(processor.name, config).encode('utf-8'))
+        for artifact in sorted(output.artifacts, key=lambda a: (a.path, a.name)):
+            path = output.get_path(artifact.path)
+            for filepath, size, mtime in _stat_tree(path):
+                relpath = os.path.relpath(filepath, output.basepath)
+                entry = '{}\t{}\t{}\t{}\n'.format(artifact.name, relpath, size, mtime)
+                digest.update(entry.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _get_key(self, output):
+        if output is self.run_output:
+            return '__run__'
+        return os.path.relpath(output.basepath, self.run_output.basepath)
+
+
+def _stat_tree(path):
+    if not os.path.isdir(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return [(path, None, None)]
+        return [(path, stat.st_size, stat.st_mtime)]
+    entries = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            entries.extend(_stat_tree(os.path.join(root, filename)))
+    return entries
+
+
+_worker_state = None
+
 
-            pm.enable_all()
-            if not args.force:
-                for augmentation in run_output.augmentations:
-                    try:
-                        pm.disable(augmentation)
-                    except ValueError:
-                        pass
-
-            self.logger.info('Processing run')
-            pm.process_run_output(pc)
-            pm.export_run_output(pc)
-            pm.finalize()
-
-            run_output.write_result()
-            self.logger.info('Done.')
+def _process_run_in_worker(index):
+    command, config, args, output_list = _worker_state
+    try:
+        command.process_run(config, args, output_list[index])
+    except Exception as e:  # pylint: disable=broad-except
+        log.log_error(e, command.logger)
+        return False
+    return True
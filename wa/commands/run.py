@@ -15,6 +15,7 @@
 
 
 import os
+import re
 import sys
 import shutil
 
@@ -23,9 +24,10 @@ from wa import Command, settings
 from wa.framework import pluginloader
 from wa.framework.configuration.parsers import AgendaParser
 from wa.framework.execution import Executor
-from wa.framework.output import init_run_output
+from wa.framework.output import init_run_output, RunOutput
 from wa.framework.exception import NotFoundError, ConfigError
 from wa.utils import log
+from wa.utils.serializer import write_pod
 from wa.utils.types import toggle_set
 
 
@@ -38,7 +40,7 @@ class RunCommand(Command):
     '''
 
     def initialize(self, context):
-        self.parser.add_argument('agenda', metavar='AGENDA',
+        self.parser.add_argument('agenda', metavar='AGENDA', nargs='?',
                                  help="""
                                  Agenda for this workload automation run. This
                                  defines which workloads will be executed, how
@@ -83,9 +85,43 @@ class RunCommand(Command):
                                  might then forget to revert).  This option may
                                  be specified multiple times.
                                  """)
+        self.parser.add_argument('--resume', metavar='DIR', default=None,
+                                 help="""
+                                 Resume an interrupted run whose output is in
+                                 the specified directory. The agenda and config
+                                 files saved in that directory will be used (so
+                                 an agenda must not be specified). Jobs that
+                                 have completed with status OK or PARTIAL will
+                                 not be run again; other jobs will be re-run
+                                 (failed ones subject to max_retries), and their
+                                 results added to the existing output. Other
+                                 options (e.g. --disable) are not saved with
+                                 the run and so must be specified again.
+                                 """)
+        self.parser.add_argument('--budget', metavar='DURATION', default=None,
+                                 help="""
+                                 Plan the run to fit within the specified time
+                                 (e.g. "4h" or "90m"), skipping iterations that
+                                 are not expected to fit, based on the job
+                                 durations of previous runs. This overrides the
+                                 time_budget setting.
+                                 """)
+        self.parser.add_argument('--refresh-target-info', action='store_true', default=False,
+                                 help="""
+                                 Collect information about the target, rather
+                                 than using information cached by a previous
+                                 run on the same device.
+                                 """)
 
     def execute(self, config, args):
-        output = self.set_up_output_directory(config, args)
+        if args.resume:
+            if args.agenda:
+                raise ConfigError('An agenda cannot be specified when resuming a run.')
+            output = self.set_up_resumed_output(args.resume)
+        elif args.agenda:
+            output = self.set_up_output_directory(config, args)
+        else:
+            raise ConfigError('Please specify an agenda, or a run to --resume.')
         log.add_file(output.logfile)
 
         disabled_augmentations = toggle_set([i != '~~' and "~{}".format(i) or i
@@ -94,7 +130,9 @@ class RunCommand(Command):
         config.jobs_config.only_run_ids(args.only_run_ids)
 
         parser = AgendaParser()
-        if os.path.isfile(args.agenda):
+        if args.resume:
+            self.load_resumed_config(config, parser, output)
+        elif os.path.isfile(args.agenda):
             parser.load_from_path(config, args.agenda)
             shutil.copy(args.agenda, output.raw_config_dir)
         else:
@@ -102,14 +140,53 @@ class RunCommand(Command):
                 pluginloader.get_plugin_class(args.agenda, kind='workload')
                 agenda = {'workloads': [{'name': args.agenda}]}
                 parser.load(config, agenda, 'CMDLINE_ARGS')
+                # Saved so that the run may be resumed.
+                write_pod(agenda, os.path.join(output.raw_config_dir, 'agenda.yaml'))
             except NotFoundError:
                 msg = 'Agenda file "{}" does not exist, and there no workload '\
                       'with that name.\nYou can get a list of available '\
                       'by running "wa list workloads".'
                 raise ConfigError(msg.format(args.agenda))
 
+        if args.budget:
+            config.run_config.set('time_budget', args.budget)
+        if args.refresh_target_info:
+            config.run_config.set('refresh_target_info', True)
+
         executor = Executor()
-        executor.execute(config, output)
+        executor.execute(config, output, resume=bool(args.resume))
+
+    def set_up_resumed_output(self, path):
+        self.logger.debug('Resuming run in: {}'.format(path))
+        try:
+            output = RunOutput(path)
+        except ValueError as e:
+            raise ConfigError(e)
+        if not os.path.isdir(output.raw_config_dir):
+            msg = 'Cannot resume run in "{}": configuration was not saved.'
+            raise ConfigError(msg.format(path))
+        return output
+
+    def load_resumed_config(self, config, parser, output):
+        config_files = []
+        agendas = []
+        for name in os.listdir(output.raw_config_dir):
+            match = re.match(r'cfg(\d+)-(.*)', name)
+            if match:
+                config_files.append((int(match.group(1)), match.group(2), name))
+            else:
+                agendas.append(name)
+        if len(agendas) != 1:
+            msg = 'Cannot resume run in "{}": could not identify the agenda.'
+            raise ConfigError(msg.format(output.basepath))
+
+        # Config files that have been loaded for this invocation (e.g. the
+        # user's config.yaml) are not loaded again.
+        loaded = set(os.path.basename(s) for s in config.loaded_config_sources)
+        for _, basename, name in sorted(config_files):
+            if basename not in loaded:
+                config.load_config_file(os.path.join(output.raw_config_dir, name))
+        parser.load_from_path(config, os.path.join(output.raw_config_dir, agendas[0]))
 
     def set_up_output_directory(self, config, args):
         if args.output_directory:
@@ -0,0 +1,174 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Estimation of the offset between the host's clock and clocks on the target,
+so that timestamps from the two can be placed on a single timeline.
+
+The target's clock is read a number of times, and the host time at which
+each reading was taken is assumed to be half-way between sending the command
+and receiving its output. As with NTP, only the reading with the shortest
+round trip is used, as it has the least room for error. Estimates are made
+at the start and end of each job's execution, and the drift between the two
+clocks is taken from the change in offset.
+
+"""
+import re
+import time
+from collections import OrderedDict
+
+from wa.framework.exception import HostError, TargetError
+from wa.utils.serializer import read_pod
+
+
+# Commands printing the current time of each clock that can be synchronised,
+# in seconds, as the first field of their output.
+CLOCK_COMMANDS = OrderedDict([
+    # The wall clock, as used by e.g. logcat.
+    ('realtime', 'date +%s.%N'),
+    # Time since boot, which approximates ftrace's default clock. This only
+    # has a resolution of 10ms.
+    ('uptime', 'cat /proc/uptime'),
+])
+
+# The number of times the clock is read for each estimate.
+DEFAULT_PROBES = 8
+
+TIMESTAMP_REGEX = re.compile(r'^\s*(\d+(?:\.\d+)?)')
+
+
+class ClockEstimate(object):
+    """
+    An estimate that, at host time ``host_time``, the target clock was
+    ``offset`` seconds ahead of the host's. ``rtt`` is the round trip time of
+    the reading it is based on; the estimate is accurate to half of that.
+
+    """
+
+    @staticmethod
+    def from_pod(pod):
+        return ClockEstimate(**pod)
+
+    def __init__(self, host_time, offset, rtt):
+        self.host_time = host_time
+        self.offset = offset
+        self.rtt = rtt
+
+    def to_pod(self):
+        return OrderedDict([('host_time', self.host_time), ('offset', self.offset),
+                            ('rtt', self.rtt)])
+
+    def __repr__(self):
+        return 'ClockEstimate({:.6f}, {:+.6f}, {:.6f})'.format(self.host_time,
+                                                               self.offset, self.rtt)
+
+
+def estimate_offset(target, clock='realtime', probes=DEFAULT_PROBES):
+    """Estimate the offset of the specified clock on the target from the host's."""
+    command = CLOCK_COMMANDS[clock]
+    best = None
+    for _ in range(probes):
+        sent = time.time()
+        output = target.execute(command)
+        received = time.time()
+        match = TIMESTAMP_REGEX.match(output)
+        if not match:
+            raise TargetError('Could not read {} clock; got "{}"'.format(clock, output.strip()))
+        host_time = (sent + received) / 2
+        estimate = ClockEstimate(host_time, float(match.group(1)) - host_time,
+                                 received - sent)
+        if best is None or estimate.rtt < best.rtt:
+            best = estimate
+    return best
+
+
+class ClockSync(object):
+    """
+    The relationship between a target clock and the host's, fitted to the
+    estimates made during a job. With more than one estimate, the offset is
+    assumed to change linearly (from the first to the last estimate) to
+    account for drift; timestamps outside that period are extrapolated.
+
+    Use ``to_host()`` and ``to_target()`` to map timestamps between the two.
+
+    """
+
+    @staticmethod
+    def from_pod(pod):
+        instance = ClockSync(pod['clock'])
+        instance.estimates = [ClockEstimate.from_pod(e) for e in pod['estimates']]
+        return instance
+
+    @property
+    def offset(self):
+        """The offset at the time of the first estimate."""
+        return self.estimates[0].offset
+
+    @property
+    def drift(self):
+        """The rate of change of the offset, in seconds per second."""
+        if len(self.estimates) < 2:
+            return 0.0
+        first, last = self.estimates[0], self.estimates[-1]
+        if last.host_time == first.host_time:
+            return 0.0
+        return float(last.offset - first.offset) / (last.host_time - first.host_time)
+
+    @property
+    def error(self):
+        """The maximum error of the estimates, in seconds."""
+        return max(e.rtt for e in self.estimates) / 2
+
+    def __init__(self, clock='realtime'):
+        self.clock = clock
+        self.estimates = []
+
+    def add(self, estimate):
+        self.estimates.append(estimate)
+
+    def to_target(self, host_time):
+        """Convert a timestamp of the host clock to the target clock."""
+        reference = self.estimates[0].host_time
+        return host_time + self.offset + self.drift * (host_time - reference)
+
+    def to_host(self, target_time):
+        """Convert a timestamp of the target clock to the host clock."""
+        reference = self.estimates[0].host_time
+        return (target_time - self.offset + self.drift * reference) / (1 + self.drift)
+
+    def to_pod(self):
+        return OrderedDict([
+            ('clock', self.clock),
+            ('offset', self.offset if self.estimates else None),
+            ('drift', self.drift),
+            ('error', self.error if self.estimates else None),
+            ('estimates', [e.to_pod() for e in self.estimates]),
+        ])
+
+
+def get_clock_sync(output, clock='realtime'):
+    """
+    Returns the ``ClockSync`` for the specified clock recorded in the job
+    output (or execution context), or ``None`` if it was not recorded.
+
+    """
+    try:
+        path = output.get_artifact_path('clock_sync')
+    except HostError:
+        return None
+    for pod in read_pod(path)['clocks']:
+        if pod['clock'] == clock:
+            return ClockSync.from_pod(pod)
+    return None
@@ -17,12 +17,15 @@ import re
 from copy import copy, deepcopy
 from collections import OrderedDict, defaultdict
 
+from past.builtins import basestring
+
+from wa.framework.clocksync import CLOCK_COMMANDS
 from wa.framework.exception import ConfigError, NotFoundError
 from wa.framework.configuration.tree import SectionNode
 from wa.utils import log
 from wa.utils.misc import (get_article, merge_config_values)
 from wa.utils.types import (identifier, integer, boolean, list_of_strings,
-                            list_of, toggle_set, obj_dict, enum)
+                            list_of, toggle_set, obj_dict, enum, duration)
 from wa.utils.serializer import is_pod
 
 
@@ -105,6 +108,91 @@ class RebootPolicy(object):
         return self.policy
 
 
+class ConvergenceCriteria(object):
+    """
+    Specifies when to stop scheduling iterations of a job spec whose iteration
+    count is adaptive. Iterations are added until the confidence interval of
+    the mean of ``metric`` is narrow enough, or a limit is reached. This may be
+    specified as just the name of the metric, or as a dict with the following
+    keys:
+
+    :metric: The name of the metric that must converge (mandatory).
+    :threshold: The largest acceptable half-width of the confidence interval,
+                relative to the mean. Defaults to ``0.05`` (i.e. +/-5%).
+    :confidence: The confidence level of the interval; one of ``0.9``,
+                 ``0.95`` (the default) or ``0.99``.
+    :max_iterations: Stop after this many iterations, even if the metric has
+                     not converged. Defaults to ``20``.
+    :max_duration: Stop once this many seconds have passed since the first
+                   iteration started. Unlimited by default.
+    :warmup: The number of initial iterations whose results are discarded.
+             Defaults to ``0``.
+    :exclude_outliers: Outliers are always flagged; if this is ``True``, they
+                       are also excluded from the statistics.
+
+    The spec's ``iterations`` is the minimum number of iterations that will be
+    run.
+
+    """
+
+    defaults = OrderedDict([
+        ('metric', None),
+        ('threshold', 0.05),
+        ('confidence', 0.95),
+        ('max_iterations', 20),
+        ('max_duration', None),
+        ('warmup', 0),
+        ('exclude_outliers', False),
+    ])
+
+    valid_confidence = [0.9, 0.95, 0.99]
+
+    @staticmethod
+    def from_pod(pod):
+        return ConvergenceCriteria(pod)
+
+    def __init__(self, criteria):
+        if isinstance(criteria, ConvergenceCriteria):
+            criteria = criteria.to_pod()
+        elif isinstance(criteria, basestring):
+            criteria = {'metric': criteria}
+        elif not isinstance(criteria, dict):
+            raise ConfigError('Convergence criteria must be a metric name or a dict; '
+                              'got "{}"'.format(criteria))
+        criteria = dict(criteria)
+        unknown = set(criteria) - set(self.defaults)
+        if unknown:
+            msg = 'Unknown convergence criteria: {}'
+            raise ConfigError(msg.format(', '.join(sorted(unknown))))
+        for name, default in self.defaults.items():
+            setattr(self, name, criteria.get(name, default))
+
+        if not self.metric:
+            raise ConfigError('Convergence criteria must specify a "metric"')
+        self.threshold = float(self.threshold)
+        if self.threshold <= 0:
+            raise ConfigError('Convergence threshold must be positive')
+        self.confidence = float(self.confidence)
+        if self.confidence not in self.valid_confidence:
+            msg = 'Convergence confidence must be one of {}'
+            raise ConfigError(msg.format(', '.join(map(str, self.valid_confidence))))
+        self.max_iterations = integer(self.max_iterations)
+        if self.max_duration is not None:
+            self.max_duration = duration(self.max_duration)
+        self.warmup = integer(self.warmup)
+        if self.warmup < 0:
+            raise ConfigError('Convergence warmup cannot be negative')
+        self.exclude_outliers = boolean(self.exclude_outliers)
+
+    def to_pod(self):
+        return OrderedDict((name, getattr(self, name)) for name in self.defaults)
+
+    def __str__(self):
+        return '{} +/-{:g}%'.format(self.metric, self.threshold * 100)
+
+    __repr__ = __str__
+
+
 class status_list(list):
 
     def append(self, item):
@@ -355,7 +443,7 @@ class Configuration(object):
         for cfg_point in cls.config_points:
             if cfg_point.name in pod:
                 value = pod.pop(cfg_point.name)
-                if hasattr(cfg_point.kind, 'from_pod'):
+                if value is not None and hasattr(cfg_point.kind, 'from_pod'):
                     value = cfg_point.kind.from_pod(value)
                 cfg_point.set_value(instance, value)
         if pod:
@@ -466,6 +554,32 @@ class MetaConfiguration(Configuration):
             A list of additional paths to scan for plugins.
             """,
         ),
+        ConfigurationPoint(
+            'artifact_store',
+            kind=str,
+            description="""
+            Path to a content-addressed artifact store. If this is set, files
+            and directories added as artifacts to run and job outputs will
+            be de-duplicated into this location, and the copies inside the
+            output directory will be replaced with links to the stored
+            objects. This can significantly reduce disk usage when the same
+            files (e.g. APKs, traces or target info) are collected across many
+            jobs and runs.
+            """,
+        ),
+        ConfigurationPoint(
+            'artifact_store_link',
+            kind=str,
+            default='hardlink',
+            allowed_values=['hardlink', 'reflink'],
+            description="""
+            How artifacts are linked back into the output directory from the
+            artifact store. ``reflink`` requires a file system that supports
+            copy-on-write clones (e.g. btrfs or XFS). If linking is not
+            possible (e.g. the store is on a different file system), the
+            object will be copied instead.
+            """,
+        ),
     ]
     configuration = {cp.name: cp for cp in config_points}
 
@@ -489,6 +603,10 @@ class MetaConfiguration(Configuration):
     def additional_packages_file(self):
         return os.path.join(self.user_directory, 'packages')
 
+    @property
+    def cache_directory(self):
+        return os.path.join(self.user_directory, 'cache')
+
     def __init__(self, environ=os.environ):
         super(MetaConfiguration, self).__init__()
         user_directory = environ.pop('WA_USER_DIRECTORY', '')
@@ -547,7 +665,8 @@ class RunConfiguration(Configuration):
             'execution_order',
             kind=str,
             default='by_iteration',
-            allowed_values=['by_iteration', 'by_section', 'by_workload', 'random'],
+            allowed_values=['by_iteration', 'by_section', 'by_workload', 'by_cost',
+                            'random'],
             description='''
             Defines the order in which the agenda spec will be executed. At the
             moment, the following execution orders are supported:
@@ -578,6 +697,19 @@ class RunConfiguration(Configuration):
 
                         X.A1, X.A2, Y.A1, Y.A2, X.B1, X.B2, Y.B1, Y.B2
 
+            ``"by_cost"``
+                Same as ``"by_iteration"`` in that each iteration of every spec
+                is executed before moving on to the next iteration, however,
+                within an iteration, specs are ordered to minimise the
+                estimated cost of reconfiguring the target between them (taking
+                into account the workload and its package, runtime and boot
+                parameters, enabled augmentations and the reboot policy). An
+                iteration starts with the spec that ended the previous one
+                where possible. E.g. if X.A and Y.B share runtime parameters,
+                as do X.B and Y.A, this will run ::
+
+                        X.A1, Y.A1, X.B1, Y.B1, Y.B2, X.B2, Y.A2, X.A2
+
             ``"random"``
                 Execution order is entirely random.
             ''',
@@ -621,6 +753,31 @@ class RunConfiguration(Configuration):
             setup.
             ''',
         ),
+        ConfigurationPoint(
+            'device_pool',
+            kind=list_of(dict),
+            description='''
+            A list of targets (of the type specified by ``device``) to execute
+            the run on in parallel. Each entry is a dict of ``device_config``
+            values that will be applied on top of the common ``device_config``
+            for that target (e.g. ``host`` or ``device`` identifying the
+            board), and may optionally include a ``name`` for the target.
+
+            Jobs are dispatched from a shared queue to whichever target
+            becomes available next, and the results from all targets are
+            merged into a single output directory, with a ``target`` classifier
+            identifying where each job ran. Output processing is performed
+            once execution on all targets has completed. Per-target logs and
+            target information can be found under ``__targets``. Each target
+            only loads the workloads for the jobs it runs (as with
+            ``defer_workload_loading``). ``time_budget`` and
+            ``prefetch_resources`` cannot be used with a pool.
+
+            .. note:: All targets in the pool are expected to be identical;
+                      target information of the first one is used for the
+                      run as a whole.
+            ''',
+        ),
         ConfigurationPoint(
             'retry_on_status',
             kind=list_of(Status),
@@ -683,6 +840,191 @@ class RunConfiguration(Configuration):
             This can be used to minimise the risk of accidentally running such
             workloads when testing confidential devices.
             '''),
+        ConfigurationPoint(
+            'processor_threads',
+            kind=int,
+            description='''
+            The maximum number of output processors that will be run at the
+            same time. Only processors that declare themselves ``concurrent``
+            are run in parallel, and metrics and artifacts they add are always
+            merged into the output in processor order. If not set, this
+            defaults to the number of CPUs on the host. Setting this to ``1``
+            runs all output processors sequentially.
+            '''),
+        ConfigurationPoint(
+            'pipeline_output_processing',
+            kind=int,
+            default=0,
+            description='''
+            If set to a value greater than ``0``, job output processing for
+            output processors that only operate on the host (i.e. whose job
+            output methods are marked ``@hostside``) will be performed in the
+            background while subsequent jobs are executing. The value
+            specifies how many jobs may be waiting to be processed before
+            execution of the next job is held up. Run output processing
+            always waits for all pending job output processing to complete.
+
+            .. note:: Processors that are not host-side will be run before
+                      host-side ones for each job, so they should not rely on
+                      results added by host-side processors.
+            '''),
+        ConfigurationPoint(
+            'prefetch_resources',
+            kind=int,
+            default=0,
+            description='''
+            If set to a value greater than ``0``, host-side resources (e.g.
+            APKs) needed by this many upcoming jobs will be resolved in the
+            background while the current job is being initialized or
+            executed. Resolved resources are cached for the duration of the
+            run, so each resource is only looked up once. This has no effect
+            if ``defer_workload_loading`` is enabled, as workloads are then
+            only loaded just before they are run.
+            '''),
+        ConfigurationPoint(
+            'defer_workload_loading',
+            kind=bool,
+            default=False,
+            description='''
+            If set to ``True``, workloads are only checked for configuration
+            errors when jobs are generated, and are loaded (including the
+            resolution of their resources) and initialized just before the
+            first job for their spec is run. Once the last job for a spec has
+            completed, its workload is finalized and released. This speeds up
+            the start of runs with large agendas and reduces memory usage,
+            but means that errors during workload initialization are only
+            reported when the spec is reached.
+            '''),
+        ConfigurationPoint(
+            'record_phase_timings',
+            kind=bool,
+            default=False,
+            description='''
+            If set to ``True``, the duration of every phase of the run (e.g.
+            target configuration, workload setup, execution and teardown,
+            output processing) and of every instrument callback will be
+            recorded for each job. Timings are written to
+            ``__meta/timings.json`` and a summary, showing how much of each
+            job's time was spent executing the workload versus in framework
+            overhead, is logged at the end of the run.
+            '''),
+        ConfigurationPoint(
+            'time_budget',
+            kind=duration,
+            description='''
+            If specified, the run is planned to fit within this time (e.g.
+            ``"4h"``, ``"90m"``, or a number of seconds). The duration of each
+            job is estimated from previous runs (see ``duration_history``);
+            iterations are chosen a round at a time (the first iteration of
+            every spec, then the second, and so on), and jobs that do not fit
+            are skipped. Skipped jobs are reported with status ``SKIPPED``.
+            '''),
+        ConfigurationPoint(
+            'duration_history',
+            kind=list_of_strings,
+            description='''
+            Directories containing the outputs of previous runs, used to
+            estimate job durations when a ``time_budget`` is specified. These
+            are searched recursively. By default, only the outputs directly
+            inside the directory containing the output of this run are used
+            (i.e. its siblings). Durations are summarised in an index in the
+            WA cache directory, so each output is only read once.
+            '''),
+        ConfigurationPoint(
+            'cache_target_info',
+            kind=bool,
+            default=True,
+            description='''
+            If set to ``True``, information about the target (CPUs, kernel,
+            OS, etc) is saved in the WA cache directory and re-used by later
+            runs on the same device, rather than being collected at the start
+            of every run. Before being used, cached information is validated
+            against the target's kernel, build and CPU topology, and is
+            collected again if any of these have changed. Information that
+            may change without these changing (whether the target is rooted,
+            scheduler features, and, on Android, the screen resolution and
+            system properties) is not cached, and is collected for every run.
+            '''),
+        ConfigurationPoint(
+            'refresh_target_info',
+            kind=bool,
+            default=False,
+            description='''
+            If set to ``True``, cached target information is not used, and is
+            replaced with newly collected information (see
+            ``cache_target_info``).
+            '''),
+        ConfigurationPoint(
+            'cache_deployments',
+            kind=bool,
+            default=True,
+            description='''
+            If set to ``True``, executables installed by plugins and workload
+            assets are only pushed to the target if they are not already
+            there, as determined by comparing their checksums with those of
+            the host's files. A manifest of the files deployed to each device
+            is kept in the WA cache directory, so that they can be checked
+            quickly by later runs.
+            '''),
+        ConfigurationPoint(
+            'heartbeat_period',
+            kind=duration,
+            description='''
+            If specified, the target is checked to be responsive at this
+            interval (e.g. ``"10s"``) while jobs are running, by a process
+            run on it in the background that prints a line every period. If
+            the target stops responding, the job fails at the next phase
+            boundary, and the target is recovered (or the run aborted)
+            according to the ``reboot_policy``. If the job is blocked waiting
+            on the target, it is interrupted rather than waiting for the
+            command being executed to time out. The duration of each check
+            is recorded in the phase timings (see ``record_phase_timings``),
+            so that checks overlapping measurements can be identified.
+            '''),
+        ConfigurationPoint(
+            'heartbeat_timeout',
+            kind=duration,
+            default=5,
+            description='''
+            The time, in seconds, by which a line from the target's
+            heartbeat process (see ``heartbeat_period``) may be late before
+            the check is considered to have failed. The target is considered
+            unresponsive after two consecutive failed checks.
+            '''),
+        ConfigurationPoint(
+            'quiet_execution',
+            kind=bool,
+            default=False,
+            description='''
+            If set to ``True``, the execution of each workload is a "quiet
+            window", during which the framework avoids interacting with the
+            target, so as not to disturb measurements: logcat polling and
+            heartbeat checks are suspended, and other non-essential
+            interactions are deferred until the workload has completed.
+            Every call made to the target during the window is recorded in
+            the job's ``quiet_window.json``, and a warning is logged if any
+            were not declared as necessary. Calls made by instruments are
+            always declared.
+
+            .. note:: As logcat polling is suspended, lines may be lost if
+                      the target's logcat buffer fills up during the
+                      window; the ``logcat_stream`` option of the target's
+                      assistant avoids this.
+            '''),
+        ConfigurationPoint(
+            'clock_sync',
+            kind=list_of_strings,
+            allowed_values=list(CLOCK_COMMANDS),
+            description='''
+            Target clocks whose offset from the host clock should be
+            estimated at the start and end of each job's execution, so that
+            timestamps from the target and host can be aligned. ``realtime``
+            is the target's wall clock; ``uptime`` is the time since boot
+            (the clock used by e.g. the ``file_poller`` instrument). The
+            results are written to the job's ``clock_sync.json``; use
+            ``wa.framework.clocksync.get_clock_sync()`` to map timestamps
+            between the host and the target.
+            '''),
     ]
     configuration = {cp.name: cp for cp in config_points + meta_data}
 
@@ -733,6 +1075,18 @@ class JobSpec(Configuration):
                            description='''
                            How many times to repeat this workload spec
                            '''),
+        ConfigurationPoint('convergence', kind=ConvergenceCriteria,
+                           description='''
+                           If specified, the number of iterations is adaptive:
+                           after ``iterations`` have been run, more will be
+                           scheduled until the confidence interval of the mean
+                           of a metric is within a threshold, or a limit is
+                           reached. This is either the name of the metric, or
+                           a dict with ``metric`` and, optionally,
+                           ``threshold``, ``confidence``, ``max_iterations``,
+                           ``max_duration``, ``warmup`` and
+                           ``exclude_outliers`` entries.
+                           '''),
         ConfigurationPoint('workload_name', kind=str, mandatory=True,
                            aliases=["name"],
                            description='''
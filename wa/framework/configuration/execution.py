@@ -1,3 +1,4 @@
+import logging
 import random
 from itertools import groupby, chain
 
@@ -12,6 +13,9 @@ from wa.framework.job import Job
 from wa.utils import log
 
 
+logger = logging.getLogger('config')
+
+
 class CombinedConfig(object):
 
     @staticmethod
@@ -117,10 +121,16 @@ class ConfigManager(object):
     def generate_jobs(self, context):
         job_specs = self.jobs_config.generate_job_specs(context.tm)
         exec_order = self.run_config.execution_order
+        deferred = self.run_config.defer_workload_loading
+        validated = set()
         log.indent()
-        for spec, i in permute_iterations(job_specs, exec_order):
+        for spec, i in permute_iterations(job_specs, exec_order, self.run_config):
             job = Job(spec, i, context)
-            job.load(context.tm.target)
+            if not deferred:
+                job.load(context.tm.target)
+            elif spec.id not in validated:
+                job.validate_workload(context.tm.target)
+                validated.add(spec.id)
             self._jobs.append(job)
             context.run_state.add_job(job)
         log.dedent()
@@ -205,16 +215,102 @@ def permute_randomly(specs):
         yield t
 
 
+# Relative costs of the reconfiguration that may be needed when switching
+# from one job spec to another.
+TRANSITION_COSTS = {
+    'spec': 1,  # job setup with a different spec
+    'workload': 10,  # different workload or package (install, initialization)
+    'runtime_parameter': 5,  # per runtime parameter that needs to be changed
+    'augmentation': 2,  # per instrument or output processor toggled
+    'reboot': 100,  # changed boot parameters, or reboot_on_each_spec
+}
+
+
+def get_transition_cost(prev, spec, reboot_policy=None):
+    """
+    Estimate the cost of running ``spec`` immediately after ``prev`` (either
+    may be ``None``, e.g. at the start of the run), in units of
+    ``TRANSITION_COSTS``.
+
+    """
+    if prev is None or spec is None or prev is spec:
+        return 0
+    cost = TRANSITION_COSTS['spec']
+    if reboot_policy is not None and reboot_policy.reboot_on_each_spec:
+        cost += TRANSITION_COSTS['reboot']
+    elif dict(prev.boot_parameters) != dict(spec.boot_parameters):
+        cost += TRANSITION_COSTS['reboot']
+    if _get_package(prev) != _get_package(spec):
+        cost += TRANSITION_COSTS['workload']
+    prev_params, params = prev.runtime_parameters, spec.runtime_parameters
+    for name in set(prev_params) | set(params):
+        if prev_params.get(name) != params.get(name):
+            cost += TRANSITION_COSTS['runtime_parameter']
+    toggled = set(prev.augmentations.values()) ^ set(spec.augmentations.values())
+    cost += len(toggled) * TRANSITION_COSTS['augmentation']
+    return cost
+
+
+def get_total_transition_cost(tuples, reboot_policy=None):
+    cost = 0
+    prev = None
+    for spec, _ in tuples:
+        cost += get_transition_cost(prev, spec, reboot_policy)
+        prev = spec
+    return cost
+
+
+def _get_package(spec):
+    params = spec.workload_parameters or {}
+    return (spec.workload_name, params.get('package_name'))
+
+
+def permute_by_cost(specs, reboot_policy=None):
+    """
+    Same as ``"by_iteration"`` in that all specs' ``n``\ th iterations are
+    executed before any ``n+1``\ th iteration, however, within each
+    iteration, specs are ordered so as to minimise the estimated cost of
+    reconfiguring the target between them (see ``get_transition_cost()``).
+    The ordering is greedy: the next spec is always the cheapest one to switch
+    to from the current spec, and each iteration starts with the spec that
+    ended the previous one where possible.
+
+    """
+    result = []
+    prev = None
+    iteration = 1
+    remaining = [s for s in specs if s.iterations >= iteration]
+    while remaining:
+        while remaining:
+            # min() returns the first of equal-cost specs, so ties keep agenda order.
+            spec = min(remaining, key=lambda s: get_transition_cost(prev, s, reboot_policy))
+            remaining.remove(spec)
+            result.append((spec, iteration))
+            prev = spec
+        iteration += 1
+        remaining = [s for s in specs if s.iterations >= iteration]
+
+    baseline = get_total_transition_cost(permute_by_iteration(specs), reboot_policy)
+    cost = get_total_transition_cost(result, reboot_policy)
+    logger.info('Estimated transition cost: {} ({} for "by_iteration", saving {})'.format(
+        cost, baseline, baseline - cost))
+    for t in result:
+        yield t
+
+
 permute_map = {
     'by_iteration': permute_by_iteration,
     'by_workload': permute_by_workload,
     'by_section': permute_by_section,
+    'by_cost': permute_by_cost,
     'random': permute_randomly,
 }
 
 
-def permute_iterations(specs, exec_order):
+def permute_iterations(specs, exec_order, run_config=None):
     if exec_order not in permute_map:
         msg = 'Unknown execution order "{}"; must be in: {}'
         raise ValueError(msg.format(exec_order, list(permute_map.keys())))
+    if exec_order == 'by_cost' and run_config is not None:
+        return permute_by_cost(specs, run_config.reboot_policy)
     return permute_map[exec_order](specs)
@@ -0,0 +1,213 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Tracking of job specs with an adaptive number of iterations. Each completed
+iteration contributes a value of the spec's convergence metric; once the
+confidence interval of the mean of those values is narrow enough (or a limit
+has been reached), no more iterations are scheduled.
+
+"""
+import math
+import time
+from collections import OrderedDict
+
+from wa.utils.doc import format_simple_table
+
+
+# Two-sided critical values of Student's t distribution for 1 to 30 degrees
+# of freedom. For more degrees of freedom, the value for 30 is used, which
+# slightly overestimates the width of the interval.
+T_VALUES = {
+    0.9: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+          1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+          1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750],
+}
+
+# Values further than this many inter-quartile ranges outside the quartiles
+# are considered outliers.
+OUTLIER_IQR_FACTOR = 1.5
+
+
+def t_value(confidence, dof):
+    values = T_VALUES[confidence]
+    return values[min(dof, len(values)) - 1]
+
+
+def mean(values):
+    return sum(values) / float(len(values))
+
+
+def stdev(values):
+    """Sample standard deviation."""
+    if len(values) < 2:
+        return 0.0
+    mu = mean(values)
+    return math.sqrt(sum((v - mu) ** 2 for v in values) / (len(values) - 1))
+
+
+def quantile(sorted_values, q):
+    position = (len(sorted_values) - 1) * q
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def find_outliers(values):
+    """
+    Returns the indices of ``values`` that lie outside Tukey's fences. At
+    least four values are needed for outliers to be identified.
+
+    """
+    if len(values) < 4:
+        return []
+    ordered = sorted(values)
+    q1 = quantile(ordered, 0.25)
+    q3 = quantile(ordered, 0.75)
+    margin = (q3 - q1) * OUTLIER_IQR_FACTOR
+    return [i for i, v in enumerate(values) if v < q1 - margin or v > q3 + margin]
+
+
+def relative_half_width(values, confidence):
+    """
+    Returns the half-width of the confidence interval of the mean of
+    ``values``, relative to the mean, or ``None`` if it cannot be
+    determined.
+
+    """
+    if len(values) < 2:
+        return None
+    mu = mean(values)
+    if not mu:
+        return None
+    half_width = t_value(confidence, len(values) - 1) * stdev(values) / math.sqrt(len(values))
+    return abs(half_width / mu)
+
+
+class ConvergenceTracker(object):
+    """
+    Collects the values of a spec's convergence metric from its completed
+    iterations, and decides whether another iteration should be scheduled.
+
+    """
+
+    @property
+    def samples(self):
+        """The values used for the statistics."""
+        values = self.values[self.criteria.warmup:]
+        if self.criteria.exclude_outliers:
+            outliers = set(find_outliers(values))
+            values = [v for i, v in enumerate(values) if i not in outliers]
+        return values
+
+    @property
+    def outliers(self):
+        """The iterations whose values are outliers."""
+        values = self.values[self.criteria.warmup:]
+        return [self.iterations[self.criteria.warmup + i] for i in find_outliers(values)]
+
+    @property
+    def half_width(self):
+        return relative_half_width(self.samples, self.criteria.confidence)
+
+    @property
+    def converged(self):
+        half_width = self.half_width
+        return half_width is not None and half_width <= self.criteria.threshold
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.criteria = spec.convergence
+        self.start_time = None
+        self.iterations = []
+        self.values = []
+        self.missing = 0
+        self.stop_reason = None
+
+    def start(self):
+        if self.start_time is None:
+            self.start_time = time.time()
+
+    def add(self, iteration, value):
+        self.iterations.append(iteration)
+        self.values.append(float(value))
+
+    def add_missing(self):
+        """Record an iteration that did not produce the metric."""
+        self.missing += 1
+
+    def needs_more(self, completed):
+        """
+        Returns ``True`` if another iteration should be scheduled, given that
+        ``completed`` iterations have been run. Once this returns ``False``,
+        ``stop_reason`` says why.
+
+        """
+        if self.stop_reason:
+            return False
+        if self.converged:
+            self.stop_reason = 'converged'
+        elif completed >= self.criteria.max_iterations:
+            self.stop_reason = 'max_iterations'
+        elif (self.criteria.max_duration is not None and
+              time.time() - self.start_time >= self.criteria.max_duration):
+            self.stop_reason = 'max_duration'
+        elif self.missing > self.criteria.max_iterations // 2:
+            self.stop_reason = 'missing_metric'
+        return self.stop_reason is None
+
+    def to_pod(self):
+        samples = self.samples
+        return OrderedDict([
+            ('id', self.spec.id),
+            ('criteria', self.criteria.to_pod()),
+            ('iterations', self.iterations),
+            ('values', self.values),
+            ('outliers', self.outliers),
+            ('missing', self.missing),
+            ('count', len(samples)),
+            ('mean', mean(samples) if samples else None),
+            ('stdev', stdev(samples) if samples else None),
+            ('half_width', self.half_width),
+            ('converged', self.converged),
+            ('stop_reason', self.stop_reason),
+        ])
+
+
+def format_convergence_summary(trackers):
+    rows = []
+    for tracker in trackers:
+        pod = tracker.to_pod()
+        rows.append((tracker.spec.id, tracker.criteria.metric, pod['count'],
+                     _format_value(pod['mean']), _format_percent(pod['half_width']),
+                     len(pod['outliers']), pod['stop_reason'] or '-'))
+    return format_simple_table(rows, headers=['spec', 'metric', 'n', 'mean', '+/-',
+                                              'outliers', 'stopped'],
+                               align='<<>>>><')
+
+
+def _format_value(value):
+    return '-' if value is None else '{:g}'.format(value)
+
+
+def _format_percent(value):
+    return '-' if value is None else '{:.1f}%'.format(value * 100)
@@ -15,25 +15,41 @@
 
 # pylint: disable=no-member
 
-import hashlib
 import logging
+import multiprocessing
 import os
+import random
 import shutil
+from collections import OrderedDict
 from copy import copy
 from datetime import datetime
 
+from future.moves.queue import Empty
+
 import wa.framework.signal as signal
-from wa.framework import instrument
+from wa.framework import instrument, profiling, quiet
+from wa.framework.clocksync import ClockSync, estimate_offset
+from wa.framework.convergence import ConvergenceTracker, format_convergence_summary
 from wa.framework.configuration.core import Status
 from wa.framework.exception import TargetError, HostError, WorkloadError,\
-                                   TargetNotRespondingError, TimeoutError
+                                   TargetNotRespondingError, TimeoutError,\
+                                   ExecutionError, ConfigError, ResourceError
 from wa.framework.job import Job
-from wa.framework.output import init_job_output
-from wa.framework.output_processor import ProcessorManager
-from wa.framework.resource import ResourceResolver
+from wa.framework.output import (init_job_output, init_run_output, ArtifactStore,
+                                 JobOutput, RunOutput)
+from wa.framework.planning import DurationIndex, plan_jobs
+from wa.framework.output_processor import (ProcessorManager, JobOutputPipeline,
+                                           ProcessingContext)
+from wa.framework.resource import ResourceResolver, ResourcePrefetcher
+from wa.framework.target.bulk import BulkPull
+from wa.framework.target.info import TargetInfoCache
 from wa.framework.target.manager import TargetManager
 from wa.utils import log
 from wa.utils.misc import merge_config_values, format_duration
+from wa.utils.serializer import write_pod
+
+
+logger = logging.getLogger('executor')
 
 
 class ExecutionContext(object):
@@ -105,18 +121,33 @@ class ExecutionContext(object):
         self.current_job = None
         self.successful_jobs = 0
         self.failed_jobs = 0
+        self.resumed_outputs = []
         self.run_interrupted = False
+        self.dispatcher = None
+        self.prefetcher = None
+        self.convergence = OrderedDict()
+        self.requested_pulls = OrderedDict()
 
     def start_run(self):
-        self.output.info.start_time = datetime.utcnow()
+        if self.output.info.start_time is None:  # may be set if resuming
+            self.output.info.start_time = datetime.utcnow()
         self.output.write_info()
         self.job_queue = copy(self.cm.jobs)
         self.completed_jobs = []
+        # Workloads are what resources are prefetched for, so there is nothing
+        # to prefetch if they are only loaded just before they are run.
+        if self.cm.run_config.prefetch_resources and \
+                not self.cm.run_config.defer_workload_loading:
+            self.resolver.enable_cache()
+            self.prefetcher = ResourcePrefetcher(self.resolver)
+            self.prefetcher.start()
         self.run_state.status = Status.STARTED
         self.output.status = Status.STARTED
         self.output.write_state()
 
     def end_run(self):
+        if self.prefetcher:
+            self.prefetcher.stop()
         if self.successful_jobs:
             if self.failed_jobs:
                 status = Status.PARTIAL
@@ -136,22 +167,62 @@ class ExecutionContext(object):
     def finalize(self):
         self.tm.finalize()
 
+    def claim_next_job(self):
+        """
+        When executing on a pool of targets, the jobs run on this target are
+        allocated by a dispatcher shared with the other targets. Rearrange
+        the job queue so that it starts with the next job allocated to this
+        target. Returns ``False`` if there are no more jobs to run.
+
+        """
+        if self.dispatcher is None or not self.job_queue:
+            return bool(self.job_queue)
+        if self.job_queue[0].retries:
+            # Retries of jobs that have already been allocated to this target.
+            return True
+        while True:
+            index = self.dispatcher.next_index(len(self.cm.jobs))
+            if index is None:
+                self.job_queue = []
+                return False
+            job = self.cm.jobs[index]
+            self.dispatcher.claim(job)
+            if job in self.job_queue:
+                self.job_queue.remove(job)
+                self.job_queue.insert(0, job)
+                return True
+            # Otherwise, the job has failed to initialize on this target;
+            # its status will be reported as is.
+
     def start_job(self):
         if not self.job_queue:
             raise RuntimeError('No jobs to run')
         self.current_job = self.job_queue.pop(0)
+        self.current_job.start_time = datetime.utcnow()
+        self.prefetch_upcoming(self.job_queue)
         job_output = init_job_output(self.run_output, self.current_job)
         self.current_job.set_output(job_output)
+        self.requested_pulls = OrderedDict()
         self.update_job_state(self.current_job)
+        if self.current_job.spec.convergence:
+            self.get_convergence_tracker(self.current_job.spec).start()
+        profiler = profiling.get_profiler()
+        if profiler:
+            profiler.start_job(self.current_job)
         return self.current_job
 
     def end_job(self):
         if not self.current_job:
             raise RuntimeError('No jobs in progress')
         self.completed_jobs.append(self.current_job)
+        duration = datetime.utcnow() - self.current_job.start_time
+        self.current_job.duration = duration.total_seconds()
         self.update_job_state(self.current_job)
         self.output.write_result()
         self.current_job = None
+        profiler = profiling.get_profiler()
+        if profiler:
+            profiler.end_job()
 
     def set_status(self, status, force=False):
         if not self.current_job:
@@ -161,6 +232,30 @@ class ExecutionContext(object):
     def extract_results(self):
         self.tm.extract_results(self)
 
+    def request_pull(self, source, dest, as_root=False):
+        """
+        Request that ``source`` is pulled from the target to ``dest`` before
+        the job's results are extracted (or, if requested during result
+        extraction, before its output is updated). All paths requested for
+        a job are pulled together as a single archive.
+
+        """
+        if as_root not in self.requested_pulls:
+            self.requested_pulls[as_root] = BulkPull(self.tm.target, as_root=as_root)
+        self.requested_pulls[as_root].add(source, dest)
+
+    def pull_requested(self):
+        for bulk_pull in self.requested_pulls.values():
+            if not bulk_pull:
+                continue
+            for source in bulk_pull.execute():
+                self.logger.warning('Could not pull "{}": not found on target'.format(source))
+
+    def get_convergence_tracker(self, spec):
+        if spec.id not in self.convergence:
+            self.convergence[spec.id] = ConvergenceTracker(spec)
+        return self.convergence[spec.id]
+
     def move_failed(self, job):
         self.run_output.move_failed(job.output)
 
@@ -187,10 +282,8 @@ class ExecutionContext(object):
         if result is None:
             return result
         if os.path.isfile(result):
-            with open(result, 'rb') as fh:
-                md5hash = hashlib.md5(fh.read())
-                key = '{}/{}'.format(resource.owner, os.path.basename(result))
-                self.update_metadata('hashes', key, md5hash.hexdigest())
+            key = '{}/{}'.format(resource.owner, os.path.basename(result))
+            self.update_metadata('hashes', key, self.resolver.get_md5(result))
         return result
 
     get = get_resource  # alias to allow a context to act as a resolver
@@ -261,10 +354,20 @@ class ExecutionContext(object):
            (target.os == 'chromeos' and target.has('android_container')):
             self.take_uiautomator_dump('{}.uix'.format(basename))
 
+    def prefetch_upcoming(self, jobs):
+        if self.prefetcher:
+            lookahead = self.cm.run_config.prefetch_resources
+            self.prefetcher.prefetch([j.workload for j in jobs[:lookahead]
+                                      if j.workload is not None])
+
     def initialize_jobs(self):
+        if self.cm.run_config.defer_workload_loading:
+            # Jobs are loaded and initialized by load_next_job()
+            return
         new_queue = []
         failed_ids = []
-        for job in self.job_queue:
+        for i, job in enumerate(self.job_queue):
+            self.prefetch_upcoming(self.job_queue[i + 1:])
             if job.id in failed_ids:
                 # Don't try to initialize a job if another job with the same ID
                 # (i.e. same job spec) has failed - we can assume it will fail
@@ -286,6 +389,34 @@ class ExecutionContext(object):
 
         self.job_queue = new_queue
 
+    def load_next_job(self):
+        """
+        If workload loading is deferred, load and initialize the next job in
+        the queue if that has not been done yet. If this fails, the job and
+        the remaining jobs for its spec are removed from the queue, and
+        ``False`` is returned.
+
+        """
+        job = self.job_queue[0]
+        if job.workload is not None:
+            return True
+        try:
+            job.load(self.tm.target)
+            job.initialize(self)
+        except Exception as e:  # pylint: disable=broad-except
+            self.job_queue.pop(0)
+            job.set_status(Status.FAILED)
+            self.update_job_state(job)
+            log.log_error(e, self.logger)
+            for other in [j for j in self.job_queue if j.id == job.id]:
+                self.job_queue.remove(other)
+                self.skip_job(other)
+            self.write_state()
+            if self.cm.run_config.bail_on_init_failure:
+                raise
+            return False
+        return True
+
     def _get_unique_filepath(self, filename):
         filepath = os.path.join(self.output_directory, filename)
         rest, ext = os.path.splitext(filepath)
@@ -326,7 +457,7 @@ class Executor(object):
         self.warning_logged = False
         self.target_manager = None
 
-    def execute(self, config_manager, output):
+    def execute(self, config_manager, output, resume=False):
         """
         Execute the run specified by an agenda. Optionally, selectors may be
         used to only selecute a subset of the specified agenda.
@@ -336,6 +467,10 @@ class Executor(object):
             :state: a ``ConfigManager`` containing processed configuration
             :output: an initialized ``RunOutput`` that will be used to
                      store the results.
+            :resume: if ``True``, ``output`` is that of a previous,
+                     interrupted, run of the same agenda. Jobs that have
+                     already been completed will not be run again, and
+                     results will be added to the existing output.
 
         """
         signal.connect(self._error_signalled_callback, signal.ERROR_LOGGED)
@@ -346,33 +481,49 @@ class Executor(object):
         config = config_manager.finalize()
         output.write_config(config)
 
+        if config.settings.artifact_store:
+            self.logger.debug('Using artifact store at {}'.format(config.settings.artifact_store))
+            store = ArtifactStore(config.settings.artifact_store,
+                                  link=config.settings.artifact_store_link,
+                                  owner=str(output.info.uuid))
+            output.set_artifact_store(store)
+
+        if config.run_config.device_pool:
+            if resume:
+                raise ConfigError('Resuming runs on a device pool is not supported.')
+            for name in ['time_budget', 'prefetch_resources']:
+                if getattr(config.run_config, name):
+                    msg = '{} is not supported when executing on a device_pool.'
+                    raise ConfigError(msg.format(name))
+            self.execute_on_pool(config_manager, output)
+            return
+        if config.run_config.prefetch_resources and config.run_config.defer_workload_loading:
+            self.logger.warning('prefetch_resources has no effect when '
+                                'defer_workload_loading is enabled.')
+
         self.logger.info('Connecting to target')
         self.target_manager = TargetManager(config.run_config.device,
                                        config.run_config.device_config,
-                                       output.basepath)
-
-        if config_manager.run_config.reboot_policy.perform_initial_reboot:
-            self.logger.info('Performing inital reboot.')
-            attempts = config_manager.run_config.max_retries
-            while attempts:
-                try:
-                    self.target_manager.reboot()
-                except TargetError as e:
-                    if attempts:
-                        attempts -= 1
-                    else:
-                        raise e
-                else:
-                    break
+                                       output.basepath,
+                                       self.get_target_info_cache(config_manager),
+                                       config.run_config.heartbeat_period,
+                                       config.run_config.heartbeat_timeout,
+                                       self.get_deployment_cache(config_manager))
+        self.perform_initial_reboot(config_manager)
 
         output.set_target_info(self.target_manager.get_target_info())
 
         self.logger.info('Initializing execution context')
         context = ExecutionContext(config_manager, self.target_manager, output)
 
+        saved_states = copy(output.state.jobs) if resume else None
         self.logger.info('Generating jobs')
         config_manager.generate_jobs(context)
         output.write_job_specs(config_manager.job_specs)
+        if resume:
+            self.resume_jobs(context, saved_states)
+        if config.run_config.time_budget:
+            self.plan_run(context)
         output.write_state()
 
         self.logger.info('Installing instruments')
@@ -381,7 +532,7 @@ class Executor(object):
         instrument.validate()
 
         self.logger.info('Installing output processors')
-        pm = ProcessorManager()
+        pm = ProcessorManager(threads=config_manager.run_config.processor_threads)
         for proc in config_manager.get_processors():
             pm.install(proc, context)
         pm.validate()
@@ -396,14 +547,269 @@ class Executor(object):
             self.execute_postamble(context, output)
             signal.send(signal.RUN_COMPLETED, self, context)
 
+    def resume_jobs(self, context, saved_states):
+        """
+        Restore the state of jobs from a previous run of the agenda. Jobs that
+        completed with status ``OK`` or ``PARTIAL``, or that failed and have
+        run out of retries, are not run again. Other jobs are re-run, counting
+        as a retry if they had failed. Output from incomplete attempts is
+        moved into ``__failed``. The outputs of the jobs that are not run
+        again are passed to the output processors at the start of the run
+        (see ``Runner.process_resumed_outputs()``).
+
+        """
+        rc = context.cm.run_config
+        output = context.run_output
+        completed = []
+        for job in context.cm.jobs:
+            key = (job.id, job.iteration)
+            saved = saved_states.get(key)
+            if saved is None:
+                continue
+            if saved.status in [Status.OK, Status.PARTIAL]:
+                context.successful_jobs += 1
+            elif saved.status in rc.retry_on_status and saved.retries >= rc.max_retries:
+                context.failed_jobs += 1
+            else:
+                job.retries = saved.retries
+                if saved.status in rc.retry_on_status:
+                    job.retries += 1
+                output.state.jobs[key].retries = job.retries
+                self._move_previous_attempt(output, job)
+                continue
+            output.state.jobs[key] = saved
+            completed.append(job)
+
+        for job in completed:
+            context.cm.jobs.remove(job)
+        completed_keys = set((job.id, job.iteration) for job in completed)
+        context.resumed_outputs = [o for o in output.jobs
+                                   if (o.id, o.iteration) in completed_keys]
+        output.add_event('Run resumed; {} job(s) already completed'.format(len(completed)))
+        self.logger.info('Resuming run; {} job(s) already completed, {} remaining'
+                         .format(len(completed), len(context.cm.jobs)))
+
+    def get_target_info_cache(self, config_manager):
+        if not config_manager.run_config.cache_target_info:
+            return None
+        path = os.path.join(config_manager.settings.cache_directory, 'target_info')
+        return TargetInfoCache(path, refresh=config_manager.run_config.refresh_target_info)
+
+    def get_deployment_cache(self, config_manager):
+        if not config_manager.run_config.cache_deployments:
+            return None
+        return os.path.join(config_manager.settings.cache_directory, 'deployments')
+
+    def plan_run(self, context):
+        """
+        Skip the jobs that are not expected to fit within the time budget,
+        based on the durations of jobs in previous runs.
+
+        """
+        rc = context.cm.run_config
+        output = context.run_output
+        index_file = os.path.join(context.cm.settings.cache_directory, 'durations.json')
+        index = DurationIndex.load(index_file)
+        if rc.duration_history:
+            history = rc.duration_history
+            added = index.update(history)
+        else:
+            # Only the outputs next to this one are used by default, as its
+            # parent is often a directory (e.g. the user's home) that would
+            # take a long time to search.
+            history = [os.path.dirname(os.path.abspath(output.basepath))]
+            added = index.update(history, recursive=False)
+        if added:
+            index.save(index_file)
+        default = index.mean
+        if default is None:
+            self.logger.warning('No job durations found in {}; not applying time budget.'
+                                .format(', '.join(history)))
+            return
+
+        specs = OrderedDict((job.id, job.spec) for job in context.cm.jobs)
+        estimates = {}
+        for spec in specs.values():
+            estimates[spec.id] = index.estimate(spec.to_pod())
+            if estimates[spec.id] is None:
+                self.logger.warning('No previous runs of job {}; assuming {}.'
+                                    .format(spec.id, format_duration(default)))
+                estimates[spec.id] = default
+
+        jobs, skipped = plan_jobs(context.cm.jobs, estimates, rc.time_budget)
+        estimate = sum(estimates[j.id] for j in jobs)
+        self.logger.info('Estimated run duration: {} (budget: {})'
+                         .format(format_duration(estimate), format_duration(rc.time_budget)))
+        if not skipped:
+            return
+        message = '{} job(s) skipped to fit time budget of {}'
+        message = message.format(len(skipped), format_duration(rc.time_budget))
+        self.logger.warning(message)
+        for spec_id in specs:
+            count = len([j for j in jobs if j.id == spec_id])
+            if any(j.id == spec_id for j in skipped):
+                self.logger.info('    {}: {} iteration(s)'.format(spec_id, count))
+        for job in skipped:
+            context.cm.jobs.remove(job)
+            job.set_status(Status.SKIPPED)
+            output.state.update_job(job)
+        output.add_event(message)
+
+    def _move_previous_attempt(self, output, job):
+        for job_output in list(output.jobs):
+            if job_output.id != job.id or job_output.iteration != job.iteration:
+                continue
+            output.jobs.remove(job_output)
+            if not os.path.isdir(job_output.basepath):
+                continue
+            try:
+                output.move_failed(job_output)
+            except ValueError as e:
+                self.logger.warning('Could not move output of previous attempt: {}'.format(e))
+
+    def perform_initial_reboot(self, config_manager):
+        if config_manager.run_config.reboot_policy.perform_initial_reboot:
+            self.logger.info('Performing inital reboot.')
+            attempts = config_manager.run_config.max_retries
+            while attempts:
+                try:
+                    self.target_manager.reboot()
+                except TargetError as e:
+                    if attempts:
+                        attempts -= 1
+                    else:
+                        raise e
+                else:
+                    break
+
+    def execute_on_pool(self, config_manager, output):
+        """
+        Execute the run on each of the targets in the ``device_pool`` in
+        parallel. Each target is driven by a separate worker process (with its
+        own target manager, execution context, instruments, etc.) that
+        records its results in a separate run output under ``__targets``.
+        Jobs are allocated to workers as they become free, and, once all
+        workers are done, their results are merged into ``output`` and
+        processed.
+
+        """
+        run_config = config_manager.run_config
+        targets = OrderedDict()
+        for i, entry in enumerate(run_config.device_pool):
+            entry = dict(entry)
+            name = str(entry.pop('name', 'target{}'.format(i + 1)))
+            if name in targets:
+                raise ConfigError('Duplicate device_pool target name "{}"'.format(name))
+            targets[name] = entry
+
+        self.logger.info('Executing on {} targets: {}'.format(len(targets),
+                                                              ', '.join(targets)))
+        output.info.start_time = datetime.utcnow()
+        output.write_info()
+
+        dispatcher = JobDispatcher()
+        workers = []
+        for name, device_config in targets.items():
+            worker = multiprocessing.Process(target=self._execute_on_target,
+                                             args=(config_manager, output, name,
+                                                   device_config, dispatcher),
+                                             name=name)
+            worker.start()
+            workers.append(worker)
+
+        claims = {}
+        interrupted = False
+        while any(w.is_alive() for w in workers):
+            try:
+                dispatcher.collect_claims(claims, timeout=1)
+            except KeyboardInterrupt:
+                # Workers receive the interrupt as well and will wind down.
+                self.logger.info('Got CTRL-C. Waiting for targets to abort.')
+                interrupted = True
+        for worker in workers:
+            worker.join()
+            if worker.exitcode:
+                self.logger.error('Execution on {} failed.'.format(worker.name))
+        dispatcher.collect_claims(claims)
+
+        self.logger.info('Merging results')
+        output.info.end_time = datetime.utcnow()
+        output.info.duration = output.info.end_time - output.info.start_time
+        output.write_info()
+        merge_target_outputs(output, targets, claims)
+
+        self.logger.info('Processing output')
+        with log.indentcontext():
+            process_merged_output(config_manager, output)
+
+        self.execute_postamble(None, output)
+        if interrupted:
+            raise KeyboardInterrupt()
+
+    def _execute_on_target(self, config_manager, main_output, name,
+                           device_config, dispatcher):
+        # Runs in a worker process.
+        try:
+            path = os.path.join(main_output.basepath, '__targets', name)
+            output = init_run_output(path, config_manager)
+            log.add_file(output.logfile)
+            output.write_config(config_manager.finalize())
+            run_config = config_manager.run_config
+            target_config = copy(run_config.device_config)
+            target_config.update(device_config)
+
+            self.logger.info('Connecting to target {}'.format(name))
+            self.target_manager = TargetManager(run_config.device, target_config,
+                                                output.basepath,
+                                                self.get_target_info_cache(config_manager),
+                                                run_config.heartbeat_period,
+                                                run_config.heartbeat_timeout,
+                                                self.get_deployment_cache(config_manager))
+            self.perform_initial_reboot(config_manager)
+            output.set_target_info(self.target_manager.get_target_info())
+
+            context = ExecutionContext(config_manager, self.target_manager, output)
+            context.dispatcher = dispatcher.connect(name)
+
+            # All workers must generate jobs in the same order, as they are
+            # allocated by their index. Workloads are only loaded (and jobs
+            # initialized) once they have been claimed by this worker.
+            random.seed(str(main_output.info.uuid))
+            run_config.defer_workload_loading = True
+            config_manager.generate_jobs(context)
+            output.write_job_specs(config_manager.job_specs)
+            output.write_state()
+
+            for instrument_name in config_manager.get_instruments(self.target_manager.target):
+                instrument.install(instrument_name, context)
+            instrument.validate()
+
+            pm = ProcessorManager()
+            for proc in config_manager.get_processors():
+                pm.install(proc, context)
+            pm.validate()
+
+            runner = Runner(context, pm, process_output=False)
+            signal.send(signal.RUN_STARTED, self, context)
+            try:
+                runner.run()
+            finally:
+                context.finalize()
+                signal.send(signal.RUN_COMPLETED, self, context)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:  # pylint: disable=broad-except
+            log.log_error(e, self.logger)
+            raise SystemExit(1)
+
     def execute_postamble(self, context, output):
         self.logger.info('Done.')
         duration = format_duration(output.info.duration)
         self.logger.info('Run duration: {}'.format(duration))
-        num_ran = context.run_state.num_completed_jobs
+        num_ran = output.state.num_completed_jobs
         status_summary = 'Ran a total of {} iterations: '.format(num_ran)
 
-        counter = context.run_state.get_status_counts()
+        counter = output.state.get_status_counts()
         parts = []
         for status in reversed(Status.levels):
             if status in counter:
@@ -442,12 +848,14 @@ class Runner(object):
     processing job and run results.
     """
 
-    def __init__(self, context, pm):
+    def __init__(self, context, pm, process_output=True):
         self.logger = logging.getLogger('runner')
         self.context = context
         self.pm = pm
+        self.process_output = process_output
         self.output = self.context.output
         self.config = self.context.cm
+        self.pipeline = None
 
     def run(self):
         try:
@@ -458,6 +866,10 @@ class Runner(object):
                 while self.context.job_queue:
                     if self.context.run_interrupted:
                         raise KeyboardInterrupt()
+                    if not self.context.claim_next_job():
+                        break
+                    if not self.context.load_next_job():
+                        continue
                     self.run_next_job(self.context)
 
         except KeyboardInterrupt as e:
@@ -478,27 +890,112 @@ class Runner(object):
         self.logger.info('Initializing run')
         signal.connect(self._error_signalled_callback, signal.ERROR_LOGGED)
         signal.connect(self._warning_signalled_callback, signal.WARNING_LOGGED)
+        if self.config.run_config.record_phase_timings:
+            profiling.enable()
+        if self.config.run_config.quiet_execution:
+            quiet.enable()
         self.context.start_run()
+        # Artifacts stored by an earlier attempt at the run may be rewritten
+        # by output processors.
+        self.context.run_output.unshare_artifacts()
         self.pm.initialize()
+        self.process_resumed_outputs()
+        pipeline_size = self.config.run_config.pipeline_output_processing
+        if pipeline_size:
+            self.logger.debug('Pipelining host-side output processing')
+            self.pipeline = JobOutputPipeline(self.pm, pipeline_size)
+            self.pipeline.start()
         with log.indentcontext():
             self.context.initialize_jobs()
         self.context.write_state()
 
+    def process_resumed_outputs(self):
+        # Processors that accumulate results across jobs (e.g. csv) would
+        # otherwise lose the jobs completed before the run was resumed.
+        if not self.context.resumed_outputs or not self.process_output:
+            return
+        self.logger.info('Processing output of previously completed jobs')
+        context = ProcessingContext(None, self.context.target_info,
+                                    self.context.run_output)
+        with log.indentcontext():
+            for job_output in self.context.resumed_outputs:
+                context.job_output = job_output
+                job_output.unshare_artifacts()
+                self.pm.disable_all()
+                if job_output.spec is not None:
+                    for name in job_output.spec.augmentations:
+                        try:
+                            self.pm.enable(name)
+                        except ValueError:
+                            pass
+                self.pm.process_job_output(context)
+                self.pm.export_job_output(context)
+                job_output.write_result()
+        self.pm.enable_all()
+
     def finalize_run(self):
+        if self.pipeline:
+            self.logger.info('Waiting for job output processing to complete')
+            self.pipeline.stop()
         self.logger.info('Run completed')
         with log.indentcontext():
             for job in self.context.completed_jobs:
                 job.finalize(self.context)
+            for job in self.context.completed_jobs:
+                job.unload()
         self.logger.info('Finalizing run')
         self.context.end_run()
         self.pm.enable_all()
-        with signal.wrap('RUN_OUTPUT_PROCESSED', self):
-            self.pm.process_run_output(self.context)
-            self.pm.export_run_output(self.context)
+        if self.process_output:
+            with signal.wrap('RUN_OUTPUT_PROCESSED', self):
+                self.pm.process_run_output(self.context)
+                self.pm.export_run_output(self.context)
         self.pm.finalize()
+        quiet.disable()
+        profiler = profiling.disable()
+        if profiler:
+            self.write_timings(profiler)
+        if self.context.convergence:
+            self.write_convergence()
+        self.store_artifacts()
         signal.disconnect(self._error_signalled_callback, signal.ERROR_LOGGED)
         signal.disconnect(self._warning_signalled_callback, signal.WARNING_LOGGED)
 
+    def store_artifacts(self):
+        # Artifacts are only added to the store once all processing has
+        # completed, as processors may rewrite them.
+        run_output = self.context.run_output
+        if not run_output.artifact_store:
+            return
+        for job_output in run_output.jobs:
+            job_output.store_artifacts()
+            job_output.write_result()
+        run_output.store_artifacts()
+        run_output.write_result()
+
+    def write_timings(self, profiler):
+        run_output = self.context.run_output
+        timings_file = os.path.join(run_output.metadir, 'timings.json')
+        write_pod(profiler.to_pod(), timings_file)
+        run_output.add_artifact('timings', timings_file, kind='meta',
+                                description='Durations of run phases and instrument callbacks')
+        run_output.write_result()
+        self.logger.info('Phase timings:')
+        for line in profiler.format_summary().splitlines():
+            self.logger.info(line)
+
+    def write_convergence(self):
+        run_output = self.context.run_output
+        trackers = list(self.context.convergence.values())
+        convergence_file = os.path.join(run_output.metadir, 'convergence.json')
+        write_pod([t.to_pod() for t in trackers], convergence_file)
+        run_output.add_artifact('convergence', convergence_file, kind='meta',
+                                description='Convergence statistics of adaptive job specs')
+        run_output.write_result()
+        self.logger.info('Convergence:')
+        for line in format_convergence_summary(trackers).splitlines():
+            self.logger.info(line)
+
     def run_next_job(self, context):
         job = context.start_job()
         self.logger.info('Running job {}'.format(job.id))
@@ -517,6 +1014,8 @@ class Runner(object):
                 self.do_run_job(job, context)
                 job.set_status(Status.OK)
         except (Exception, KeyboardInterrupt) as e: # pylint: disable=broad-except
+            if isinstance(e, KeyboardInterrupt):
+                e = context.tm.get_heartbeat_error() or e
             log.log_error(e, self.logger)
             if isinstance(e, KeyboardInterrupt):
                 context.run_interrupted = True
@@ -536,6 +1035,8 @@ class Runner(object):
 
             log.dedent()
             self.check_job(job)
+            if self.config.run_config.defer_workload_loading:
+                self.release_workload(job)
 
     def do_run_job(self, job, context):
         rc = self.context.cm.run_config
@@ -563,11 +1064,17 @@ class Runner(object):
             self.context.record_ui_state('setup-error')
             raise e
 
+        syncs = self.start_clock_sync(context)
         try:
 
             try:
+                context.tm.check_heartbeat()
                 job.run(context)
+                context.tm.check_heartbeat()
             except KeyboardInterrupt:
+                error = context.tm.get_heartbeat_error()
+                if error:
+                    raise error
                 context.run_interrupted = True
                 job.set_status(Status.ABORTED)
                 raise
@@ -579,11 +1086,21 @@ class Runner(object):
                 self.context.record_ui_state('run-error')
                 raise e
             finally:
+                self.end_clock_sync(context, syncs)
                 try:
+                    deferred = self.pm.get_hostside() if self.pipeline else []
+                    processors = [p for p in self.pm.get_enabled() if p not in deferred]
+                    if not self.process_output:
+                        processors = []
                     with signal.wrap('JOB_OUTPUT_PROCESSED', self, context):
                         job.process_output(context)
-                        self.pm.process_job_output(context)
-                    self.pm.export_job_output(context)
+                        self.pm.process_job_output(context, processors)
+                    self.pm.export_job_output(context, processors)
+                    if deferred:
+                        self.pipeline.submit(context, deferred)
+                    if self.pipeline:
+                        self.pipeline.apply_processed()
+                    context.tm.check_heartbeat()
                 except Exception as e:
                     job.set_status(Status.PARTIAL)
                     if isinstance(e, TargetError) or isinstance(e, TimeoutError):
@@ -592,6 +1109,9 @@ class Runner(object):
                     raise
 
         except KeyboardInterrupt:
+            error = context.tm.get_heartbeat_error()
+            if error:
+                raise error
             context.run_interrupted = True
             job.set_status(Status.ABORTED)
             raise
@@ -600,6 +1120,34 @@ class Runner(object):
             # run even if the job failed
             job.teardown(context)
 
+    def start_clock_sync(self, context):
+        syncs = []
+        for clock in context.cm.run_config.clock_sync or []:
+            sync = ClockSync(clock)
+            self._estimate_clock_offset(context, sync)
+            syncs.append(sync)
+        return syncs
+
+    def end_clock_sync(self, context, syncs):
+        for sync in syncs:
+            self._estimate_clock_offset(context, sync)
+        syncs = [s for s in syncs if s.estimates]
+        if not syncs:
+            return
+        sync_file = os.path.join(context.output_directory, 'clock_sync.json')
+        write_pod({'clocks': [s.to_pod() for s in syncs]}, sync_file)
+        context.add_artifact('clock_sync', sync_file, kind='meta',
+                             description='Offsets of target clocks from the host clock')
+
+    def _estimate_clock_offset(self, context, sync):
+        if not context.tm.is_responsive:
+            return
+        try:
+            sync.add(estimate_offset(context.tm.target, sync.clock))
+        except (TargetError, TimeoutError) as e:
+            self.logger.warning('Could not estimate offset of target {} clock: {}'
+                                .format(sync.clock, e))
+
     def check_job(self, job):
         rc = self.context.cm.run_config
         if job.status in rc.retry_on_status:
@@ -607,6 +1155,9 @@ class Runner(object):
                 msg = 'Job {} iteration {} completed with status {}. retrying...'
                 self.logger.error(msg.format(job.id, job.iteration, job.status))
                 self.retry_job(job)
+                if self.pipeline:
+                    # Output must not be moved while it is being processed.
+                    self.pipeline.wait()
                 self.context.move_failed(job)
                 self.context.write_state()
             else:
@@ -615,14 +1166,86 @@ class Runner(object):
                 self.logger.error(msg.format(job.id, job.iteration, job.status))
                 self.context.failed_jobs += 1
                 self.send(signal.JOB_FAILED)
+                self.check_convergence(job)
         else:  # status not in retry_on_status
             self.logger.info('Job completed with status {}'.format(job.status))
             if job.status != 'ABORTED':
                 self.context.successful_jobs += 1
+                self.check_convergence(job)
             else:
                 self.context.failed_jobs += 1
                 self.send(signal.JOB_ABORTED)
 
+    def release_workload(self, job):
+        """
+        Finalize and release the job's workload once the last job for its
+        spec has completed.
+
+        """
+        if any(j.id == job.id for j in self.context.job_queue):
+            return
+        spec_jobs = [j for j in self.context.completed_jobs if j.id == job.id]
+        with log.indentcontext():
+            for spec_job in spec_jobs:
+                spec_job.finalize(self.context)
+        for spec_job in spec_jobs:
+            spec_job.unload()
+
+    def check_convergence(self, job):
+        """
+        If the job's spec has an adaptive iteration count, record the value
+        of its convergence metric and, if this was the last scheduled
+        iteration of the spec, schedule another one unless the metric has
+        converged or a limit has been reached.
+
+        """
+        criteria = job.spec.convergence
+        if not criteria:
+            return
+        tracker = self.context.get_convergence_tracker(job.spec)
+        if job.status in [Status.OK, Status.PARTIAL]:
+            if self.pipeline:
+                # The metric may be added by deferred output processing.
+                self.pipeline.wait()
+            metric = next((m for m in job.output.metrics if m.name == criteria.metric), None)
+            if metric is None:
+                msg = 'Job {} iteration {} did not produce convergence metric "{}"'
+                self.logger.warning(msg.format(job.id, job.iteration, criteria.metric))
+                tracker.add_missing()
+            else:
+                tracker.add(job.iteration, metric.value)
+
+        if any(j.id == job.id for j in self.context.job_queue):
+            return
+        if self.context.dispatcher is not None:
+            # Jobs are allocated across the pool up front, so iterations
+            # cannot be added.
+            if not tracker.stop_reason:
+                self.logger.warning('Adaptive iterations are not supported on a device pool.')
+                tracker.stop_reason = 'device_pool'
+            return
+        if tracker.needs_more(job.iteration):
+            half_width = tracker.half_width
+            msg = 'Scheduling iteration {} of {} ("{}" interval: {})'
+            self.logger.info(msg.format(job.iteration + 1, job.id, criteria.metric,
+                                        'n/a' if half_width is None else
+                                        '+/-{:.1f}%'.format(half_width * 100)))
+            self.schedule_iteration(job, job.iteration + 1)
+        else:
+            msg = 'Job spec {} finished after {} iterations ({})'
+            self.logger.info(msg.format(job.id, job.iteration, tracker.stop_reason))
+            if tracker.outliers:
+                msg = 'Outlying "{}" values in iterations: {}'
+                self.logger.warning(msg.format(criteria.metric,
+                                               ', '.join(map(str, tracker.outliers))))
+
+    def schedule_iteration(self, job, iteration):
+        new_job = Job(job.spec, iteration, self.context)
+        new_job.workload = job.workload
+        self.context.run_state.add_job(new_job)
+        new_job.initialize(self.context)
+        self.context.job_queue.insert(0, new_job)
+
     def retry_job(self, job):
         retry_job = Job(job.spec, job.iteration, self.context)
         retry_job.workload = job.workload
@@ -642,3 +1265,157 @@ class Runner(object):
 
     def __str__(self):
         return 'runner'
+
+
+class JobDispatcher(object):
+    """
+    Allocates jobs to the workers executing a run on a pool of targets.
+
+    Every worker generates the same list of jobs, and claims the next one to
+    run by its index in that list, so that each job is run exactly once.
+    Claims are reported back to the coordinating process, which uses them to
+    work out which target's results to use for each job.
+
+    """
+
+    def __init__(self):
+        self.next_job = multiprocessing.Value('i', 0)
+        self.claims = multiprocessing.Queue()
+        self.name = None
+
+    def connect(self, name):
+        self.name = name
+        return self
+
+    def next_index(self, num_jobs):
+        with self.next_job.get_lock():
+            index = self.next_job.value
+            if index >= num_jobs:
+                return None
+            self.next_job.value += 1
+        return index
+
+    def claim(self, job):
+        self.claims.put((job.id, job.iteration, self.name))
+
+    def collect_claims(self, claims, timeout=None):
+        try:
+            while True:
+                if timeout is None:
+                    job_id, iteration, name = self.claims.get_nowait()
+                else:
+                    job_id, iteration, name = self.claims.get(timeout=timeout)
+                    timeout = None
+                logger.debug('Job {} iteration {} allocated to {}'.format(job_id, iteration, name))
+                claims[(job_id, iteration)] = name
+        except Empty:
+            pass
+        return claims
+
+
+def merge_target_outputs(output, targets, claims):
+    """
+    Merge the outputs of execution on a pool of targets into ``output``. Job
+    output directories are moved from the per-target outputs, and each job's
+    result is classified with the name of the target that ran it.
+
+    """
+    target_outputs = OrderedDict()
+    for name in targets:
+        path = os.path.join(output.basepath, '__targets', name)
+        try:
+            target_output = RunOutput(path)
+        except ValueError:
+            continue
+        if target_output.job_specs:
+            target_outputs[name] = target_output
+    if not target_outputs:
+        raise ExecutionError('No target in the pool was able to run jobs.')
+
+    first = list(target_outputs.values())[0]
+    output.set_target_info(first.target_info)
+    shutil.copy(first.jobsfile, output.jobsfile)
+    output.job_specs = output.read_job_specs()
+
+    for key, first_state in first.state.jobs.items():
+        name = claims.get(key)
+        if name not in target_outputs:
+            # Never started (e.g. because the run was interrupted).
+            job_state = copy(first_state)
+            if job_state.status <= Status.RUNNING:
+                job_state.status = Status.SKIPPED
+            output.state.jobs[key] = job_state
+            continue
+
+        target_output = target_outputs[name]
+        job_state = target_output.state.jobs[key]
+        output.state.jobs[key] = job_state
+        source = os.path.join(target_output.basepath, job_state.output_name)
+        if not os.path.isdir(source):
+            continue
+        dest = os.path.join(output.basepath, job_state.output_name)
+        shutil.move(source, dest)
+
+        job_output = JobOutput(dest, job_state.id, job_state.label,
+                               job_state.iteration, job_state.retries)
+        job_output.status = job_state.status
+        job_output.spec = output.get_job_spec(job_state.id)
+        job_output.classifiers['target'] = name
+        for metric in job_output.metrics:
+            metric.classifiers['target'] = name
+        job_output.write_result()
+        output.jobs.append(job_output)
+
+    for name, target_output in target_outputs.items():
+        failed_dir = os.path.join(target_output.basepath, '__failed')
+        if os.path.isdir(failed_dir):
+            for entry in os.listdir(failed_dir):
+                shutil.move(os.path.join(failed_dir, entry),
+                            os.path.join(output.failed_dir, '{}-{}'.format(entry, name)))
+
+    counter = output.state.get_status_counts()
+    if counter[Status.OK] or counter[Status.PARTIAL]:
+        if any(counter[s] for s in [Status.FAILED, Status.ABORTED, Status.SKIPPED]):
+            status = Status.PARTIAL
+        else:
+            status = Status.OK
+    else:
+        status = Status.FAILED
+    output.state.status = status
+    output.status = status
+    output.write_state()
+    output.write_result()
+
+
+def process_merged_output(config_manager, output):
+    """
+    Perform job and run output processing for output merged from a pool of
+    targets.
+
+    """
+    pm = ProcessorManager(threads=config_manager.run_config.processor_threads)
+    for proc in config_manager.get_processors():
+        pm.install(proc, None)
+    pm.validate()
+    pm.initialize()
+
+    context = ProcessingContext(None, output.target_info, output)
+    for job_output in output.jobs:
+        context.job_output = job_output
+        pm.disable_all()
+        if job_output.spec is not None:
+            for name in job_output.spec.augmentations:
+                try:
+                    pm.enable(name)
+                except ValueError:
+                    pass
+        pm.process_job_output(context)
+        pm.export_job_output(context)
+        job_output.write_result()
+
+    pm.enable_all()
+    with signal.wrap('RUN_OUTPUT_PROCESSED', output):
+        pm.process_run_output(context)
+        pm.export_run_output(context)
+    pm.finalize()
+    output.write_result()
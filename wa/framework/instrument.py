@@ -100,9 +100,10 @@ and the code to clear these file goes in teardown method. ::
 
 import logging
 import inspect
+import time
 from collections import OrderedDict
 
-from wa.framework import signal
+from wa.framework import profiling, quiet, signal
 from wa.framework.plugin import Plugin
 from wa.framework.exception import (WAError, TargetNotRespondingError, TimeoutError,
                                     WorkloadError, TargetError)
@@ -160,6 +161,11 @@ SIGNAL_MAP = OrderedDict([
 ])
 
 
+# Callbacks that may be invoked concurrently for instruments that allow it
+# (see Instrument.concurrent).
+CONCURRENT_CALLBACKS = ['start', 'stop']
+
+
 def get_priority(func):
     return getattr(getattr(func, 'im_func', func),
                    'priority', signal.CallbackPriority.normal)
@@ -261,6 +267,8 @@ class ManagedCallback(object):
         self.instrument = instrument
         self.callback = callback
         self.is_hostside = is_hostside(callback)
+        self.concurrent = (instrument.concurrent and
+                           callback.__name__ in CONCURRENT_CALLBACKS)
 
     def __call__(self, context):
         if self.instrument.is_enabled:
@@ -268,7 +276,17 @@ class ManagedCallback(object):
                 if not context.tm.is_responsive and not self.is_hostside:
                     logger.debug("Target unresponsive; skipping callback {}".format(self.callback))
                     return
-                self.callback(context)
+                profiler = profiling.get_profiler()
+                with quiet.allowed(self.instrument.name):
+                    if profiler:
+                        start = time.time()
+                        try:
+                            self.callback(context)
+                        finally:
+                            name = '{}.{}'.format(self.instrument.name, self.callback.__name__)
+                            profiler.record('callback', name, start, time.time() - start)
+                    else:
+                        self.callback(context)
             except (KeyboardInterrupt, TargetNotRespondingError, TimeoutError):  # pylint: disable=W0703
                 raise
             except Exception as e:  # pylint: disable=W0703
@@ -421,6 +439,13 @@ class Instrument(Plugin):
     """
     kind = "instrument"
 
+    # If True, the instrument's start() and stop() are safe to run in
+    # parallel with those of other concurrent instruments (they do not share
+    # state with them). Adjacent concurrent callbacks are invoked together,
+    # regardless of their relative priorities, so that the instruments begin
+    # and end collection as close together as possible.
+    concurrent = False
+
     def __init__(self, target, **kwargs):
         super(Instrument, self).__init__(**kwargs)
         self.target = target
@@ -2,8 +2,9 @@ import logging
 from copy import copy
 from datetime import datetime
 
-from wa.framework import pluginloader, signal, instrument
+from wa.framework import pluginloader, signal, instrument, quiet
 from wa.framework.configuration.core import Status
+from wa.utils.exec_control import forget_instance
 from wa.utils.log import indentcontext
 
 # Because of use of Enum (dynamic attrs)
@@ -47,13 +48,16 @@ class Job(object):
         self.workload = None
         self.output = None
         self.run_time = None
+        self.start_time = None
+        self.duration = None
         self.retries = 0
         self._has_been_initialized = False
+        self._has_been_finalized = False
         self._status = Status.NEW
 
     def load(self, target, loader=pluginloader):
         self.logger.info('Loading job {}'.format(self))
-        if self.iteration == 1:
+        if self.iteration == 1 or self.id not in self._workload_cache:
             self.workload = loader.get_workload(self.spec.workload_name,
                                                 target,
                                                 **self.spec.workload_parameters)
@@ -63,6 +67,28 @@ class Job(object):
         else:
             self.workload = self._workload_cache[self.id]
 
+    def validate_workload(self, target, loader=pluginloader):
+        """
+        Check the workload configuration without loading the job, i.e.
+        without resolving the workload's resources. Used when loading is
+        deferred until just before the job is run.
+
+        """
+        workload = loader.get_workload(self.spec.workload_name, target,
+                                       **self.spec.workload_parameters)
+        workload.validate()
+
+    def unload(self):
+        """
+        Release the workload. Once this has been done for a job, no more jobs
+        for its spec should be run.
+
+        """
+        workload = self._workload_cache.pop(self.id, None)
+        if workload is not None:
+            forget_instance(workload)
+        self.workload = None
+
     def set_output(self, output):
         output.classifiers = copy(self.classifiers)
         self.output = output
@@ -123,7 +149,8 @@ class Job(object):
             with signal.wrap('WORKLOAD_EXECUTION', self, context):
                 start_time = datetime.utcnow()
                 try:
-                    self.workload.run(context)
+                    with quiet.window(context):
+                        self.workload.run(context)
                 finally:
                     self.run_time = datetime.utcnow() - start_time
 
@@ -134,9 +161,11 @@ class Job(object):
         self.logger.info('Processing output for job {}'.format(self))
         with indentcontext():
             if self.status != Status.FAILED:
+                context.pull_requested()
                 with signal.wrap('WORKLOAD_RESULT_EXTRACTION', self, context):
                     self.workload.extract_results(context)
                     context.extract_results()
+                context.pull_requested()
                 with signal.wrap('WORKLOAD_OUTPUT_UPDATE', self, context):
                     self.workload.update_output(context)
 
@@ -150,8 +179,9 @@ class Job(object):
                 self.workload.teardown(context)
 
     def finalize(self, context):
-        if not self._has_been_initialized:
+        if not self._has_been_initialized or self._has_been_finalized:
             return
+        self._has_been_finalized = True
         if not context.tm.is_responsive:
             self.logger.info('Target unresponsive; not finalizing.')
             return
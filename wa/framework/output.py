@@ -1,6 +1,10 @@
+import hashlib
 import logging
 import os
 import shutil
+import stat
+import subprocess
+import tempfile
 from collections import OrderedDict
 from copy import copy, deepcopy
 from datetime import datetime
@@ -13,7 +17,7 @@ from wa.framework.exception import HostError
 from wa.framework.run import RunState, RunInfo
 from wa.framework.target.info import TargetInfo
 from wa.framework.version import get_wa_version_with_commit
-from wa.utils.misc import touch, ensure_directory_exists, isiterable
+from wa.utils.misc import touch, ensure_directory_exists, isiterable, sha256
 from wa.utils.serializer import write_pod, read_pod, is_pod
 from wa.utils.types import enum, numeric
 
@@ -84,6 +88,7 @@ class Output(object):
     def __init__(self, path):
         self.basepath = path
         self.result = None
+        self.artifact_store = None
 
     def reload(self):
         try:
@@ -119,6 +124,45 @@ class Output(object):
 
         self.result.add_artifact(name, path, kind, description, classifiers)
 
+    def store_artifacts(self):
+        """
+        Add the artifacts that have not yet been stored to the artifact store
+        (if there is one). Artifacts may still be modified after they have
+        been added (e.g. by output processors), so this is only done once the
+        output is complete.
+
+        """
+        if not self.artifact_store:
+            return
+        for artifact in self.result.artifacts:
+            if artifact.digest is not None or artifact.kind == ArtifactType.export:
+                continue
+            path = self.get_path(artifact.path)
+            if os.path.exists(path):
+                artifact.digest = self.artifact_store.add(path)
+
+    def unshare_artifacts(self):
+        """
+        Replace artifacts that have been added to an artifact store with
+        private, writable copies, so that they can be modified (e.g. when the
+        output is processed again) without affecting the stored objects.
+        They are stored again by the next call to ``store_artifacts()``.
+
+        """
+        for artifact in self.result.artifacts:
+            if artifact.digest is None:
+                continue
+            path = self.get_path(artifact.path)
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for filename in files:
+                        filepath = os.path.join(root, filename)
+                        if os.path.isfile(filepath) and not os.path.islink(filepath):
+                            _unshare_file(filepath)
+            elif os.path.isfile(path):
+                _unshare_file(path)
+            artifact.digest = None
+
     def add_event(self, message):
         self.result.add_event(message)
 
@@ -259,7 +303,17 @@ class RunOutput(Output):
 
     def set_target_info(self, ti):
         self.target_info = ti
+        if os.path.isfile(self.targetfile):
+            # Make sure a previously stored version is not modified in place.
+            os.remove(self.targetfile)
         write_pod(ti.to_pod(), self.targetfile)
+        if self.artifact_store:
+            self.artifact_store.add(self.targetfile)
+
+    def set_artifact_store(self, store):
+        self.artifact_store = store
+        for job in self.jobs:
+            job.artifact_store = store
 
     def write_job_specs(self, job_specs):
         job_specs[0].to_pod()
@@ -340,9 +394,10 @@ class Result(object):
         logger.debug('Adding metric: {}'.format(metric))
         self.metrics.append(metric)
 
-    def add_artifact(self, name, path, kind, description=None, classifiers=None):
+    def add_artifact(self, name, path, kind, description=None, classifiers=None,
+                     digest=None):
         artifact = Artifact(name, path, kind, description=description,
-                            classifiers=classifiers)
+                            classifiers=classifiers, digest=digest)
         logger.debug('Adding artifact: {}'.format(artifact))
         self.artifacts.append(artifact)
 
@@ -477,7 +532,8 @@ class Artifact(object):
         pod['kind'] = ArtifactType(pod['kind'])
         return Artifact(**pod)
 
-    def __init__(self, name, path, kind, description=None, classifiers=None):
+    def __init__(self, name, path, kind, description=None, classifiers=None,
+                 digest=None):
         """"
         :param name: Name that uniquely identifies this artifact.
         :param path: The *relative* path of the artifact. Depending on the
@@ -493,6 +549,9 @@ class Artifact(object):
         :param classifiers: A set of key-value pairs to further classify this
                             metric beyond current iteration (e.g. this can be
                             used to identify sub-tests).
+        :param digest: SHA256 hex digest of the artifact's contents. This is
+                       only set if the artifact has been added to an
+                       :class:`ArtifactStore`.
 
         """
         self.name = name
@@ -504,6 +563,7 @@ class Artifact(object):
             raise ValueError(msg.format(kind, ARTIFACT_TYPES))
         self.description = description
         self.classifiers = classifiers or {}
+        self.digest = digest
 
     def to_pod(self):
         pod = copy(self.__dict__)
@@ -611,6 +671,146 @@ class Event(object):
     __repr__ = __str__
 
 
+class ArtifactStore(object):
+    """
+    A content-addressed store that allows byte-identical artifacts to be shared
+    between jobs and runs.
+
+    Files added to the store are hashed and placed into the store's
+    ``objects`` directory (unless an identical file is already there). The
+    original location is then (re)linked to the stored object, so that only a
+    single copy exists on disk. Directories are added file by file. Every
+    addition is also recorded in the catalog under the store's ``refs``
+    directory, making it possible to tell which runs share a particular file.
+
+    .. note:: Stored objects are shared between all of the locations they have
+              been linked to, so are made read-only, and files must not be
+              modified in place after they have been added. Outputs
+              therefore only add their artifacts once they are complete
+              (see ``Output.store_artifacts()``), and replace them with
+              private copies before they are processed again (see
+              ``Output.unshare_artifacts()``).
+
+    """
+
+    link_methods = ['hardlink', 'reflink']
+
+    def __init__(self, path, link='hardlink', owner=None):
+        if link not in self.link_methods:
+            msg = 'Invalid artifact store link method "{}"; must be one of: {}'
+            raise ValueError(msg.format(link, ', '.join(self.link_methods)))
+        self.path = os.path.abspath(path)
+        self.link = link
+        self.owner = owner
+        self.objects_dir = ensure_directory_exists(os.path.join(self.path, 'objects'))
+        self.refs_dir = ensure_directory_exists(os.path.join(self.path, 'refs'))
+
+    def add(self, path):
+        """
+        Add the file or directory at the specified path to the store, and
+        return the hex digest of its contents.
+
+        """
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            return self._add_directory(path)
+        return self._add_file(path)
+
+    def get_object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def get_references(self, digest):
+        """
+        Return a list of ``(owner, path)`` tuples for every location the
+        content with the specified digest has been added from.
+
+        """
+        refs_file = os.path.join(self.refs_dir, digest[:2], digest)
+        if not os.path.isfile(refs_file):
+            return []
+        references = []
+        with open(refs_file) as fh:
+            for line in fh:
+                if line.strip():
+                    owner, path = line.rstrip('\n').split('\t', 1)
+                    references.append((owner or None, path))
+        return references
+
+    def _add_file(self, path):
+        digest = sha256(path)
+        object_path = self.get_object_path(digest)
+        if os.path.isfile(object_path):
+            self._link_into_place(object_path, path)
+        else:
+            ensure_directory_exists(os.path.dirname(object_path))
+            self._link_into_place(path, object_path)
+            os.chmod(object_path, 0o444)
+            logger.debug('Stored new object {}'.format(digest))
+        self._add_reference(digest, path)
+        return digest
+
+    def _add_directory(self, path):
+        lines = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                filepath = os.path.join(root, filename)
+                if os.path.islink(filepath) or not os.path.isfile(filepath):
+                    continue
+                digest = self._add_file(filepath)
+                relpath = os.path.relpath(filepath, path).replace(os.sep, '/')
+                lines.append('{}\t{}'.format(digest, relpath))
+        tree_digest = hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+        self._add_reference(tree_digest, path)
+        return tree_digest
+
+    def _add_reference(self, digest, path):
+        refs_file = os.path.join(self.refs_dir, digest[:2], digest)
+        ensure_directory_exists(os.path.dirname(refs_file))
+        with open(refs_file, 'a') as wfh:
+            wfh.write('{}\t{}\n'.format(self.owner or '', path))
+
+    def _link_into_place(self, source, dest):
+        # Link (or copy, if linking is not possible, e.g. because source and
+        # dest are on different file systems) to a temporary file next to the
+        # destination and then rename it, so that dest is replaced atomically.
+        # The name is reserved with mkstemp, so that concurrent additions
+        # (e.g. from processor threads) do not collide; the placeholder is
+        # removed as os.link will not replace an existing file.
+        fd, tmpfile = tempfile.mkstemp(prefix='.wa-store-', dir=os.path.dirname(dest))
+        os.close(fd)
+        os.remove(tmpfile)
+        try:
+            try:
+                if self.link == 'hardlink':
+                    os.link(source, tmpfile)
+                else:
+                    with open(os.devnull, 'w') as devnull:
+                        subprocess.check_call(['cp', '--reflink=always', source, tmpfile],
+                                              stderr=devnull)
+            except (OSError, subprocess.CalledProcessError) as e:
+                logger.debug('Could not {} {}: {}; copying'.format(self.link, source, e))
+                shutil.copy2(source, tmpfile)
+            os.rename(tmpfile, dest)
+        finally:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+
+
+def _unshare_file(path):
+    # Copy to a temporary file next to the original and rename it into place,
+    # so that the (possibly linked) original is never written to.
+    fd, tmpfile = tempfile.mkstemp(prefix='.wa-unshare-', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        shutil.copyfile(path, tmpfile)
+        os.chmod(tmpfile, stat.S_IMODE(os.stat(path).st_mode) | stat.S_IWUSR)
+        os.rename(tmpfile, path)
+    finally:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+
+
 def init_run_output(path, wa_state, force=False):
     if os.path.exists(path):
         if force:
@@ -648,6 +848,7 @@ def init_job_output(run_output, job):
     ensure_directory_exists(path)
     write_pod(Result().to_pod(), os.path.join(path, 'result.json'))
     job_output = JobOutput(path, job.id, job.label, job.iteration, job.retries)
+    job_output.artifact_store = run_output.artifact_store
     job_output.spec = job.spec
     job_output.status = job.status
     run_output.jobs.append(job_output)
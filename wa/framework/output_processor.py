@@ -1,8 +1,16 @@
 import logging
+import sys
+import threading
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+from future.moves.queue import Empty, Queue
+from future.utils import raise_
 
 from wa.framework import pluginloader
 from wa.framework.exception import ConfigError
-from wa.framework.instrument import is_installed
+from wa.framework.instrument import is_installed, is_hostside
+from wa.framework.output import Output
 from wa.framework.plugin import Plugin
 from wa.utils.log import log_error, indentcontext
 from wa.utils.misc import isiterable
@@ -14,6 +22,20 @@ class OutputProcessor(Plugin):
     kind = 'output_processor'
     requires = []
 
+    # If True, the processor is safe to run in parallel with other concurrent
+    # processors (it does not share state with them, and only modifies
+    # outputs through the Output API, e.g. add_metric()/add_artifact()).
+    concurrent = False
+    # Whether the processor uses metrics, artifacts or events added to the
+    # output by other processors. If so, it will not be started until all
+    # preceding processors that write results have completed.
+    reads_results = True
+    # Whether the processor adds metrics, artifacts or events to the output.
+    writes_results = True
+    # Names of other output processors that must have completed before this
+    # processor is run (if they are installed).
+    dependencies = []
+
     def __init__(self, **kwargs):
         super(OutputProcessor, self).__init__(**kwargs)
         self.is_enabled = True
@@ -34,10 +56,11 @@ class OutputProcessor(Plugin):
 
 class ProcessorManager(object):
 
-    def __init__(self, loader=pluginloader):
+    def __init__(self, loader=pluginloader, threads=None):
         self.loader = loader
         self.logger = logging.getLogger('processor')
         self.processors = []
+        self.threads = threads or cpu_count()
 
     def install(self, processor, context):
         if not isinstance(processor, OutputProcessor):
@@ -96,38 +119,159 @@ class ProcessorManager(object):
         for proc in self.processors:
             proc.finalize()
 
-    def process_job_output(self, context):
-        self.do_for_each_proc('process_job_output', 'Processing using "{}"',
+    def get_hostside(self):
+        """
+        Return enabled processors whose job output processing can be
+        performed in the background (i.e. all of their job-level methods
+        have been marked as ``@hostside``).
+
+        """
+        hostside = []
+        for proc in self.get_enabled():
+            methods = [getattr(proc, name, None)
+                       for name in ['process_job_output', 'export_job_output']]
+            methods = [m for m in methods if m is not None]
+            if methods and all(is_hostside(m) for m in methods):
+                hostside.append(proc)
+        return hostside
+
+    def process_job_output(self, context, processors=None):
+        return self.do_for_each_proc('process_job_output', 'Processing using "{}"',
                               context.job_output, context.target_info,
-                              context.run_output)
+                              context.run_output, processors=processors)
 
-    def export_job_output(self, context):
-        self.do_for_each_proc('export_job_output', 'Exporting using "{}"',
+    def export_job_output(self, context, processors=None):
+        return self.do_for_each_proc('export_job_output', 'Exporting using "{}"',
                               context.job_output, context.target_info,
-                              context.run_output)
+                              context.run_output, processors=processors)
 
     def process_run_output(self, context):
-        self.do_for_each_proc('process_run_output', 'Processing using "{}"',
+        return self.do_for_each_proc('process_run_output', 'Processing using "{}"',
                               context.run_output, context.target_info)
 
     def export_run_output(self, context):
-        self.do_for_each_proc('export_run_output', 'Exporting using "{}"',
+        return self.do_for_each_proc('export_run_output', 'Exporting using "{}"',
                               context.run_output, context.target_info)
 
-    def do_for_each_proc(self, method_name, message, *args):
+    def do_for_each_proc(self, method_name, message, *args, **kwargs):
+        """
+        Call the specified method of each processor (or of the enabled ones,
+        if ``processors`` is not given). Errors are logged, rather than
+        raised; the processors that raised them are returned.
+
+        """
+        processors = kwargs.pop('processors', None)
+        if processors is None:
+            processors = self.get_enabled()
+        failed = []
         with indentcontext():
-            for proc in self.processors:
-                if proc.is_enabled:
-                    proc_func = getattr(proc, method_name, None)
-                    if proc_func is None:
-                        continue
-                    try:
-                        self.logger.info(message.format(proc.name))
-                        proc_func(*args)
-                    except Exception as e:
-                        if isinstance(e, KeyboardInterrupt):
-                            raise
-                        log_error(e, self.logger)
+            to_run = [p for p in processors
+                      if getattr(p, method_name, None) is not None]
+            for batch in self._get_batches(to_run):
+                if len(batch) == 1 or self.threads < 2:
+                    for proc in batch:
+                        if not self._run_proc(proc, method_name, message, args):
+                            failed.append(proc)
+                else:
+                    for wave in self._get_waves(batch):
+                        failed.extend(self._run_concurrently(wave, method_name,
+                                                             message, args))
+        return failed
+
+    def _run_proc(self, proc, method_name, message, args):
+        try:
+            self.logger.info(message.format(proc.name))
+            getattr(proc, method_name)(*args)
+        except Exception as e:
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            log_error(e, self.logger)
+            return False
+        return True
+
+    def _run_concurrently(self, procs, method_name, message, args):
+        if len(procs) == 1:
+            if self._run_proc(procs[0], method_name, message, args):
+                return []
+            return procs
+
+        calls = []
+        for proc in procs:
+            self.logger.info(message.format(proc.name))
+            # Outputs may already be deferred (by JobOutputPipeline), in which
+            # case applying the wrapper records the calls in the outer one.
+            proc_args = [DeferredOutput(a) if isinstance(a, (Output, DeferredOutput)) else a
+                         for a in args]
+            calls.append((getattr(proc, method_name), proc_args))
+
+        pool = ThreadPool(min(self.threads, len(calls)))
+        try:
+            results = pool.map(_invoke, calls)
+        finally:
+            pool.close()
+            pool.join()
+
+        # Apply modifications in processor order, so that the resulting
+        # output does not depend on the order in which processors finished.
+        failed = []
+        for proc, (_, proc_args), exc_info in zip(procs, calls, results):
+            try:
+                for arg in proc_args:
+                    if isinstance(arg, DeferredOutput):
+                        arg.apply()
+                if exc_info is not None:
+                    raise_(*exc_info)
+            except Exception as e:  # pylint: disable=broad-except
+                log_error(e, self.logger)
+                failed.append(proc)
+        return failed
+
+    def _get_batches(self, procs):
+        # Consecutive concurrent processors form a single batch; anything else
+        # runs on its own, after everything before it has completed.
+        batches = []
+        batch = []
+        for proc in procs:
+            if proc.concurrent:
+                batch.append(proc)
+                continue
+            if batch:
+                batches.append(batch)
+                batch = []
+            batches.append([proc])
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _get_waves(self, batch):
+        # Split a batch of concurrent processors into successive "waves" such
+        # that each processor only runs after everything it depends on.
+        waiting_on = {}
+        for i, proc in enumerate(batch):
+            waiting_on[proc] = set()
+            for j, other in enumerate(batch):
+                if other is proc:
+                    continue
+                if (other.name in proc.dependencies or
+                        (j < i and proc.reads_results and other.writes_results)):
+                    waiting_on[proc].add(other)
+
+        waves = []
+        remaining = list(batch)
+        while remaining:
+            wave = [p for p in remaining if not waiting_on[p]]
+            if not wave:
+                names = ', '.join(p.name for p in remaining)
+                self.logger.debug('Circular processor dependencies ({}); '
+                                  'running sequentially'.format(names))
+                waves.extend([p] for p in remaining)
+                break
+            for proc in wave:
+                remaining.remove(proc)
+            for proc in remaining:
+                waiting_on[proc].difference_update(wave)
+            waves.append(wave)
+        return waves
 
     def _enable_output_processor(self, inst):
         inst = self.get_output_processor(inst)
@@ -141,3 +285,138 @@ class ProcessorManager(object):
         if inst.is_enabled:
             inst.is_enabled = False
 
+
+class ProcessingContext(object):
+    """
+    A snapshot of the parts of an execution context used by output
+    processors, so that job output can be processed after the runner has
+    moved on.
+
+    """
+
+    def __init__(self, job_output, target_info, run_output):
+        self.job_output = job_output
+        self.target_info = target_info
+        self.run_output = run_output
+
+
+class JobOutputPipeline(object):
+    """
+    Performs job output processing for host-side output processors in a
+    background thread, overlapping it with the execution of subsequent jobs.
+
+    At most ``size`` jobs may be waiting to be processed; submitting another
+    one will block until there is room in the queue.
+
+    Modifications made to the job and run outputs by the processors are
+    deferred (see :class:`DeferredOutput`), and are applied (and the job's
+    result written) in the main thread by :meth:`apply_processed`, so that
+    the outputs are only ever modified by one thread.
+
+    """
+
+    def __init__(self, pm, size):
+        self.pm = pm
+        self.logger = logging.getLogger('processor')
+        self.queue = Queue(maxsize=size)
+        self.processed = Queue()
+        self.worker = None
+
+    def start(self):
+        self.worker = threading.Thread(target=self._process, name='OutputPipeline')
+        self.worker.daemon = True
+        self.worker.start()
+
+    def submit(self, context, processors):
+        snapshot = ProcessingContext(DeferredOutput(context.job_output), context.target_info,
+                                     DeferredOutput(context.run_output))
+        self.logger.debug('Queueing output of job {} for processing'.format(context.job_output.id))
+        self.queue.put((snapshot, list(processors)))
+
+    def apply_processed(self):
+        """
+        Apply the modifications made by processing job output that has
+        completed since this was last called. This must be called from the
+        main thread.
+
+        """
+        while True:
+            try:
+                context = self.processed.get_nowait()
+            except Empty:
+                break
+            for output in [context.job_output, context.run_output]:
+                try:
+                    output.apply()
+                except Exception as e:  # pylint: disable=broad-except
+                    log_error(e, self.logger)
+            context.job_output.write_result()
+
+    def wait(self):
+        """Block until all queued job output has been processed and applied."""
+        self.queue.join()
+        self.apply_processed()
+
+    def stop(self):
+        if self.worker is None:
+            return
+        self.queue.put(None)
+        self.worker.join()
+        self.worker = None
+        self.apply_processed()
+
+    def _process(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                context, processors = item
+                try:
+                    self.pm.process_job_output(context, processors)
+                    self.pm.export_job_output(context, processors)
+                finally:
+                    self.processed.put(context)
+            except Exception as e:  # pylint: disable=broad-except
+                log_error(e, self.logger)
+            finally:
+                self.queue.task_done()
+
+
+class DeferredOutput(object):
+    """
+    Wraps an :class:`Output` passed to a processor that is being run
+    concurrently with others, or in the background by
+    :class:`JobOutputPipeline`. Modifications made via the Output API are
+    recorded, rather than applied, and are then applied in the main thread
+    via :meth:`apply`. Everything else is passed through to the wrapped output.
+
+    """
+
+    deferred_methods = ['add_metric', 'add_artifact', 'add_event',
+                        'add_metadata', 'update_metadata']
+
+    def __init__(self, output):
+        self._output = output
+        self._calls = []
+
+    def apply(self):
+        calls, self._calls = self._calls, []
+        for name, args, kwargs in calls:
+            getattr(self._output, name)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in self.deferred_methods:
+            def record(*args, **kwargs):
+                self._calls.append((name, args, kwargs))
+            return record
+        return getattr(self._output, name)
+
+
+def _invoke(call):
+    func, args = call
+    try:
+        func(*args)
+    except Exception:  # pylint: disable=broad-except
+        return sys.exc_info()
+    return None
@@ -0,0 +1,215 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Planning of runs against a time budget. The duration of each job is
+estimated from the outputs of previous runs, which are summarised in a
+``DurationIndex``.
+
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from wa.framework.configuration.core import Status
+from wa.utils.misc import ensure_directory_exists
+from wa.utils.serializer import read_pod, write_pod
+
+
+logger = logging.getLogger('planning')
+
+
+def get_spec_key(spec_pod):
+    """
+    Jobs are matched across runs by their workload and its parameters, and
+    the runtime parameters they were run with.
+
+    """
+    params = [spec_pod.get('workload_parameters') or {},
+              spec_pod.get('runtime_parameters') or {}]
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return '{}:{}'.format(spec_pod['workload_name'], digest.hexdigest()[:12])
+
+
+def is_run_output(path):
+    return os.path.isfile(os.path.join(path, '__meta', 'run_info.json'))
+
+
+def find_run_outputs(path, recursive=True):
+    """
+    Yield the run output directories under ``path``. If ``recursive`` is
+    ``False``, only ``path`` itself and the directories directly inside it
+    are checked.
+
+    """
+    if not recursive:
+        if is_run_output(path):
+            yield path
+            return
+        for name in sorted(os.listdir(path)):
+            subpath = os.path.join(path, name)
+            if os.path.isdir(subpath) and is_run_output(subpath):
+                yield subpath
+        return
+    for root, dirs, _ in os.walk(path):
+        if is_run_output(root):
+            del dirs[:]  # do not descend into job output directories
+            yield root
+
+
+class DurationIndex(object):
+    """
+    The number and total of the durations of successfully completed jobs
+    from previous runs, for each spec (see ``get_spec_key()``) and each
+    workload. Runs are identified by their UUID, so each is only added once.
+
+    Runs from before job durations were recorded only contribute the
+    duration of the whole run, divided evenly between their jobs.
+
+    """
+
+    @staticmethod
+    def from_pod(pod):
+        instance = DurationIndex()
+        instance.runs = set(pod['runs'])
+        instance.specs = {k: tuple(v) for k, v in pod['specs'].items()}
+        instance.workloads = {k: tuple(v) for k, v in pod['workloads'].items()}
+        return instance
+
+    @staticmethod
+    def load(filepath):
+        if os.path.isfile(filepath):
+            try:
+                return DurationIndex.from_pod(read_pod(filepath))
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug('Ignoring invalid duration index {}: {}'.format(filepath, e))
+        return DurationIndex()
+
+    @property
+    def mean(self):
+        count = sum(c for c, _ in self.workloads.values())
+        if not count:
+            return None
+        return sum(t for _, t in self.workloads.values()) / count
+
+    def __init__(self):
+        self.runs = set()
+        self.specs = {}
+        self.workloads = {}
+
+    def add(self, spec_pod, duration):
+        for entries, key in [(self.specs, get_spec_key(spec_pod)),
+                             (self.workloads, spec_pod['workload_name'])]:
+            count, total = entries.get(key, (0, 0.0))
+            entries[key] = (count + 1, total + duration)
+
+    def add_output(self, path):
+        """
+        Add the jobs from the run output at ``path``. Returns ``False`` if the
+        run has already been added or its jobs could not be read.
+
+        """
+        metadir = os.path.join(path, '__meta')
+        try:
+            info = read_pod(os.path.join(metadir, 'run_info.json'))
+            if info['uuid'] in self.runs:
+                return False
+            state = read_pod(os.path.join(path, '.run_state.json'))
+            specs = {s['id']: s for s in read_pod(os.path.join(metadir, 'jobs.json'))['jobs']}
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug('Could not read run output {}: {}'.format(path, e))
+            return False
+        if info.get('end_time') is None:
+            return False  # still running (or was killed)
+
+        completed = [j for j in state['jobs'] if j['id'] in specs and
+                     j['status'] in [str(Status.OK), str(Status.PARTIAL)]]
+        if any(j.get('duration') is None for j in completed):
+            if not completed or not info.get('duration'):
+                return False
+            for job in completed:
+                job['duration'] = info['duration'] / len(completed)
+        for job in completed:
+            self.add(specs[job['id']], job['duration'])
+        self.runs.add(info['uuid'])
+        return True
+
+    def update(self, paths, recursive=True):
+        """
+        Add all run outputs under ``paths`` (see ``find_run_outputs()``).
+        Returns the number added.
+
+        """
+        added = 0
+        for path in paths:
+            for output_path in find_run_outputs(path, recursive):
+                if self.add_output(output_path):
+                    added += 1
+        return added
+
+    def estimate(self, spec_pod):
+        """
+        The expected duration of a job for the spec, or ``None`` if there
+        is no history for its workload.
+
+        """
+        for entries, key in [(self.specs, get_spec_key(spec_pod)),
+                             (self.workloads, spec_pod['workload_name'])]:
+            if key in entries:
+                count, total = entries[key]
+                return total / count
+        return None
+
+    def save(self, filepath):
+        ensure_directory_exists(os.path.dirname(filepath))
+        write_pod(self.to_pod(), filepath)
+
+    def to_pod(self):
+        return OrderedDict([
+            ('runs', sorted(self.runs)),
+            ('specs', {k: list(v) for k, v in self.specs.items()}),
+            ('workloads', {k: list(v) for k, v in self.workloads.items()}),
+        ])
+
+
+def plan_jobs(jobs, estimates, budget):
+    """
+    Choose which of ``jobs`` to run so that their total estimated duration
+    fits within ``budget`` seconds. ``estimates`` maps spec IDs to job
+    durations.
+
+    Jobs are considered a round of iterations at a time (the first iteration
+    of every spec, then the second, and so on) in their execution order, so
+    that every spec gets to run before any spec gets extra iterations. Once
+    an iteration of a spec does not fit, no later iterations of that spec are
+    run. Returns the jobs to run and the jobs to skip, both in execution
+    order.
+
+    """
+    remaining = budget
+    selected = set()
+    stopped = set()
+    for job in sorted(jobs, key=lambda j: j.iteration):
+        if job.id in stopped:
+            continue
+        if estimates[job.id] > remaining:
+            stopped.add(job.id)
+            continue
+        remaining -= estimates[job.id]
+        selected.add(id(job))
+    return ([j for j in jobs if id(j) in selected],
+            [j for j in jobs if id(j) not in selected])
@@ -0,0 +1,168 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Records where wall-clock time goes during a run. When enabled, the duration
+of every phase wrapped with ``signal.wrap()`` and of every instrument
+callback is recorded against the job that was running at the time.
+
+"""
+import threading
+from collections import OrderedDict
+
+from wa.utils.doc import format_simple_table
+
+
+# The profiler for the current run, or ``None`` if timings are not being
+# recorded. This is checked on every wrapped phase and callback, so must be
+# cheap to access.
+_profiler = None
+
+
+def enable():
+    global _profiler  # pylint: disable=global-statement
+    _profiler = PhaseProfiler()
+    return _profiler
+
+
+def disable():
+    global _profiler  # pylint: disable=global-statement
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+class PhaseTiming(object):
+
+    @staticmethod
+    def from_pod(pod):
+        return PhaseTiming(**pod)
+
+    def __init__(self, job, kind, name, start, duration):
+        self.job = job
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.duration = duration
+
+    def to_pod(self):
+        return OrderedDict([('job', self.job), ('kind', self.kind),
+                            ('name', self.name), ('start', self.start),
+                            ('duration', self.duration)])
+
+    def __repr__(self):
+        return 'PhaseTiming({}, {}, {}, {:.3f})'.format(self.job, self.kind,
+                                                        self.name, self.duration)
+
+
+class PhaseProfiler(object):
+    """
+    Collects ``PhaseTiming``\ s. ``kind`` is either ``"phase"`` (the name is
+    that of the wrapped signal, e.g. ``"WORKLOAD_SETUP"``) or ``"callback"``
+    (the name is ``"<instrument>.<method>"``). Timings recorded outside of a
+    job have a ``job`` of ``None``.
+
+    """
+
+    job_phase = 'JOB'
+    workload_phase = 'WORKLOAD_EXECUTION'
+
+    @staticmethod
+    def from_pod(pod):
+        instance = PhaseProfiler()
+        instance.timings = [PhaseTiming.from_pod(t) for t in pod['timings']]
+        return instance
+
+    def __init__(self):
+        self.job = None
+        self.timings = []
+        self._lock = threading.Lock()
+
+    def start_job(self, job):
+        self.job = '{}-{}'.format(job.id, job.iteration)
+
+    def end_job(self):
+        self.job = None
+
+    def record(self, kind, name, start, duration):
+        with self._lock:
+            self.timings.append(PhaseTiming(self.job, kind, name, start, duration))
+
+    def to_pod(self):
+        return {'timings': [t.to_pod() for t in self.timings]}
+
+    def get_job_summary(self):
+        """
+        Returns a list of ``(job, total, workload, overhead)`` tuples, where
+        ``total`` is the time spent running the job, ``workload`` is the time
+        spent executing the workload itself, and ``overhead`` is the rest.
+
+        """
+        totals = OrderedDict()
+        workload = {}
+        for timing in self.timings:
+            if timing.job is None or timing.kind != 'phase':
+                continue
+            if timing.name == self.job_phase:
+                totals[timing.job] = totals.get(timing.job, 0) + timing.duration
+            elif timing.name == self.workload_phase:
+                workload[timing.job] = workload.get(timing.job, 0) + timing.duration
+        return [(job, total, workload.get(job, 0), total - workload.get(job, 0))
+                for job, total in totals.items()]
+
+    def get_phase_summary(self):
+        """
+        Returns a list of ``(kind, name, count, total)`` tuples for each
+        distinct phase and callback, in the order they were first seen.
+
+        """
+        summary = OrderedDict()
+        for timing in self.timings:
+            key = (timing.kind, timing.name)
+            count, total = summary.get(key, (0, 0))
+            summary[key] = (count + 1, total + timing.duration)
+        return [(kind, name, count, total)
+                for (kind, name), (count, total) in summary.items()]
+
+    def format_summary(self):
+        rows = [(kind, name, count, '{:.3f}'.format(total), '{:.3f}'.format(total / count))
+                for kind, name, count, total in self.get_phase_summary()]
+        result = format_simple_table(rows, headers=['kind', 'name', 'count', 'total (s)', 'mean (s)'],
+                                     align='<<>>>')
+
+        job_summary = self.get_job_summary()
+        rows = []
+        for job, total, workload, overhead in job_summary:
+            rows.append((job, '{:.3f}'.format(total), '{:.3f}'.format(workload),
+                         '{:.3f}'.format(overhead), _format_percent(overhead, total)))
+        if job_summary:
+            total = sum(s[1] for s in job_summary)
+            workload = sum(s[2] for s in job_summary)
+            rows.append(('all', '{:.3f}'.format(total), '{:.3f}'.format(workload),
+                         '{:.3f}'.format(total - workload),
+                         _format_percent(total - workload, total)))
+        result += format_simple_table(rows, headers=['job', 'total (s)', 'workload (s)',
+                                                     'overhead (s)', 'overhead'],
+                                      align='<>>>>')
+        return result
+
+
+def _format_percent(value, total):
+    if not total:
+        return '-'
+    return '{:.1f}%'.format(100.0 * value / total)
@@ -0,0 +1,255 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Quiet windows, during which the framework avoids interacting with the target
+so as not to disturb measurements. When enabled, the execution of each
+workload is a quiet window.
+
+Target interactions that are not essential should go through this module:
+periodic checks should be skipped while ``is_quiet()``, and one-off
+interactions can be passed to ``defer()`` to be performed once the window
+ends. Code that must interact with the target during the window (e.g. to
+collect measurements) declares it by running inside ``allowed()``; instrument
+callbacks are always run inside ``allowed()``, so interactions by instruments
+(including by any threads they start, e.g. to poll the target) are declared
+under the instrument's name.
+
+Every call made over the target's connections during a window is recorded,
+and a report is added to the job's output. devlib targets have a connection
+per thread; those created during the window are recorded as well.
+
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from wa.utils.serializer import write_pod
+
+
+logger = logging.getLogger('quiet')
+
+# Connection methods whose calls are recorded during a quiet window.
+RECORDED_METHODS = ['execute', 'background', 'push', 'pull']
+
+# The gate for the current run, or ``None`` if quiet windows are not enabled.
+_gate = None
+
+
+def enable():
+    global _gate  # pylint: disable=global-statement
+    _gate = QuietGate()
+    return _gate
+
+
+def disable():
+    global _gate  # pylint: disable=global-statement
+    gate, _gate = _gate, None
+    return gate
+
+
+def get_gate():
+    return _gate
+
+
+def is_quiet():
+    return _gate is not None and _gate.is_quiet
+
+
+def defer(func, *args, **kwargs):
+    """
+    Call ``func`` with the specified arguments, unless inside a quiet window,
+    in which case it is called when the window ends.
+
+    """
+    if is_quiet():
+        _gate.defer(func, args, kwargs)
+    else:
+        func(*args, **kwargs)
+
+
+@contextmanager
+def allowed(name):
+    """
+    Declare that target interactions by the current thread inside this block
+    are necessary, even during a quiet window. ``name`` identifies the
+    interacting component in the report. Threads started inside the block
+    that are still running once it ends are declared under the same name.
+
+    """
+    gate = _gate
+    if gate is None:
+        yield
+        return
+    previous = getattr(gate.local, 'declared', None)
+    gate.local.declared = name
+    existing = set(threading.enumerate())
+    try:
+        yield
+    finally:
+        gate.local.declared = previous
+        for thread in threading.enumerate():
+            if thread not in existing:
+                gate.declare_thread(thread, name)
+
+
+@contextmanager
+def window(context):
+    """
+    Make the body a quiet window, if enabled. Calls made by the current
+    thread are attributed to the workload. The report is written to the
+    job's output once the window ends.
+
+    """
+    gate = _gate
+    if gate is None:
+        yield
+        return
+    gate.enter(context.tm.target)
+    try:
+        with allowed('workload'):
+            yield
+    finally:
+        report = gate.exit()
+        report_file = os.path.join(context.output_directory, 'quiet_window.json')
+        write_pod(report, report_file)
+        context.add_artifact('quiet_window', report_file, kind='meta',
+                             description='Target calls made during workload execution')
+        if report['undeclared']:
+            logger.warning('{} undeclared target call(s) during quiet window; see {}'
+                           .format(report['undeclared'], report_file))
+        gate.run_deferred()
+
+
+class TargetCall(object):
+
+    def __init__(self, time, method, args, thread, declared):  # pylint: disable=redefined-outer-name
+        self.time = time
+        self.method = method
+        self.args = args
+        self.thread = thread
+        self.declared = declared
+
+    def to_pod(self):
+        return OrderedDict([('time', self.time), ('method', self.method),
+                            ('args', self.args), ('thread', self.thread),
+                            ('declared', self.declared)])
+
+
+class QuietGate(object):
+    """
+    Records the calls made over a target's connections during a quiet window,
+    and holds the interactions deferred until it ends. ``time`` of recorded
+    ``TargetCall``\ s is relative to the start of the window.
+
+    """
+
+    @property
+    def is_quiet(self):
+        return self.target is not None
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.target = None
+        self.start_time = None
+        self.calls = []
+        self.deferred = []
+        self.threads = {}
+        self._replaced = []
+
+    def enter(self, target):
+        self.start_time = time.time()
+        self.calls = []
+        self.target = target
+        self._replaced = []
+        # devlib targets keep a connection for each thread that has used
+        # them, and create one when a new thread first does so.
+        connections = getattr(target, '_connections', None)
+        if connections is None:
+            connections = {None: target.conn}
+        for conn in list(connections.values()):
+            self._wrap_connection(conn)
+        get_connection = getattr(target, 'get_connection', None)
+        if get_connection is not None:
+            def wrapper(*args, **kwargs):
+                conn = get_connection(*args, **kwargs)
+                with self.lock:
+                    if self.target is target:
+                        self._wrap_connection(conn)
+                return conn
+            self._replace(target, 'get_connection', wrapper)
+
+    def exit(self):
+        """End the window, returning the report of calls made during it."""
+        with self.lock:
+            # Methods are normally looked up on the class, so are restored by
+            # removing the wrappers; any set on the instance are put back.
+            for obj, name, original in reversed(self._replaced):
+                if original is None:
+                    delattr(obj, name)
+                else:
+                    setattr(obj, name, original)
+            self._replaced = []
+            self.target = None
+        duration = time.time() - self.start_time
+        with self.lock:
+            calls = list(self.calls)
+        return OrderedDict([
+            ('duration', duration),
+            ('calls', len(calls)),
+            ('undeclared', len([c for c in calls if c.declared is None])),
+            ('deferred', len(self.deferred)),
+            ('records', [c.to_pod() for c in calls]),
+        ])
+
+    def declare_thread(self, thread, name):
+        with self.lock:
+            self.threads = {t: n for t, n in self.threads.items() if t.is_alive()}
+            self.threads[thread] = name
+
+    def defer(self, func, args, kwargs):
+        with self.lock:
+            self.deferred.append((func, args, kwargs))
+
+    def run_deferred(self):
+        with self.lock:
+            deferred, self.deferred = self.deferred, []
+        for func, args, kwargs in deferred:
+            func(*args, **kwargs)
+
+    def _wrap_connection(self, conn):
+        for name in RECORDED_METHODS:
+            method = getattr(conn, name, None)
+            if method is not None:
+                self._replace(conn, name, self._record_calls(name, method))
+
+    def _replace(self, obj, name, value):
+        self._replaced.append((obj, name, obj.__dict__.get(name)))
+        setattr(obj, name, value)
+
+    def _record_calls(self, name, method):
+        def wrapper(*args, **kwargs):
+            thread = threading.current_thread()
+            with self.lock:
+                declared = getattr(self.local, 'declared', None) or self.threads.get(thread)
+                call = TargetCall(time.time() - self.start_time, name,
+                                  [str(a) for a in args], thread.name, declared)
+                self.calls.append(call)
+            return method(*args, **kwargs)
+        return wrapper
@@ -12,13 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import hashlib
 import logging
 import os
 import re
+import threading
 
 from devlib.utils.android import ApkInfo
+from future.moves.queue import Queue
 
-from wa.framework import pluginloader
+from wa.framework import pluginloader, quiet
 from wa.framework.plugin import Plugin
 from wa.framework.exception import ResourceError
 from wa.framework.configuration import settings
@@ -233,6 +236,16 @@ class ResourceResolver(object):
         self.logger = logging.getLogger('resolver')
         self.getters = []
         self.sources = prioritylist()
+        # When resources are prefetched, found results are cached so that they
+        # are only resolved once (see enable_cache()). Different resources may
+        # be resolved concurrently (by the prefetcher and the main thread);
+        # requests for a resource that is already being resolved wait for
+        # that to complete.
+        self.cache_enabled = False
+        self._cache = {}
+        self._hashes = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
 
     def load(self):
         for gettercls in self.loader.list_plugins('resource_getter'):
@@ -249,6 +262,15 @@ class ResourceResolver(object):
         self.logger.debug(msg.format(get_object_name(source), priority))
         self.sources.add(source, priority)
 
+    def enable_cache(self):
+        """
+        Cache the results of ``get()``. Resources are looked up again if
+        anything they may be resolved by differs, i.e. their attributes or
+        their owner's module, name or parameter values.
+
+        """
+        self.cache_enabled = True
+
     def get(self, resource, strict=True):
         """
         Uses registered getters to attempt to discover a resource of the specified
@@ -258,6 +280,39 @@ class ResourceResolver(object):
         ``None``.
 
         """
+        key = _get_cache_key(resource) if self.cache_enabled else None
+        if key is None:
+            result = self._resolve(resource)
+        else:
+            while True:
+                with self._lock:
+                    if key in self._cache:
+                        self.logger.debug('Resource {} found in cache:'.format(resource))
+                        self.logger.debug('\t{}'.format(self._cache[key]))
+                        return self._cache[key]
+                    in_flight = self._in_flight.get(key)
+                    if in_flight is None:
+                        in_flight = self._in_flight[key] = threading.Event()
+                        break
+                # If it was not found, it is looked up again by this thread.
+                in_flight.wait()
+            try:
+                result = self._resolve(resource)
+                if result is not None:
+                    with self._lock:
+                        self._cache[key] = result
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                in_flight.set()
+        if result is not None:
+            return result
+        if strict:
+            raise ResourceError('{} could not be found'.format(resource))
+        self.logger.debug('Resource {} not found.'.format(resource))
+        return None
+
+    def _resolve(self, resource):
         self.logger.debug('Resolving {}'.format(resource))
         for source in self.sources:
             source_name = get_object_name(source)
@@ -268,11 +323,105 @@ class ResourceResolver(object):
                 self.logger.debug(msg.format(resource, source_name))
                 self.logger.debug('\t{}'.format(result))
                 return result
-        if strict:
-            raise ResourceError('{} could not be found'.format(resource))
-        self.logger.debug('Resource {} not found.'.format(resource))
         return None
 
+    def get_md5(self, path):
+        """
+        Return the MD5 hex digest of the file at the specified path. Digests
+        are cached for as long as the file's size and modification time
+        remain the same.
+
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        if key not in self._hashes:
+            md5hash = hashlib.md5()
+            with open(path, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                    md5hash.update(chunk)
+            self._hashes[key] = md5hash.hexdigest()
+        return self._hashes[key]
+
+    def get_resolved_paths(self):
+        with self._lock:
+            return list(self._cache.values())
+
+
+class ResourcePrefetcher(object):
+    """
+    Resolves resources needed by upcoming workloads (via their
+    ``prefetch_resources()`` method) in a background thread, so that they are
+    already in the resolver's cache by the time they are needed. Prefetching
+    is suspended during quiet windows (see ``wa.framework.quiet``).
+
+    """
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.logger = logging.getLogger('prefetcher')
+        self.queue = Queue()
+        self.worker = None
+        self._submitted = set()
+        self._stopping = False
+
+    def start(self):
+        self.worker = threading.Thread(target=self._run, name='ResourcePrefetcher')
+        self.worker.daemon = True
+        self.worker.start()
+
+    def prefetch(self, workloads):
+        for workload in workloads:
+            if workload is None or id(workload) in self._submitted:
+                continue
+            self._submitted.add(id(workload))
+            self.queue.put(workload)
+
+    def wait(self):
+        self.queue.join()
+
+    def stop(self):
+        if self.worker is None:
+            return
+        self._stopping = True
+        self.queue.put(None)
+        self.worker.join()
+        self.worker = None
+
+    def _run(self):
+        while True:
+            workload = self.queue.get()
+            if workload is None or self._stopping:
+                self.queue.task_done()
+                break
+            if quiet.is_quiet():
+                # Resolution may interact with the target, so is resumed once
+                # the quiet window has ended.
+                quiet.defer(self.queue.put, workload)
+                self.queue.task_done()
+                continue
+            try:
+                self.logger.debug('Prefetching resources for {}'.format(workload.name))
+                workload.prefetch_resources(self.resolver)
+                for path in self.resolver.get_resolved_paths():
+                    if os.path.isfile(path):
+                        self.resolver.get_md5(path)
+            except Exception as e:  # pylint: disable=broad-except
+                # Any genuine problem will be reported when the resource is
+                # actually requested.
+                self.logger.debug('Could not prefetch resources for {}: {}'.format(workload.name, e))
+            finally:
+                self.queue.task_done()
+
+
+def _get_cache_key(resource):
+    owner = resource.owner
+    owner_name = getattr(owner, 'name', None) or str(owner)
+    owner_params = sorted((p.name, repr(getattr(owner, p.name, None)))
+                          for p in getattr(owner, 'parameters', []))
+    attrs = sorted((k, repr(v)) for k, v in vars(resource).items() if k != 'owner')
+    return (resource.__class__.__name__, getattr(owner, '__module__', None),
+            owner_name, tuple(owner_params), tuple(attrs))
+
 
 def apk_version_matches(path, version):
     info = ApkInfo(path)
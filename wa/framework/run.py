@@ -91,6 +91,8 @@ class RunState(object):
     def update_job(self, job):
         state = self.jobs[(job.id, job.iteration)]
         state.status = job.status
+        state.retries = job.retries
+        state.duration = job.duration
         state.timestamp = datetime.utcnow()
 
     def get_status_counts(self):
@@ -113,6 +115,7 @@ class JobState(object):
     def from_pod(pod):
         instance = JobState(pod['id'], pod['label'], pod['iteration'], Status(pod['status']))
         instance.retries = pod['retries']
+        instance.duration = pod.get('duration')
         instance.timestamp = pod['timestamp']
         return instance
 
@@ -127,6 +130,7 @@ class JobState(object):
         self.iteration = iteration
         self.status = status
         self.retries = 0
+        self.duration = None
         self.timestamp = datetime.utcnow()
 
     def to_pod(self):
@@ -135,6 +139,7 @@ class JobState(object):
             label=self.label,
             iteration=self.iteration,
             status=str(self.status),
-            retries=0,
+            retries=self.retries,
+            duration=self.duration,
             timestamp=self.timestamp,
         )
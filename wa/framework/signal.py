@@ -15,17 +15,28 @@
 
 
 """
-This module wraps louie signalling mechanism. It relies on modified version of loiue
-that has prioritization added to handler invocation.
+This module implements WA's signalling mechanism. It follows the semantics of
+louie's dispatcher (whose ``Any`` and ``Anonymous`` senders it uses), with
+prioritization added to handler invocation. The ordered handlers for each
+signal/sender combination are compiled once, rather than on every send.
+
+Handlers with a true ``concurrent`` attribute that are adjacent in that order
+are invoked at the same time, each on its own thread (see
+``ConcurrentHandlers``). Ordering relative to other handlers is preserved.
 
 """
 import sys
+import time
 import logging
+import threading
 from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 
 import wrapt
+from future.utils import raise_
 from louie import dispatcher
 
+from wa.framework import profiling
 from wa.utils.types import prioritylist, enum
 
 
@@ -189,16 +200,12 @@ CallbackPriority = enum(['extremely_low', 'very_low', 'low', 'normal',
                          'high', 'very_high', 'extremely_high'], -30, 10)
 
 
-class _prioritylist_wrapper(prioritylist):
-    """
-    This adds a NOP append() method so that when louie invokes it to add the
-    handler to receivers, nothing will happen; the handler is actually added inside
-    the connect() below according to priority, before louie's connect() gets invoked.
-
-    """
+# Handlers connected to each (sender key, signal), ordered by priority.
+_receivers = {}
 
-    def append(self, *args, **kwargs):
-        pass
+# Compiled dispatch tuples for each (sender key, signal); see _get_dispatch().
+# This is cleared whenever a handler is connected or disconnected.
+_dispatch_cache = {}
 
 
 def connect(handler, signal, sender=dispatcher.Any, priority=0):
@@ -233,20 +240,15 @@ def connect(handler, signal, sender=dispatcher.Any, priority=0):
                              for details.
 
     """
-    logger.debug('Connecting {} to {}({}) with priority {}'.format(handler, signal, sender, priority))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Connecting {} to {}({}) with priority {}'.format(handler, signal, sender, priority))
     if getattr(signal, 'invert_priority', False):
         priority = -priority
-    senderkey = id(sender)
-    if senderkey in dispatcher.connections:
-        signals = dispatcher.connections[senderkey]
-    else:
-        dispatcher.connections[senderkey] = signals = {}
-    if signal in signals:
-        receivers = signals[signal]
-    else:
-        receivers = signals[signal] = _prioritylist_wrapper()
-    receivers.add(handler, priority)
-    dispatcher.connect(handler, signal, sender)
+    key = (id(sender), signal)
+    if key not in _receivers:
+        _receivers[key] = prioritylist()
+    _receivers[key].add(handler, priority)
+    _dispatch_cache.clear()
 
 
 def disconnect(handler, signal, sender=dispatcher.Any):
@@ -263,8 +265,16 @@ def disconnect(handler, signal, sender=dispatcher.Any):
                 sent by this sender.
 
     """
-    logger.debug('Disconnecting {} from {}({})'.format(handler, signal, sender))
-    dispatcher.disconnect(handler, signal, sender)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Disconnecting {} from {}({})'.format(handler, signal, sender))
+    key = (id(sender), signal)
+    receivers = _receivers.get(key)
+    if receivers is None or handler not in list(receivers):
+        return
+    receivers.remove(handler)
+    if not len(receivers):
+        del _receivers[key]
+    _dispatch_cache.clear()
 
 
 def send(signal, sender=dispatcher.Anonymous, *args, **kwargs):
@@ -280,9 +290,158 @@ def send(signal, sender=dispatcher.Anonymous, *args, **kwargs):
 
         The rest of the parameters will be passed on as aruments to the handler.
 
+    Returns a list of ``(handler, response)`` tuples. As with louie, an
+    exception raised by a handler propagates to the sender, and the
+    remaining handlers are not invoked.
+
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Sending {} from {}'.format(signal, sender))
+    named = dict(kwargs, signal=signal, sender=sender)
+    responses = []
+    for entry in _get_dispatch(signal, sender):
+        if isinstance(entry, ConcurrentHandlers):
+            responses.extend(entry.invoke(signal, args, named))
+        else:
+            responses.append(_invoke(entry, args, named))
+    return responses
+
+
+def _invoke(entry, args, named):
+    handler, argnames, varkw = entry
+    if varkw:
+        response = handler(*args, **named)
+    elif len(argnames) > len(args):
+        # Only pass on named arguments the handler can accept.
+        acceptable = argnames[len(args):]
+        response = handler(*args, **dict((k, v) for k, v in named.items()
+                                         if k in acceptable))
+    else:
+        response = handler(*args)
+    return (handler, response)
+
+
+class ConcurrentHandlers(object):
     """
-    logger.debug('Sending {} from {}'.format(signal, sender))
-    return dispatcher.send(signal, sender, *args, **kwargs)
+    A group of handlers invoked at the same time, each on a thread of a pool.
+    The threads wait at a barrier until all of them are ready, so that the
+    handlers begin as close together as possible, and the send does not
+    proceed until all of them have returned. The time between the first and
+    the last handler beginning (the skew) is logged, and recorded by the
+    phase profiler, if enabled.
+
+    If any of the handlers raise, the first (in priority order) exception is
+    re-raised on the sending thread once all of them have returned.
+
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def invoke(self, signal, args, named):
+        count = len(self.entries)
+        ready = [0]
+        barrier = threading.Condition()
+        starts = [None] * count
+
+        def run(i):
+            with barrier:
+                ready[0] += 1
+                if ready[0] == count:
+                    barrier.notify_all()
+                while ready[0] < count:
+                    barrier.wait()
+            starts[i] = time.time()
+            try:
+                return _invoke(self.entries[i], args, named), None
+            except BaseException:  # pylint: disable=broad-except
+                return None, sys.exc_info()
+
+        pool = ThreadPool(count)
+        try:
+            results = pool.map(run, range(count), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        skew = max(starts) - min(starts)
+        logger.debug('Invoked {} handlers for {} concurrently; skew {:.1f}ms'
+                     .format(count, signal, skew * 1000))
+        profiler = profiling.get_profiler()
+        if profiler:
+            profiler.record('skew', str(signal), min(starts), skew)
+        for _, exc_info in results:
+            if exc_info is not None:
+                raise_(*exc_info)
+        return [response for response, _ in results]
+
+
+def _get_dispatch(signal, sender):
+    key = (id(sender), signal)
+    dispatch = _dispatch_cache.get(key)
+    if dispatch is None:
+        if key not in _receivers:
+            # Nothing is connected for this specific sender, so share the
+            # dispatch tuple for "any sender".
+            key = (id(dispatcher.Any), signal)
+            dispatch = _dispatch_cache.get(key)
+            if dispatch is not None:
+                return dispatch
+        dispatch = _dispatch_cache[key] = _compile_dispatch(signal, sender)
+    return dispatch
+
+
+def _compile_dispatch(signal, sender):
+    """
+    Returns a tuple of ``(handler, argnames, varkw)`` for each handler to be
+    invoked (handlers for the specific sender first, followed by those for
+    any sender, each in priority order), where ``argnames`` are the names of
+    the arguments the handler accepts and ``varkw`` indicates whether it
+    accepts arbitrary keyword arguments. Runs of adjacent concurrent handlers
+    are replaced with a ``ConcurrentHandlers`` of their tuples.
+
+    """
+    dispatch = []
+    seen = set()
+    concurrent = []
+    for key in [(id(sender), signal), (id(dispatcher.Any), signal)]:
+        for handler in _receivers.get(key, []):
+            try:
+                if handler in seen:
+                    continue
+                seen.add(handler)
+            except TypeError:  # unhashable handler
+                pass
+            argnames, varkw = _get_signature(handler)
+            if getattr(handler, 'concurrent', False):
+                concurrent.append((handler, argnames, varkw))
+                continue
+            _add_concurrent(dispatch, concurrent)
+            concurrent = []
+            dispatch.append((handler, argnames, varkw))
+    _add_concurrent(dispatch, concurrent)
+    return tuple(dispatch)
+
+
+def _add_concurrent(dispatch, entries):
+    if len(entries) > 1:
+        dispatch.append(ConcurrentHandlers(entries))
+    else:
+        dispatch.extend(entries)
+
+
+def _get_signature(handler):
+    func = handler
+    if not hasattr(func, '__code__') and not hasattr(func, '__func__') \
+            and hasattr(func, '__call__'):
+        func = func.__call__
+    if hasattr(func, '__func__'):
+        code, start = func.__func__.__code__, 1
+    elif hasattr(func, '__code__'):
+        code, start = func.__code__, 0
+    else:  # e.g. a builtin; only positional arguments are passed on
+        return (), False
+    return code.co_varnames[start:code.co_argcount], bool(code.co_flags & 0x08)
 
 
 # This will normally be set to log_error() by init_logging(); see wa.utils.log
@@ -298,7 +457,8 @@ def safe_send(signal, sender=dispatcher.Anonymous,
     to just ``[KeyboardInterrupt]``).
     """
     try:
-        logger.debug('Safe-sending {} from {}'.format(signal, sender))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Safe-sending {} from {}'.format(signal, sender))
         send(signal, sender, *args, **kwargs)
     except Exception as e:
         if any(isinstance(e, p) for p in propagate):
@@ -319,11 +479,20 @@ def wrap(signal_name, sender=dispatcher.Anonymous,*args, **kwargs):
         after_signal = globals()['AFTER_' + signal_name]
     except KeyError:
         raise ValueError('Invalid wrapped signal name: {}'.format(signal_name))
+    profiler = profiling.get_profiler()
+    start = None
     try:
         send_func(before_signal, sender, *args, **kwargs)
+        if profiler:
+            start = time.time()
         yield
+        if profiler:
+            profiler.record('phase', signal_name, start, time.time() - start)
+            start = None
         send_func(success_signal, sender, *args, **kwargs)
     finally:
+        if start is not None:
+            profiler.record('phase', signal_name, start, time.time() - start)
         exc_type, exc, tb = sys.exc_info()
         if exc:
             log_error_func(exc)
@@ -1,11 +1,17 @@
+import atexit
 import logging
 import os
+import shlex
 import shutil
+import subprocess
 import sys
 import tempfile
 import threading
 import time
 
+from devlib.utils.android import get_adb_command
+
+from wa.framework import quiet
 from wa.framework.plugin import Parameter
 from wa.framework.exception import WorkerThreadError
 from wa.utils.misc import touch
@@ -27,6 +33,9 @@ class LinuxAssistant(object):
     def stop(self):
         pass
 
+    def finalize(self):
+        pass
+
 
 class AndroidAssistant(object):
 
@@ -50,19 +59,40 @@ class AndroidAssistant(object):
                   periodically during the course of the run and stored in a
                   temporary locaiton on the host. Setting the value of the poll
                   period enables this behavior.
+
+                  .. note:: Polling is suspended during quiet windows (see the
+                            ``quiet_execution`` setting), so lines may still
+                            be lost if the buffer fills up while a workload is
+                            running. Use ``logcat_stream`` to avoid this.
+                  """),
+        Parameter('logcat_stream', kind=bool, default=False,
+                  description="""
+                  If ``True``, logcat is captured continuously for the whole
+                  run by a ``logcat`` process streaming to a file on the host,
+                  and the log for each job is the part of that file written
+                  while the job was running. Unlike polling, this does not
+                  periodically dump and clear the buffer on the target, so
+                  does not lose lines or perturb the target during
+                  measurements. If set, ``logcat_poll_period`` is ignored.
                   """),
     ]
 
-    def __init__(self, target, logcat_poll_period=None, disable_selinux=True):
+    def __init__(self, target, logcat_poll_period=None, disable_selinux=True,
+                 logcat_stream=False):
         self.target = target
         self.logcat_poll_period = logcat_poll_period
         self.disable_selinux = disable_selinux
         self.logcat_poller = None
+        self.logcat_streamer = LogcatStreamer(target) if logcat_stream else None
+        self.logcat_offset = 0
         if self.target.is_rooted and self.disable_selinux:
             self.do_disable_selinux()
 
     def start(self):
-        if self.logcat_poll_period:
+        if self.logcat_streamer:
+            self.logcat_streamer.start()
+            self.logcat_offset = self.logcat_streamer.mark()
+        elif self.logcat_poll_period:
             self.logcat_poller = LogcatPoller(self.target, self.logcat_poll_period)
             self.logcat_poller.start()
 
@@ -70,6 +100,10 @@ class AndroidAssistant(object):
         if self.logcat_poller:
             self.logcat_poller.stop()
 
+    def finalize(self):
+        if self.logcat_streamer:
+            self.logcat_streamer.stop()
+
     def extract_results(self, context):
         logcat_file = os.path.join(context.output_directory, 'logcat.log')
         self.dump_logcat(logcat_file)
@@ -77,12 +111,16 @@ class AndroidAssistant(object):
         self.clear_logcat()
 
     def dump_logcat(self, outfile):
-        if self.logcat_poller:
+        if self.logcat_streamer:
+            self.logcat_offset = self.logcat_streamer.write_log(outfile, self.logcat_offset)
+        elif self.logcat_poller:
             self.logcat_poller.write_log(outfile)
         else:
             self.target.dump_logcat(outfile)
 
     def clear_logcat(self):
+        if self.logcat_streamer:
+            return  # the stream is sliced, so the buffer does not need clearing
         if self.logcat_poller:
             self.logcat_poller.clear_buffer()
 
@@ -118,7 +156,7 @@ class LogcatPoller(threading.Thread):
                     break
                 with self.lock:
                     current_time = time.time()
-                    if (current_time - self.last_poll) >= self.period:
+                    if (current_time - self.last_poll) >= self.period and not quiet.is_quiet():
                         self.poll()
                 time.sleep(0.5)
         except Exception:  # pylint: disable=W0703
@@ -159,15 +197,89 @@ class LogcatPoller(threading.Thread):
         self.target.clear_logcat()
 
 
+class LogcatStreamer(object):
+    """
+    Captures logcat with a long-lived ``logcat`` process writing to a file on
+    the host. Logs for part of the run are extracted by the byte offsets into
+    that file at which they start and end (see ``mark()``). The process is
+    also stopped when WA exits, should ``stop()`` not be called.
+
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.logger = logging.getLogger('logcat')
+        self.buffer_file = tempfile.mktemp()
+        self.process = None
+        self._exit_handler_registered = False
+
+    def start(self):
+        """
+        Start streaming, unless already doing so. If the ``logcat`` process
+        has exited (e.g. because the target was rebooted), it is restarted,
+        appending to the same file.
+
+        """
+        if self.process is not None:
+            if self.process.poll() is None:
+                return
+            self.logger.debug('logcat exited with code {}; restarting'
+                              .format(self.process.returncode))
+        command = get_adb_command(self.target.adb_name, 'logcat',
+                                  adb_server=getattr(self.target.conn, 'adb_server', None))
+        self.logger.debug('Streaming logcat to {}'.format(self.buffer_file))
+        with open(self.buffer_file, 'ab') as fh:
+            with open(os.devnull, 'w') as devnull:
+                self.process = subprocess.Popen(shlex.split(command),
+                                                stdout=fh, stderr=devnull)
+        if not self._exit_handler_registered:
+            atexit.register(self._terminate)
+            self._exit_handler_registered = True
+
+    def stop(self):
+        self._terminate()
+        if os.path.isfile(self.buffer_file):
+            os.remove(self.buffer_file)
+
+    def _terminate(self):
+        if self.process is not None and self.process.poll() is None:
+            self.logger.debug('Stopping logcat stream')
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+
+    def mark(self):
+        """The offset of the end of the log captured so far."""
+        if not os.path.isfile(self.buffer_file):
+            return 0
+        return os.path.getsize(self.buffer_file)
+
+    def write_log(self, outfile, start):
+        """
+        Write the log captured since offset ``start`` to ``outfile``. Returns
+        the offset of the end of the written log.
+
+        """
+        end = self.mark()
+        with open(outfile, 'wb') as wfh:
+            if end > start:
+                with open(self.buffer_file, 'rb') as rfh:
+                    rfh.seek(start)
+                    wfh.write(rfh.read(end - start))
+        return end
+
+
 class ChromeOsAssistant(LinuxAssistant):
 
     parameters = LinuxAssistant.parameters + AndroidAssistant.parameters
 
-    def __init__(self, target, logcat_poll_period=None, disable_selinux=True):
+    def __init__(self, target, logcat_poll_period=None, disable_selinux=True,
+                 logcat_stream=False):
         super(ChromeOsAssistant, self).__init__(target)
         if target.supports_android:
             self.android_assistant = AndroidAssistant(target.android_container,
-                                                      logcat_poll_period, disable_selinux)
+                                                      logcat_poll_period, disable_selinux,
+                                                      logcat_stream)
         else:
             self.android_assistant = None
 
@@ -185,3 +297,8 @@ class ChromeOsAssistant(LinuxAssistant):
         super(ChromeOsAssistant, self).stop()
         if self.android_assistant:
             self.android_assistant.stop()
+
+    def finalize(self):
+        super(ChromeOsAssistant, self).finalize()
+        if self.android_assistant:
+            self.android_assistant.finalize()
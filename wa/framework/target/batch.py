@@ -0,0 +1,151 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import tempfile
+import uuid
+
+from devlib.utils.types import boolean
+
+from wa.framework.exception import TargetError
+
+
+class BatchedCommand(object):
+    """
+    The deferred result of a command queued in a ``CommandBatch``. Once the
+    batch has been executed, ``output`` and ``exit_code`` hold the command's
+    output (including stderr) and exit code, and ``value`` holds its result
+    as it would have been returned by the corresponding target method.
+
+    """
+
+    @property
+    def executed(self):
+        return self.exit_code is not None
+
+    @property
+    def value(self):
+        if not self.executed:
+            raise RuntimeError('Command "{}" has not been executed'.format(self.command))
+        self.check()
+        return self.convert(self.output)
+
+    def __init__(self, command, check_exit_code=True, convert=None):
+        self.command = command
+        self.check_exit_code = check_exit_code
+        self.convert = convert or (lambda output: output)
+        self.output = None
+        self.exit_code = None
+
+    def check(self):
+        if self.check_exit_code and self.exit_code:
+            message = 'Got exit code {}\nfrom: {}\nOUTPUT: {}'
+            raise TargetError(message.format(self.exit_code, self.command, self.output))
+
+    def __repr__(self):
+        return 'BatchedCommand({!r}, exit_code={})'.format(self.command, self.exit_code)
+
+
+class CommandBatch(object):
+    """
+    Queues commands to be executed on the target as a single script, so that
+    they take one round trip rather than one each. Each command is run in its
+    own subshell, so a failing command does not prevent the rest from
+    running.
+
+    Methods return ``BatchedCommand``\ s whose results are available once
+    ``execute()`` has been called (see ``TargetManager.batch()``).
+    ``execute()`` raises a ``TargetError`` for the first command that failed
+    and was queued with ``check_exit_code=True``, as ``target.execute()``
+    would have done.
+
+    """
+
+    # Scripts longer than this are pushed to the target, rather than passed
+    # on the command line.
+    max_command_length = 4096
+
+    def __init__(self, target, as_root=False):
+        self.target = target
+        self.as_root = as_root
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def execute(self, command, check_exit_code=True):
+        return self._add(BatchedCommand(command, check_exit_code))
+
+    def read_value(self, path, kind=None):
+        def convert(output):
+            output = output.strip()
+            return kind(output) if kind else output
+        return self._add(BatchedCommand('cat \'{}\''.format(path), convert=convert))
+
+    def file_exists(self, path):
+        command = 'if [ -e \'{}\' ]; then echo 1; else echo 0; fi'.format(path)
+        return self._add(BatchedCommand(command, convert=lambda o: boolean(o.strip())))
+
+    def flush(self):
+        """Execute the queued commands, and raise the error of the first that failed."""
+        commands, self.commands = self.commands, []
+        if not commands:
+            return
+        marker = 'WA-BATCH-{}'.format(uuid.uuid4().hex)
+        lines = []
+        for i, cmd in enumerate(commands):
+            # A newline is added to the output so that the end marker is on a
+            # line of its own; it is removed when the output is parsed.
+            lines.append('echo "{0} {1}"; ({2}) 2>&1; s=$?; echo; echo "{0} {1} $s"'
+                         .format(marker, i, cmd.command))
+        output = self._run('\n'.join(lines) + '\n')
+        self._parse(output.replace('\r\n', '\n'), marker, commands)
+        for cmd in commands:
+            cmd.check()
+
+    def _add(self, command):
+        self.commands.append(command)
+        return command
+
+    def _run(self, script):
+        if len(script) <= self.max_command_length:
+            return self.target.execute(script, check_exit_code=False, as_root=self.as_root)
+        fd, host_path = tempfile.mkstemp(suffix='.sh')
+        try:
+            with os.fdopen(fd, 'w') as wfh:
+                wfh.write(script)
+            target_path = self.target.get_workpath('wa_batch.sh')
+            self.target.push(host_path, target_path)
+            return self.target.execute('sh {}'.format(target_path), check_exit_code=False,
+                                       as_root=self.as_root)
+        finally:
+            os.remove(host_path)
+
+    def _parse(self, output, marker, commands):
+        position = 0
+        for i, cmd in enumerate(commands):
+            start = '{} {}\n'.format(marker, i)
+            end = '\n{} {} '.format(marker, i)
+            start_index = output.find(start, position)
+            end_index = output.find(end, start_index)
+            if start_index < 0 or end_index < 0:
+                raise TargetError('Batched command did not complete: {}'.format(cmd.command))
+            cmd.output = output[start_index + len(start):end_index]
+            position = end_index + len(end)
+            line_end = output.find('\n', position)
+            if line_end < 0:  # trailing newline may have been stripped
+                line_end = len(output)
+            cmd.exit_code = int(output[position:line_end])
+            position = line_end
@@ -0,0 +1,145 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+from glob import glob
+
+from wa.framework.exception import TargetError
+from wa.utils.misc import as_relative
+from wa.utils.misc import ensure_directory_exists as _d
+
+
+class BulkPull(object):
+    """
+    Pulls a number of paths from the target as a single compressed archive
+    created on the target, which is much faster than pulling them one at a
+    time when there are many (small) files.
+
+    As with ``target.pull()``, a path is pulled into ``dest`` if that is an
+    existing directory, and to ``dest`` otherwise. Wildcards may be used in
+    the final component of a path, in which case all matching paths are
+    pulled into ``dest``.
+
+    Files in pseudo file systems (e.g. sysfs) report sizes that do not match
+    their contents, so cannot be archived directly. With ``stage=True``, the
+    paths are first copied to a directory in the target's working directory,
+    and the archive is created from that.
+
+    If the archive cannot be created, the paths are pulled individually.
+
+    """
+
+    tarname = 'wa-bulk-pull.tar.gz'
+    stage_dirname = 'wa-bulk-pull'
+
+    def __init__(self, target, as_root=False, stage=False):
+        self.target = target
+        self.as_root = as_root
+        self.stage = stage
+        self.requests = []
+        self.logger = logging.getLogger('bulk-pull')
+
+    def __len__(self):
+        return len(self.requests)
+
+    def add(self, source, dest):
+        self.requests.append((source, dest))
+
+    def execute(self):
+        """
+        Pull the paths that have been added, returning a list of those that
+        were not found on the target.
+
+        """
+        requests, self.requests = self.requests, []
+        if not requests:
+            return []
+        host_dir = tempfile.mkdtemp(prefix='wa-bulk-pull-')
+        try:
+            try:
+                self._pull_archive(requests, host_dir)
+            except TargetError as e:
+                self.logger.debug('Could not pull archive ({}); pulling individually'.format(e))
+                return self._pull_individually(requests)
+            return [source for source, dest in requests
+                    if not self._place(source, dest, host_dir)]
+        finally:
+            shutil.rmtree(host_dir, ignore_errors=True)
+
+    def _pull_archive(self, requests, host_dir):
+        target = self.target
+        on_target_tarball = target.get_workpath(self.tarname)
+        relative_paths = [as_relative(source) for source, _ in requests]
+        commands = []
+        if self.stage:
+            stage_dir = target.get_workpath(self.stage_dirname)
+            commands.append('rm -rf {}'.format(stage_dir))
+            for path in relative_paths:
+                dest_dir = target.path.join(stage_dir, target.path.dirname(path))
+                commands.append('mkdir -p {} && {} cp -Hr /{} {} 2>/dev/null'
+                                .format(dest_dir, target.busybox, path, dest_dir))
+            commands.append('(cd {} && {} tar czf {} .)'.format(stage_dir, target.busybox,
+                                                                on_target_tarball))
+            commands.append('rm -rf {}'.format(stage_dir))
+        else:
+            # Errors for missing paths are ignored; they are reported once
+            # the archive has been extracted.
+            commands.append('(cd / && {} tar czf {} {} 2>/dev/null)'
+                            .format(target.busybox, on_target_tarball, ' '.join(relative_paths)))
+        # Fails if the archive was not created.
+        commands.append('chmod 0666 {}'.format(on_target_tarball))
+        target.execute('; '.join(commands), as_root=self.as_root)
+
+        on_host_tarball = os.path.join(host_dir, self.tarname)
+        target.pull(on_target_tarball, on_host_tarball)
+        target.execute('rm -f {}'.format(on_target_tarball), as_root=self.as_root)
+        with tarfile.open(on_host_tarball, 'r:gz') as tf:
+            tf.extractall(os.path.join(host_dir, 'root'))
+        os.remove(on_host_tarball)
+
+    def _place(self, source, dest, host_dir):
+        path = as_relative(source).replace(self.target.path.sep, os.sep)
+        pattern = os.path.join(host_dir, 'root', path)
+        has_wildcard = '*' in source or '?' in source
+        if has_wildcard:
+            matches = sorted(glob(pattern))
+        else:
+            matches = [pattern] if os.path.lexists(pattern) else []
+        for match in matches:
+            if has_wildcard or os.path.isdir(dest):
+                host_path = os.path.join(dest, os.path.basename(match))
+            else:
+                host_path = dest
+            _d(os.path.dirname(os.path.abspath(host_path)))
+            if os.path.isdir(match) and not os.path.islink(match):
+                if os.path.isdir(host_path):
+                    shutil.rmtree(host_path)
+                shutil.copytree(match, host_path, symlinks=True)
+            else:
+                shutil.copy2(match, host_path)
+        return bool(matches)
+
+    def _pull_individually(self, requests):
+        missing = []
+        for source, dest in requests:
+            try:
+                self.target.pull(source, dest, as_root=self.as_root)
+            except TargetError:
+                missing.append(source)
+        return missing
@@ -0,0 +1,211 @@
+#    Copyright 2018 ARM Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import logging
+import os
+import threading
+
+from wa.framework.exception import TargetError
+from wa.framework.target.info import (TARGET_INFO_MARKER, get_target_identity,
+                                      parse_target_info_dump)
+from wa.utils.misc import ensure_directory_exists
+from wa.utils.serializer import read_pod, write_pod
+
+
+logger = logging.getLogger('deploy')
+
+HOST_HASHES_FILE = 'host_hashes.json'
+
+
+def write_pod_atomically(pod, filepath):
+    # The files may be shared between targets in a pool, so are replaced in a
+    # single step to avoid readers seeing a partially written file.
+    temp_filepath = '{}.{}.tmp'.format(filepath, threading.current_thread().ident)
+    write_pod(pod, temp_filepath, fmt='json')
+    os.rename(temp_filepath, filepath)
+
+
+class HostHashCache(object):
+    """
+    MD5 hashes of host files, cached by path, size and modification time so
+    that files are only hashed again when they change.
+
+    """
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self.hashes = {}
+        self.dirty = False
+        if filepath and os.path.isfile(filepath):
+            try:
+                self.hashes = read_pod(filepath)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug('Ignoring invalid host hash cache {}: {}'.format(filepath, e))
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime]
+        entry = self.hashes.get(path)
+        if entry is None or entry[:2] != key:
+            digest = hashlib.md5()
+            with open(path, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            entry = key + [digest.hexdigest()]
+            self.hashes[path] = entry
+            self.dirty = True
+        return entry[2]
+
+    def save(self):
+        if self.filepath and self.dirty:
+            ensure_directory_exists(os.path.dirname(self.filepath))
+            write_pod_atomically(self.hashes, self.filepath)
+            self.dirty = False
+
+
+class Deployer(object):
+    """
+    Deploys files to the target, skipping those that are already present and
+    unchanged.
+
+    A per-target manifest of deployed files is kept under ``directory``,
+    recording the MD5 hash of each file along with its size and modification
+    time on the target. Files are checked with a single command: those in the
+    manifest by their size and modification time, and others by their MD5
+    sums on the target. Only files that differ from the host's are pushed.
+    As with ``TargetInfoCache``, the manifest is discarded if the target's
+    fingerprint changes.
+
+    If ``directory`` is ``None``, files are always pushed.
+
+    """
+
+    # Incremented when the manifest format changes.
+    version = 1
+
+    def __init__(self, target, directory=None):
+        self.target = target
+        self.directory = directory
+        self.host_hashes = HostHashCache(directory and os.path.join(directory, HOST_HASHES_FILE))
+        self._install = target.install
+        self._manifest = None
+        self._manifest_path = None
+        self._fingerprint = None
+
+    def attach(self):
+        """Make ``install()`` of the target skip unchanged executables."""
+        self.target.install = self.install
+
+    def install(self, filepath, timeout=None, with_name=None):
+        if self.directory is None or os.path.splitext(filepath)[1].lower() == '.apk':
+            return self._install(filepath, timeout=timeout, with_name=with_name)
+        name = with_name or os.path.basename(filepath)
+        destpath = self.target.path.join(self.target.executables_directory, name)
+        if self._get_changed([(filepath, destpath)]):
+            destpath = self._install(filepath, timeout=timeout, with_name=with_name)
+            self._record([(filepath, destpath)])
+        else:
+            logger.debug('{} is up to date'.format(destpath))
+            self.target._installed_binaries[name] = destpath  # pylint: disable=protected-access
+        return destpath
+
+    def deploy(self, files):
+        """
+        Push ``(host_path, target_path)`` pairs to the target, if necessary.
+        Returns the target paths that were pushed.
+
+        """
+        changed = self._get_changed(files) if self.directory else files
+        for host_path, target_path in changed:
+            self.target.push(host_path, target_path)
+        if self.directory:
+            self._record(changed)
+        return [target_path for _, target_path in changed]
+
+    def _get_changed(self, files):
+        manifest = self._get_manifest()
+        commands = []
+        for _, target_path in files:
+            commands.append('echo "{}stat {}"; {} stat -c "%s %Y" {}'
+                            .format(TARGET_INFO_MARKER, target_path,
+                                    self.target.busybox, target_path))
+            if not manifest.get(target_path, {}).get('stat'):
+                commands.append('echo "{}md5 {}"; {} md5sum {}'
+                                .format(TARGET_INFO_MARKER, target_path,
+                                        self.target.busybox, target_path))
+        try:
+            output = self.target.execute('; '.join(c + ' 2>/dev/null' for c in commands) + '; true')
+        except TargetError as e:
+            logger.debug('Could not check deployed files: {}'.format(e))
+            return list(files)
+        found = parse_target_info_dump(output)
+
+        changed = []
+        updated = False
+        for host_path, target_path in files:
+            md5 = self.host_hashes.get(host_path)
+            stat = found.get('stat ' + target_path)
+            entry = manifest.get(target_path)
+            if entry and entry['md5'] == md5 and stat and entry['stat'] == stat:
+                continue
+            target_md5 = found.get('md5 ' + target_path, '').split()
+            if target_md5 and target_md5[0] == md5:
+                manifest[target_path] = {'md5': md5, 'stat': stat}
+                updated = True
+                continue
+            changed.append((host_path, target_path))
+        self.host_hashes.save()
+        if updated:
+            self._save_manifest()
+        return changed
+
+    def _record(self, files):
+        # The size and modification time on the target are recorded when the
+        # file is next checked.
+        manifest = self._get_manifest()
+        for host_path, target_path in files:
+            manifest[target_path] = {'md5': self.host_hashes.get(host_path), 'stat': None}
+        self.host_hashes.save()
+        self._save_manifest()
+
+    def _save_manifest(self):
+        if self._manifest_path:
+            write_pod_atomically({'version': self.version, 'fingerprint': self._fingerprint,
+                                  'files': self._manifest}, self._manifest_path)
+
+    def _get_manifest(self):
+        if self._manifest is not None:
+            return self._manifest
+        self._manifest = {}
+        try:
+            target_id, self._fingerprint = get_target_identity(self.target)
+        except TargetError as e:
+            logger.debug('Could not identify target: {}'.format(e))
+            target_id = None
+        if target_id is None:
+            return self._manifest
+        ensure_directory_exists(self.directory)
+        self._manifest_path = os.path.join(self.directory, '{}.json'.format(target_id))
+        if os.path.isfile(self._manifest_path):
+            try:
+                pod = read_pod(self._manifest_path)
+                if pod['version'] == self.version and pod['fingerprint'] == self._fingerprint:
+                    self._manifest = pod['files']
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug('Ignoring invalid deployment manifest {}: {}'
+                             .format(self._manifest_path, e))
+        return self._manifest
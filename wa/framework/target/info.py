@@ -1,9 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
 from copy import copy
 
 from devlib import AndroidTarget, TargetError
 from devlib.target import KernelConfig, KernelVersion, Cpuinfo
 from devlib.utils.android import AndroidProperties
 
+from wa.utils.misc import ensure_directory_exists
+from wa.utils.serializer import read_pod, write_pod
+
+
+logger = logging.getLogger('target-info')
+
+
+# Collects, in a single invocation on the target, the information that would
+# otherwise take several calls per CPU. Each item is output as a line with its
+# name, prefixed with TARGET_INFO_MARKER, followed by its value. Items that
+# cannot be read are omitted.
+TARGET_INFO_MARKER = '@@ '
+TARGET_INFO_SCRIPT = '''\
+dump() {{
+    name=$1
+    shift
+    if value=$("$@" 2>/dev/null); then
+        echo "{marker}$name"
+        echo "$value"
+    fi
+}}
+dump hostid {busybox} hostid
+dump hostname {busybox} hostname
+dump sched_features cat /sys/kernel/debug/sched_features
+dump cpuidle/driver cat /sys/devices/system/cpu/cpuidle/current_driver
+dump cpuidle/governor cat /sys/devices/system/cpu/cpuidle/current_governor_ro
+for path in /sys/devices/system/cpu/cpu[0-9]*; do
+    cpu=${{path##*/}}
+    dump $cpu/governors cat $path/cpufreq/scaling_available_governors
+    dump $cpu/frequencies cat $path/cpufreq/scaling_available_frequencies
+    dump $cpu/time_in_state cat $path/cpufreq/stats/time_in_state
+    dump $cpu/related_cpus cat $path/cpufreq/related_cpus
+    dump $cpu/driver cat $path/cpufreq/scaling_driver
+done
+'''
+ANDROID_TARGET_INFO_SCRIPT = '''\
+dump getprop getprop
+'''
+
+
+# Collected to check that cached information about a target is still valid;
+# see TargetInfoCache. The information is keyed by the first available ID,
+# and invalidated if any of the other items change.
+TARGET_IDENTITY_COMMANDS = [
+    ('hostid', '{busybox} hostid'),
+    ('kernel', '{busybox} uname -r -v'),
+    ('topology', 'cat /sys/devices/system/cpu/cpu*/cpufreq/related_cpus '
+                 '/sys/devices/system/cpu/cpu*/cpufreq/scaling_available_frequencies '
+                 '/sys/devices/system/cpu/cpu*/cpuidle/state*/name'),
+]
+ANDROID_IDENTITY_COMMANDS = [
+    ('android_id', 'settings get secure android_id'),
+    ('build', 'getprop ro.build.fingerprint'),
+]
+TARGET_ID_KEYS = ['android_id', 'hostid']
+
+
+def parse_target_info_dump(output):
+    entries = {}
+    name = None
+    for line in output.splitlines():
+        if line.startswith(TARGET_INFO_MARKER):
+            name = line[len(TARGET_INFO_MARKER):].strip()
+            entries[name] = []
+        elif name is not None:
+            entries[name].append(line)
+    return {k: '\n'.join(v).strip() for k, v in entries.items()}
+
+
+def read_target_info_dump(target):
+    """
+    Run ``TARGET_INFO_SCRIPT`` on the target and return the items it
+    collected. If that fails, an empty dict is returned, and all information
+    will be gathered with individual calls instead.
+
+    """
+    script = TARGET_INFO_SCRIPT.format(marker=TARGET_INFO_MARKER, busybox=target.busybox)
+    if isinstance(target, AndroidTarget):
+        script += ANDROID_TARGET_INFO_SCRIPT
+    fd, host_path = tempfile.mkstemp(suffix='.sh')
+    try:
+        with os.fdopen(fd, 'w') as wfh:
+            wfh.write(script)
+        target_path = target.get_workpath('wa_target_info.sh')
+        target.push(host_path, target_path)
+        output = target.execute('sh {}'.format(target_path), check_exit_code=False,
+                                as_root=target.is_rooted)
+    except TargetError as e:
+        logger.debug('Could not collect target info in one call: {}'.format(e))
+        return {}
+    finally:
+        os.remove(host_path)
+    return parse_target_info_dump(output)
+
+
+def get_target_identity(target):
+    """
+    Returns the ID of the target and a fingerprint of its kernel, build and
+    CPU topology, collected with a single command. The ID is ``None`` if the
+    target could not be identified.
+
+    """
+    commands = list(TARGET_IDENTITY_COMMANDS)
+    if isinstance(target, AndroidTarget):
+        commands += ANDROID_IDENTITY_COMMANDS
+    command = '; '.join('echo "{}{}"; {} 2>/dev/null'.format(TARGET_INFO_MARKER, name,
+                                                           cmd.format(busybox=target.busybox))
+                        for name, cmd in commands)
+    output = target.execute(command + '; true')
+    identity = parse_target_info_dump(output)
+    ids = [identity.get(k) for k in TARGET_ID_KEYS if identity.get(k) not in [None, '', 'null']]
+    if not ids:
+        return None, None
+    target_id = '{}-{}'.format(target.__class__.__name__, ids[0])
+    digest = hashlib.md5(json.dumps(identity, sort_keys=True).encode('utf-8'))
+    return re.sub(r'[^\w.-]', '_', target_id), digest.hexdigest()
+
+
+def _from_dump(dump, key, parse, fallback, *args):
+    if key in dump:
+        try:
+            return parse(dump[key])
+        except ValueError as e:
+            logger.debug('Could not parse "{}" from target info dump: {}'.format(key, e))
+    return fallback(*args)
+
+
+def _parse_list(text):
+    return text.split()
+
+
+def _parse_int_list(text):
+    return [int(v) for v in text.split()]
+
+
+def _parse_time_in_state(text):
+    values = iter(text.split())
+    return [int(f) for f, _ in reversed(list(zip(values, values)))]
+
+
+def _read_sched_features(target):
+    try:
+        return target.read_value('/sys/kernel/debug/sched_features').split()
+    except TargetError:
+        # best effort -- debugfs might not be mounted
+        return None
+
+
+def _list_frequencies(target, dump, cpu):
+    key = 'cpu{}/time_in_state'.format(cpu)
+    if key in dump:
+        return _from_dump(dump, key, _parse_time_in_state, target.cpufreq.list_frequencies, cpu)
+    return target.cpufreq.list_frequencies(cpu)
+
 
 def cpuinfo_from_pod(pod):
     cpuinfo = Cpuinfo('')
@@ -156,24 +316,28 @@ class CpuInfo(object):
     __str__ = __repr__
 
 
-def get_target_info(target):
+def get_target_info(target, batch=True):
+    """
+    Collect information about the target. If ``batch`` is ``True``, most of
+    the information is collected by a single script run on the target (see
+    ``TARGET_INFO_SCRIPT``), and only items that the script could not collect
+    are queried individually.
+
+    """
+    dump = read_target_info_dump(target) if batch else {}
     info = TargetInfo()
     info.target = target.__class__.__name__
     info.os = target.os
     info.os_version = target.os_version
     info.abi = target.abi
-    info.is_rooted = target.is_rooted
     info.kernel_version = target.kernel_version
     info.kernel_config = target.config
-    try:
-        info.sched_features = target.read_value('/sys/kernel/debug/sched_features').split()
-    except TargetError:
-        # best effort -- debugfs might not be mounted
-        pass
+    _collect_mutable_info(info, target, dump)
 
-    hostid_string = target.execute('{} hostid'.format(target.busybox)).strip()
-    info.hostid = int(hostid_string, 16)
-    info.hostname = target.execute('{} hostname'.format(target.busybox)).strip()
+    info.hostid = _from_dump(dump, 'hostid', lambda v: int(v, 16),
+                             lambda: int(target.execute('{} hostid'.format(target.busybox)).strip(), 16))
+    info.hostname = _from_dump(dump, 'hostname', lambda v: v,
+                               lambda: target.execute('{} hostname'.format(target.busybox)).strip())
 
     for i, name in enumerate(target.cpuinfo.cpu_names):
         cpu = CpuInfo()
@@ -183,14 +347,22 @@ def get_target_info(target):
         cpu.architecture = target.cpuinfo.architecture
 
         if target.has('cpufreq'):
-            cpu.cpufreq.available_governors = target.cpufreq.list_governors(i)
-            cpu.cpufreq.available_frequencies = target.cpufreq.list_frequencies(i)
-            cpu.cpufreq.related_cpus = target.cpufreq.get_related_cpus(i)
-            cpu.cpufreq.driver = target.cpufreq.get_driver(i)
+            prefix = 'cpu{}/'.format(i)
+            cpu.cpufreq.available_governors = _from_dump(dump, prefix + 'governors', _parse_list,
+                                                         target.cpufreq.list_governors, i)
+            cpu.cpufreq.available_frequencies = _from_dump(dump, prefix + 'frequencies',
+                                                           _parse_int_list, _list_frequencies,
+                                                           target, dump, i)
+            cpu.cpufreq.related_cpus = _from_dump(dump, prefix + 'related_cpus', _parse_int_list,
+                                                  target.cpufreq.get_related_cpus, i)
+            cpu.cpufreq.driver = _from_dump(dump, prefix + 'driver', lambda v: v,
+                                            target.cpufreq.get_driver, i)
 
         if target.has('cpuidle'):
-            cpu.cpuidle.driver = target.cpuidle.get_driver()
-            cpu.cpuidle.governor = target.cpuidle.get_governor()
+            cpu.cpuidle.driver = _from_dump(dump, 'cpuidle/driver', lambda v: v,
+                                            target.cpuidle.get_driver)
+            cpu.cpuidle.governor = _from_dump(dump, 'cpuidle/governor', lambda v: v,
+                                              target.cpuidle.get_governor)
             for state in target.cpuidle.get_states(i):
                 state_info = IdleStateInfo()
                 state_info.name = state.name
@@ -202,13 +374,96 @@ def get_target_info(target):
         info.cpus.append(cpu)
 
     if isinstance(target, AndroidTarget):
-        info.screen_resolution = target.screen_resolution
-        info.prop = target.getprop()
         info.android_id = target.android_id
 
     return info
 
 
+def _collect_mutable_info(info, target, dump):
+    # Information that may change without the target's fingerprint changing
+    # (see MUTABLE_TARGET_INFO).
+    info.is_rooted = target.is_rooted
+    info.sched_features = _from_dump(dump, 'sched_features', _parse_list,
+                                     _read_sched_features, target)
+    if isinstance(target, AndroidTarget):
+        info.screen_resolution = target.screen_resolution
+        info.prop = _from_dump(dump, 'getprop', AndroidProperties, target.getprop)
+
+
+# TargetInfo attributes that may change without a change of the target's
+# fingerprint (e.g. if the target is rooted, or a property is set), and so are
+# collected for every run, even if the rest of the information is cached.
+MUTABLE_TARGET_INFO = ['is_rooted', 'sched_features', 'screen_resolution', 'prop']
+
+
+class TargetInfoCache(object):
+    """
+    Persistent host-side cache of ``TargetInfo``, so that information about a
+    target does not have to be collected for every run. Each target's
+    information is stored in a file under ``directory`` named after its ID,
+    along with the fingerprint of the target (see ``get_target_identity()``).
+    Before cached information is used, the fingerprint is checked against the
+    target's, so that a change of kernel, build, or CPU topology causes the
+    information to be collected again. Information that may change without
+    the fingerprint changing (``MUTABLE_TARGET_INFO``) is not cached, and is
+    collected for every run.
+
+    If ``refresh`` is ``True``, cached information is never used, but is
+    updated.
+
+    """
+
+    # Incremented when the TargetInfo pod format changes.
+    version = 2
+
+    def __init__(self, directory, refresh=False):
+        self.directory = directory
+        self.refresh = refresh
+
+    def get_target_info(self, target):
+        try:
+            target_id, fingerprint = get_target_identity(target)
+        except TargetError as e:
+            logger.debug('Could not identify target: {}'.format(e))
+            target_id, fingerprint = None, None
+        if target_id is None:
+            return get_target_info(target)
+
+        filepath = os.path.join(self.directory, '{}.json'.format(target_id))
+        if not self.refresh:
+            info = self._load(filepath, fingerprint, target)
+            if info is not None:
+                logger.debug('Using cached target info for {}'.format(target_id))
+                return info
+
+        logger.debug('Collecting target info for {}'.format(target_id))
+        info = get_target_info(target)
+        ensure_directory_exists(self.directory)
+        pod = info.to_pod()
+        for name in MUTABLE_TARGET_INFO:
+            pod.pop(name, None)
+        write_pod({'version': self.version, 'fingerprint': fingerprint,
+                   'info': pod}, filepath)
+        return info
+
+    def _load(self, filepath, fingerprint, target):
+        if not os.path.isfile(filepath):
+            return None
+        try:
+            pod = read_pod(filepath)
+            if pod['version'] != self.version or pod['fingerprint'] != fingerprint:
+                return None
+            info_pod = pod['info']
+            for name in MUTABLE_TARGET_INFO:
+                info_pod[name] = None
+            info = TargetInfo.from_pod(info_pod)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug('Ignoring invalid cached target info {}: {}'.format(filepath, e))
+            return None
+        _collect_mutable_info(info, target, {})
+        return info
+
+
 class TargetInfo(object):
 
     @staticmethod
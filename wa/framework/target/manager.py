@@ -1,11 +1,20 @@
 import logging
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
 
-from wa.framework import signal
+from future.moves._thread import interrupt_main
+
+from wa.framework import profiling, quiet, signal
 from wa.framework.exception import ExecutionError, TargetError, TargetNotRespondingError
 from wa.framework.plugin import Parameter
 from wa.framework.target.descriptor import (get_target_description,
                                             instantiate_target,
                                             instantiate_assistant)
+from wa.framework.target.batch import CommandBatch
+from wa.framework.target.deploy import Deployer
 from wa.framework.target.info import get_target_info
 from wa.framework.target.runtime_parameter_manager import RuntimeParameterManager
 
@@ -26,8 +35,13 @@ class TargetManager(object):
                   """),
     ]
 
-    def __init__(self, name, parameters, outdir):
+    def __init__(self, name, parameters, outdir, info_cache=None,
+                 heartbeat_period=None, heartbeat_timeout=5, deployment_cache=None):
         self.outdir = outdir
+        self.info_cache = info_cache
+        self.heartbeat_period = heartbeat_period
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat = None
         self.logger = logging.getLogger('tm')
         self.target_name = name
         self.target = None
@@ -38,6 +52,8 @@ class TargetManager(object):
         self.disconnect = parameters.get('disconnect')
 
         self._init_target()
+        self.deployer = Deployer(self.target, deployment_cache)
+        self.deployer.attach()
 
         # If target supports hotplugging, online all cpus before perform discovery
         # and restore original configuration after completed.
@@ -56,6 +72,7 @@ class TargetManager(object):
             self.rpm = RuntimeParameterManager(self.target)
 
     def finalize(self):
+        self.assistant.finalize()
         if self.disconnect or isinstance(self.target.platform, Gem5SimulationPlatform):
             self.logger.info('Disconnecting from the device')
             with signal.wrap('TARGET_DISCONNECT'):
@@ -63,20 +80,78 @@ class TargetManager(object):
 
     def start(self):
         self.assistant.start()
+        if self.heartbeat_period:
+            self.heartbeat = TargetHeartbeat(self.target, self.heartbeat_period,
+                                             self.heartbeat_timeout)
+            self.heartbeat.start()
 
     def stop(self):
         self.assistant.stop()
+        self.stop_heartbeat()
+
+    def stop_heartbeat(self):
+        if self.heartbeat and self.heartbeat.is_alive():
+            self.heartbeat.stop()
+            self.logger.debug('Heartbeat: {} probe(s)'.format(len(self.heartbeat.probes)))
+
+    def check_heartbeat(self):
+        """
+        Raise a ``TargetError`` if the heartbeat has found the target to be
+        unresponsive. This is called at job and phase boundaries.
+
+        """
+        if self.heartbeat and self.heartbeat.failed:
+            raise self._handle_heartbeat_failure()
+
+    def get_heartbeat_error(self):
+        """
+        If the heartbeat found the target unresponsive and interrupted the
+        main thread, returns the error that should be raised in place of the
+        ``KeyboardInterrupt``, otherwise returns ``None``.
+
+        """
+        if not self.heartbeat or not self.heartbeat.interrupted:
+            return None
+        return self._handle_heartbeat_failure()
+
+    def _handle_heartbeat_failure(self):
+        self.heartbeat.acknowledge()
+        # Subsequent interrupts are from the user.
+        self.heartbeat.failed = self.heartbeat.interrupted = False
+        self.is_responsive = False
+        return TargetError('Target stopped responding to heartbeat')
+
+    @contextmanager
+    def batch(self, as_root=False):
+        """
+        Queue target commands made inside the block, and execute them as a
+        single script when it exits. Yields a ``CommandBatch``, whose
+        methods return handles to the results of the commands, e.g.::
+
+            with context.tm.batch() as batch:
+                governor = batch.read_value(governor_path)
+                batch.execute('mkdir -p {}'.format(path))
+            print(governor.value)
+
+        """
+        batch = CommandBatch(self.target, as_root=as_root)
+        yield batch
+        batch.flush()
 
     def extract_results(self, context):
         self.assistant.extract_results(context)
 
     @memoized
     def get_target_info(self):
-        return get_target_info(self.target)
+        if self.info_cache is None:
+            return get_target_info(self.target)
+        return self.info_cache.get_target_info(self.target)
 
     def reboot(self, context, hard=False):
+        self.stop_heartbeat()
         with signal.wrap('REBOOT', self, context):
             self.target.reboot(hard)
+        self.rpm.reset_committed_state()
 
     def merge_runtime_parameters(self, parameters):
         return self.rpm.merge_runtime_parameters(parameters)
@@ -89,7 +164,9 @@ class TargetManager(object):
 
     def verify_target_responsive(self, context):
         can_reboot = context.reboot_policy.can_reboot
-        if not self.target.check_responsive(explode=False):
+        if self.target.check_responsive(explode=False):
+            self.is_responsive = True
+        else:
             self.is_responsive = False
             if not can_reboot:
                 raise TargetNotRespondingError('Target unresponsive and is not allowed to reboot.')
@@ -120,3 +197,114 @@ class TargetManager(object):
         self.target.setup()
 
         self.assistant = instantiate_assistant(tdesc, self.parameters, self.target)
+
+
+class TargetHeartbeat(threading.Thread):
+    """
+    Checks that the target is responsive. A single process is run on the
+    target in the background for as long as the heartbeat is active, printing
+    a line every ``period`` seconds, so the checks do not wait for (or
+    interfere with) commands being executed by the main thread. If no line is
+    received within ``timeout`` seconds of when it was due for
+    ``max_failures`` consecutive checks, the heartbeat records the failure
+    and stops; the main thread acts on it at the next job or phase boundary
+    (see ``TargetManager.check_heartbeat()``). Only if it has not done so
+    within ``interrupt_delay`` seconds (e.g. because it is blocked waiting on
+    the target) is the main thread interrupted (see
+    ``TargetManager.get_heartbeat_error()``). The process is stopped, and no
+    checks are made, during quiet windows (see ``wa.framework.quiet``).
+
+    The start and duration of each check are recorded in ``probes`` (and by
+    the phase profiler, if enabled), so that they can be taken into account
+    when interpreting measurements.
+
+    """
+
+    max_failures = 2
+    interrupt_delay = 30
+
+    def __init__(self, target, period, timeout=5):
+        super(TargetHeartbeat, self).__init__()
+        self.target = target
+        self.period = period
+        self.timeout = timeout
+        self.logger = logging.getLogger('heartbeat')
+        self.stop_signal = threading.Event()
+        self.lock = threading.Lock()
+        self.probes = []
+        self.process = None
+        self.failed = False
+        self.interrupted = False
+        self.daemon = True
+
+    def run(self):
+        failures = 0
+        try:
+            while not self.stop_signal.is_set():
+                if quiet.is_quiet():
+                    self._stop_process()
+                    self.stop_signal.wait(self.period)
+                    continue
+                start = time.time()
+                responsive = self.probe()
+                duration = time.time() - start
+                self.probes.append((start, duration))
+                profiler = profiling.get_profiler()
+                if profiler:
+                    profiler.record('heartbeat', 'probe', start, duration)
+
+                if responsive:
+                    failures = 0
+                    continue
+                failures += 1
+                self.logger.debug('Heartbeat probe failed ({}/{})'.format(failures, self.max_failures))
+                if failures >= self.max_failures:
+                    self._fail()
+                    break
+        finally:
+            self._stop_process()
+
+    def probe(self):
+        """Wait for the next line from the target; returns ``False`` if it is late."""
+        if self.process is None or self.process.poll() is not None:
+            command = 'while true; do echo; sleep {}; done'.format(self.period)
+            try:
+                self.process = self.target.background(command)
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.debug('Could not start heartbeat process: {}'.format(e))
+                self.process = None
+                self.stop_signal.wait(self.timeout)
+                return False
+        ready, _, _ = select.select([self.process.stdout], [], [], self.period + self.timeout)
+        if not ready:
+            return False
+        # Empty at end of file, i.e. if the process has exited.
+        return bool(os.read(self.process.stdout.fileno(), 4096))
+
+    def acknowledge(self):
+        """Called once the main thread has acted on the failure."""
+        with self.lock:
+            self.stop_signal.set()
+
+    def stop(self):
+        with self.lock:
+            self.stop_signal.set()
+        self.join(self.period + self.timeout + 1)
+
+    def _fail(self):
+        self.logger.error('Target stopped responding to heartbeat')
+        self.failed = True
+        if self.stop_signal.wait(self.interrupt_delay):
+            return
+        with self.lock:
+            if not self.stop_signal.is_set():
+                self.logger.debug('Failure not handled; interrupting the main thread')
+                self.interrupted = True
+                interrupt_main()
+
+    def _stop_process(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process = None
@@ -1,7 +1,14 @@
 import logging
+import os
+import sys
+import tempfile
 import time
 from collections import defaultdict, OrderedDict
 from copy import copy
+if sys.version_info[0] == 3:
+    from shlex import quote
+else:
+    from pipes import quote
 
 from wa.framework.exception import ConfigError
 from wa.framework.plugin import Plugin, Parameter
@@ -26,11 +33,93 @@ class RuntimeParameter(Parameter):
         self.setter(obj, value, **self.setter_params)
 
 
+class WriteBatch(object):
+    """
+    Collects sysfs writes so that they can be performed on the target in a
+    single shell script, rather than one target call per value. Values that
+    are to be verified are read back by the same script and checked once it
+    has completed. Optional writes are skipped if the file does not exist on
+    the target.
+
+    """
+
+    script_name = 'wa_runtime_config.sh'
+    marker = '--wa-readback--'
+    missing = '--wa-missing--'
+
+    def __init__(self, target):
+        self.target = target
+        self.writes = []
+
+    def __len__(self):
+        return len(self.writes)
+
+    def write_value(self, path, value, verify=True, optional=False):
+        self.writes.append((path, str(value), verify, optional))
+
+    def get_script(self):
+        lines = []
+        for path, value, _, optional in self.writes:
+            write = 'echo {} > {}'.format(quote(value), quote(path))
+            if optional:
+                write = 'if [ -e {} ]; then {}; fi'.format(quote(path), write)
+            lines.append(write)
+        for path, _, verify, optional in self.writes:
+            if verify:
+                lines.append('echo {}'.format(quote(self.marker)))
+                if optional:
+                    lines.append('if [ -e {0} ]; then cat {0}; else echo {1}; fi'
+                                 .format(quote(path), quote(self.missing)))
+                else:
+                    lines.append('cat {}'.format(quote(path)))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        if not self.writes:
+            return
+        logger.debug('Writing {} runtime config value(s) in a batch'.format(len(self.writes)))
+        fd, host_path = tempfile.mkstemp(suffix='.sh')
+        try:
+            with os.fdopen(fd, 'w') as wfh:
+                wfh.write(self.get_script())
+            target_path = self.target.get_workpath(self.script_name)
+            self.target.push(host_path, target_path)
+        finally:
+            os.remove(host_path)
+        output = self.target.execute('sh {}'.format(quote(target_path)),
+                                     check_exit_code=False,
+                                     as_root=self.target.is_rooted)
+        self.verify(output)
+        self.writes = []
+
+    def verify(self, output):
+        readings = output.split(self.marker + '\n')[1:]
+        expected = [(path, value) for path, value, verify, _ in self.writes if verify]
+        if len(readings) != len(expected):
+            msg = 'Could not read back runtime config values (got {} of {}):\n{}'
+            raise TargetError(msg.format(len(readings), len(expected), output))
+        for (path, value), reading in zip(expected, readings):
+            if reading.strip() == self.missing:
+                continue
+            if reading.strip() != value:
+                message = 'Could not set the value of {} to "{}" (read "{}")'
+                raise TargetError(message.format(path, value, reading.strip()))
+
+
 class RuntimeConfig(Plugin):
 
     name = None
     kind = 'runtime-config'
 
+    # Set this to ``True`` if the configured state may change on the target
+    # without WA's involvement (e.g. the screen timing out), so that it is
+    # re-applied for every job, rather than only when it has changed.
+    volatile = False
+
+    # Set this to ``True`` if committing this config may reset state configured
+    # by the runtime configs that follow it, so that they must be re-applied.
+    resets_subsequent = False
+
     @property
     def supported_parameters(self):
         return list(self._runtime_params.values())
@@ -57,6 +146,17 @@ class RuntimeConfig(Plugin):
     def commit(self):
         raise NotImplementedError()
 
+    def commit_to_batch(self, batch):
+        """
+        Commit the configuration, adding sysfs writes to the specified
+        ``WriteBatch`` where possible. Writes already in the batch must be
+        performed first; the default implementation does that and then
+        falls back to ``commit()``.
+
+        """
+        batch.flush()
+        self.commit()
+
     def set_runtime_parameter(self, name, value):
         if not self._target_checked:
             self.check_target()
@@ -85,6 +185,9 @@ class HotplugRuntimeConfig(RuntimeConfig):
     '''
 
     name = 'rt-hotplug'
+    # Per-CPU cpufreq and cpuidle settings may be lost when a CPU is
+    # hotplugged.
+    resets_subsequent = True
 
     @staticmethod
     def set_num_cores(obj, value, core):
@@ -170,14 +273,25 @@ class HotplugRuntimeConfig(RuntimeConfig):
                 raise ValueError('Cannot set number of all cores to 0')
 
     def commit(self):
+        batch = WriteBatch(self.target)
+        self.commit_to_batch(batch)
+        batch.flush()
+
+    def commit_to_batch(self, batch):
         '''Online all CPUs required in order before then off-lining'''
+        # As with devlib's hotplug module, CPUs that cannot be hotplugged
+        # (i.e. that do not have an "online" file) are skipped.
         num_cores = sorted(self.num_cores.items())
         for cpu, online in num_cores:
             if online:
-                self.target.hotplug.online(cpu)
+                batch.write_value(self._get_online_path(cpu), 1, optional=True)
         for cpu, online in reversed(num_cores):
             if not online:
-                self.target.hotplug.offline(cpu)
+                batch.write_value(self._get_online_path(cpu), 0, optional=True)
+
+    def _get_online_path(self, cpu):
+        return self.target.path.join('/sys/devices/system/cpu',
+                                     'cpu{}'.format(cpu), 'online')
 
     def clear(self):
         self.num_cores = defaultdict(dict)
@@ -222,8 +336,13 @@ class SysfileValuesRuntimeConfig(RuntimeConfig):
         return
 
     def commit(self):
+        batch = WriteBatch(self.target)
+        self.commit_to_batch(batch)
+        batch.flush()
+
+    def commit_to_batch(self, batch):
         for path, (value, verify) in self.sysfile_values.items():
-            self.target.write_value(path, value, verify=verify)
+            batch.write_value(path, value, verify=verify)
 
     def clear(self):
         self.sysfile_values = OrderedDict()
@@ -788,14 +907,17 @@ class CpuidleRuntimeConfig(RuntimeConfig):
         self.config = defaultdict(dict)
 
     def commit(self):
+        batch = WriteBatch(self.target)
+        self.commit_to_batch(batch)
+        batch.flush()
+
+    def commit_to_batch(self, batch):
         for cpu in self.config:
-            idle_states = set(state.id for state in self.supported_idle_states.get(cpu, []))
+            states = self.supported_idle_states.get(cpu, [])
             enabled = self.config[cpu]
-            disabled = idle_states.difference(enabled)
-            for state in enabled:
-                self.target.cpuidle.enable(state, cpu)
-            for state in disabled:
-                self.target.cpuidle.disable(state, cpu)
+            for state in states:
+                disable = 0 if state.id in enabled else 1
+                batch.write_value(self.target.path.join(state.path, 'disable'), disable)
 
     def _retrieve_device_idle_info(self):
         for cpu in range(self.target.number_of_cpus):
@@ -816,6 +938,7 @@ ScreenOrientation = enum(['NATURAL', 'LEFT', 'INVERTED', 'RIGHT'])
 class AndroidRuntimeConfig(RuntimeConfig):
 
     name = 'rt-android'
+    volatile = True
 
     @staticmethod
     def set_brightness(obj, value):
@@ -1,3 +1,4 @@
+import logging
 from collections import namedtuple
 
 from wa.framework.exception import ConfigError
@@ -5,7 +6,8 @@ from wa.framework.target.runtime_config import (SysfileValuesRuntimeConfig,
                                                 HotplugRuntimeConfig,
                                                 CpufreqRuntimeConfig,
                                                 CpuidleRuntimeConfig,
-                                                AndroidRuntimeConfig)
+                                                AndroidRuntimeConfig,
+                                                WriteBatch)
 from wa.utils.types import obj_dict, caseless_string
 
 
@@ -22,8 +24,12 @@ class RuntimeParameterManager(object):
 
     def __init__(self, target):
         self.target = target
+        self.logger = logging.getLogger('runtime_params')
         self.runtime_configs = [cls(self.target) for cls in self.runtime_config_cls]
         self.runtime_params = {}
+        # Parameters last committed by each runtime config, used to avoid
+        # re-writing configuration that is already in place on the target.
+        self.committed = {}
 
         runtime_parameter = namedtuple('RuntimeParameter', 'cfg_point, rt_config')
         for cfg in self.runtime_configs:
@@ -51,12 +57,42 @@ class RuntimeParameterManager(object):
         for cfg in self.runtime_configs:
             cfg.validate_parameters()
 
-    # Writes the given parameters to the device.
+    # Writes the given parameters to the device. Only runtime configs whose
+    # parameters have changed since the last commit are written, and sysfs
+    # writes are batched into as few target calls as possible.
     def commit_runtime_parameters(self, parameters):
         self.clear_runtime_parameters()
         self.set_runtime_parameters(parameters)
+        config_params = self.get_parameters_by_config(parameters)
+        batch = WriteBatch(self.target)
+        force = False
+        try:
+            for cfg in self.runtime_configs:
+                params = config_params.get(cfg.name, {})
+                if not (force or cfg.volatile) and self.committed.get(cfg.name) == params:
+                    self.logger.debug('"{}" is unchanged; skipping'.format(cfg.name))
+                    continue
+                cfg.commit_to_batch(batch)
+                force = force or cfg.resets_subsequent
+            batch.flush()
+        except Exception:
+            # Target state is no longer known.
+            self.reset_committed_state()
+            raise
         for cfg in self.runtime_configs:
-            cfg.commit()
+            self.committed[cfg.name] = config_params.get(cfg.name, {})
+
+    # Forget about previously committed parameters (e.g. after a reboot) so
+    # that everything is written on the next commit.
+    def reset_committed_state(self):
+        self.committed = {}
+
+    def get_parameters_by_config(self, parameters):
+        config_params = {}
+        for name, value in parameters.items():
+            cfg = self.get_config_for_name(name)
+            config_params.setdefault(cfg.name, {})[name] = value
+        return config_params
 
     # Stores a set of parameters performing isolated validation when appropriate
     def set_runtime_parameters(self, parameters):
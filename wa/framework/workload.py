@@ -85,6 +85,17 @@ class Workload(TargetedPlugin):
         for asset in self.deployable_assets:
             self.asset_files.append(resolver.get(File(self, asset)))
 
+    def prefetch_resources(self, resolver):
+        """
+        This method may be used to resolve host-side resources that will be
+        needed later (e.g. during ``initialize()``), so that they are cached by
+        the time they are requested. It may be invoked from a background thread
+        while other jobs are running and so must not interact with the target
+        or modify the state of the workload.
+
+        """
+        pass
+
     @once_per_instance
     def initialize(self, context):
         """
@@ -142,16 +153,15 @@ class Workload(TargetedPlugin):
 
     def deploy_assets(self, context):
         """ Deploy assets if available to the target """
-        # pylint: disable=unused-argument
         if not self.asset_directory:
             self.asset_directory = self.target.working_directory
         else:
             self.target.execute('mkdir -p {}'.format(self.asset_directory))
 
-        for asset in self.asset_files:
-            self.target.push(asset, self.asset_directory)
-            self.deployed_assets.append(self.target.path.join(self.asset_directory,
-                                                              os.path.basename(asset)))
+        assets = [(asset, self.target.path.join(self.asset_directory, os.path.basename(asset)))
+                  for asset in self.asset_files]
+        context.tm.deployer.deploy(assets)
+        self.deployed_assets.extend(target_path for _, target_path in assets)
 
     def remove_assets(self, context):
         """ Cleanup assets deployed to the target """
@@ -254,6 +264,9 @@ class ApkWorkload(Workload):
                                   exact_abi=self.exact_abi,
                                   prefer_host_package=self.prefer_host_package)
 
+    def prefetch_resources(self, resolver):
+        self.apk.prefetch_resources(resolver)
+
     @once_per_instance
     def initialize(self, context):
         super(ApkWorkload, self).initialize(context)
@@ -661,6 +674,17 @@ class PackageHandler(object):
     def initialize(self, context):
         self.resolve_package(context)
 
+    def prefetch_resources(self, resolver):
+        packages = [self.package_name] if self.package_name else self.owner.package_names
+        for package in packages or []:
+            resolver.get(ApkFile(self.owner,
+                                 variant=self.variant,
+                                 version=self.version,
+                                 package=package,
+                                 exact_abi=self.exact_abi,
+                                 supported_abi=self.supported_abi),
+                         strict=False)
+
     def setup(self, context):
         context.update_metadata('app_version', self.apk_info.version_name)
         self.initialize_package(context)
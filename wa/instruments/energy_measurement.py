@@ -361,6 +361,8 @@ class EnergyMeasurement(Instrument):
 
     name = 'energy_measurement'
 
+    concurrent = True
+
     description = """
     This instrument is designed to be used as an interface to the various
     energy measurement instruments located in devlib.
@@ -40,6 +40,7 @@ from devlib.utils.android import ApkInfo
 from wa import Instrument, Parameter, very_fast
 from wa.framework.exception import ConfigError
 from wa.framework.instrument import slow
+from wa.framework.target.bulk import BulkPull
 from wa.utils.diff import diff_sysfs_dirs, diff_interrupt_files
 from wa.utils.misc import as_relative, diff_tokens, write_table
 from wa.utils.misc import ensure_file_directory_exists as _f
@@ -53,6 +54,8 @@ logger = logging.getLogger(__name__)
 class SysfsExtractor(Instrument):
 
     name = 'sysfs_extractor'
+
+    concurrent = True
     description = """
     Collects the contest of a set of directories, before and after workload execution
     and diffs the result.
@@ -77,7 +80,8 @@ class SysfsExtractor(Instrument):
                   Specifies whether tmpfs should be used to cache sysfile trees and then pull them down
                   as a tarball. This is significantly faster then just copying the directory trees from
                   the device directly, bur requres root and may not work on all devices. Defaults to
-                  ``True`` if the device is rooted and ``False`` if it is not.
+                  ``True`` if the device is rooted and ``False`` if it is not. Without tmpfs, the trees
+                  are copied to the device's working directory and pulled as a single tarball.
                   """),
         Parameter('tmpfs_mount_point', default=None,
                   description="""Mount point for tmpfs partition used to store snapshots of paths."""),
@@ -116,43 +120,46 @@ class SysfsExtractor(Instrument):
         self.device_and_host_paths = list(zip(self.paths, before_dirs, after_dirs, diff_dirs))
 
         if self.use_tmpfs:
-            for d in self.paths:
-                before_dir = self.target.path.join(self.on_device_before,
-                                                   self.target.path.dirname(as_relative(d)))
-                after_dir = self.target.path.join(self.on_device_after,
-                                                  self.target.path.dirname(as_relative(d)))
-                if self.target.file_exists(before_dir):
-                    self.target.execute('rm -rf  {}'.format(before_dir), as_root=True)
-                self.target.execute('mkdir -p {}'.format(before_dir), as_root=True)
-                if self.target.file_exists(after_dir):
-                    self.target.execute('rm -rf  {}'.format(after_dir), as_root=True)
-                self.target.execute('mkdir -p {}'.format(after_dir), as_root=True)
+            with context.tm.batch(as_root=True) as batch:
+                for d in self.paths:
+                    before_dir = self.target.path.join(self.on_device_before,
+                                                       self.target.path.dirname(as_relative(d)))
+                    after_dir = self.target.path.join(self.on_device_after,
+                                                      self.target.path.dirname(as_relative(d)))
+                    batch.execute('rm -rf {0} && mkdir -p {0}'.format(before_dir))
+                    batch.execute('rm -rf {0} && mkdir -p {0}'.format(after_dir))
 
     @slow
     def start(self, context):
         if self.use_tmpfs:
-            for d in self.paths:
-                dest_dir = self.target.path.join(self.on_device_before, as_relative(d))
-                if '*' in dest_dir:
-                    dest_dir = self.target.path.dirname(dest_dir)
-                self.target.execute('{} cp -Hr {} {}'.format(self.target.busybox, d, dest_dir),
-                                    as_root=True, check_exit_code=False)
+            with context.tm.batch(as_root=True) as batch:
+                for d in self.paths:
+                    dest_dir = self.target.path.join(self.on_device_before, as_relative(d))
+                    if '*' in dest_dir:
+                        dest_dir = self.target.path.dirname(dest_dir)
+                    batch.execute('{} cp -Hr {} {}'.format(self.target.busybox, d, dest_dir),
+                                  check_exit_code=False)
         else:  # not rooted
+            bulk_pull = BulkPull(self.target, stage=True)
             for dev_dir, before_dir, _, _ in self.device_and_host_paths:
-                self.target.pull(dev_dir, before_dir)
+                bulk_pull.add(dev_dir, before_dir)
+            bulk_pull.execute()
 
     @slow
     def stop(self, context):
         if self.use_tmpfs:
-            for d in self.paths:
-                dest_dir = self.target.path.join(self.on_device_after, as_relative(d))
-                if '*' in dest_dir:
-                    dest_dir = self.target.path.dirname(dest_dir)
-                self.target.execute('{} cp -Hr {} {}'.format(self.target.busybox, d, dest_dir),
-                                    as_root=True, check_exit_code=False)
+            with context.tm.batch(as_root=True) as batch:
+                for d in self.paths:
+                    dest_dir = self.target.path.join(self.on_device_after, as_relative(d))
+                    if '*' in dest_dir:
+                        dest_dir = self.target.path.dirname(dest_dir)
+                    batch.execute('{} cp -Hr {} {}'.format(self.target.busybox, d, dest_dir),
+                                  check_exit_code=False)
         else:  # not using tmpfs
+            bulk_pull = BulkPull(self.target, stage=True)
             for dev_dir, _, after_dir, _ in self.device_and_host_paths:
-                self.target.pull(dev_dir, after_dir)
+                bulk_pull.add(dev_dir, after_dir)
+            bulk_pull.execute()
 
     def update_output(self, context):
         if self.use_tmpfs:
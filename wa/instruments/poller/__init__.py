@@ -18,6 +18,7 @@ import pandas as pd
 
 from wa import Instrument, Parameter, Executable
 from wa.framework import signal
+from wa.framework.clocksync import get_clock_sync
 from wa.framework.exception import ConfigError, InstrumentError
 from wa.utils.trace_cmd import TraceCmdParser
 from wa.utils.types import list_or_string
@@ -54,6 +55,13 @@ class FilePoller(Instrument):
                   and use it's timestamp to adjust the timestamps in the collected
                   csv so that they align with ftrace.
                   """),
+        Parameter('align_with_host', kind=bool, default=False,
+                  description="""
+                  Add a ``host_time`` column to the collected csv, containing
+                  the time of each sample according to the host's clock. This
+                  requires ``uptime`` to be included in the ``clock_sync``
+                  run configuration.
+                  """),
         Parameter('as_root', kind=bool, default=False,
                   description="""
                   Whether or not the poller will be run as root. This should be
@@ -91,6 +99,8 @@ class FilePoller(Instrument):
         if self.align_with_ftrace:
             marker_option = '-m'
             signal.connect(self._adjust_timestamps, signal.AFTER_JOB_OUTPUT_PROCESSED)
+        if self.align_with_host and 'uptime' not in (context.cm.run_config.clock_sync or []):
+            self.logger.warning('"uptime" is not in clock_sync; host times will not be added')
         self.command = '{} -t {} {} -l {} {} > {} 2>{}'.format(target_poller,
                                                                self.sample_interval * 1000,
                                                                marker_option,
@@ -104,14 +114,17 @@ class FilePoller(Instrument):
 
     def stop(self, context):
         self.target.killall('poller', signal='TERM', as_root=self.as_root)
+        context.request_pull(self.target_output_path,
+                             os.path.join(context.output_directory, 'poller.csv'))
+        context.request_pull(self.target_log_path,
+                             os.path.join(context.output_directory, 'poller.log'))
 
     def update_output(self, context):
         host_output_file = os.path.join(context.output_directory, 'poller.csv')
-        self.target.pull(self.target_output_path, host_output_file)
-        context.add_artifact('poller-output', host_output_file, kind='data')
-
         host_log_file = os.path.join(context.output_directory, 'poller.log')
-        self.target.pull(self.target_log_path, host_log_file)
+        if not os.path.isfile(host_output_file):
+            raise InstrumentError('Poller output was not pulled from the target')
+        context.add_artifact('poller-output', host_output_file, kind='data')
         context.add_artifact('poller-log', host_log_file, kind='log')
 
         with open(host_log_file) as fh:
@@ -121,6 +134,9 @@ class FilePoller(Instrument):
                 if 'WARNING' in line:
                     self.logger.warning(line.strip())
 
+        if self.align_with_host:
+            self._add_host_times(context, host_output_file)
+
     def teardown(self, context):
         self.target.remove(self.target_output_path)
         self.target.remove(self.target_log_path)
@@ -140,6 +156,16 @@ class FilePoller(Instrument):
             labels.append('-'.join(label_parts))
         return labels
 
+    def _add_host_times(self, context, output_file):
+        # The poller's timestamps are from CLOCK_BOOTTIME, as is uptime.
+        sync = get_clock_sync(context, 'uptime')
+        if sync is None:
+            self.logger.debug('No uptime clock sync recorded; not adding host times')
+            return
+        df = pd.read_csv(output_file)
+        df['host_time'] = sync.to_host(df.time)
+        df.to_csv(output_file, index=False)
+
     def _adjust_timestamps(self, context):
         output_file = context.get_artifact_path('poller-output')
         message = 'Adjusting timestamps inside "{}" to align with ftrace'
@@ -36,6 +36,8 @@ TIMEOUT = 180
 class TraceCmdInstrument(Instrument):
 
     name = 'trace-cmd'
+
+    concurrent = True
     description = """
     trace-cmd is an instrument which interacts with ftrace Linux kernel internal
     tracer
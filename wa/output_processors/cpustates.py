@@ -18,7 +18,7 @@ from collections import OrderedDict
 
 from devlib.utils.csvutil import csvwriter
 
-from wa import OutputProcessor, Parameter
+from wa import OutputProcessor, Parameter, hostside
 from wa.utils.types import list_of_strings
 from wa.utils.cpustates import report_power_stats
 
@@ -47,6 +47,9 @@ class CpuStatesProcessor(OutputProcessor):
 
     name = 'cpustates'
 
+    concurrent = True
+    reads_results = False
+
     description = _get_cpustates_description()
 
     parameters = [
@@ -90,6 +93,7 @@ class CpuStatesProcessor(OutputProcessor):
     def initialize(self):
         self.iteration_reports = OrderedDict()
 
+    @hostside
     def process_job_output(self, output, target_info, run_output):
         trace_file = output.get_artifact_path('trace-cmd-txt')
         if not trace_file:
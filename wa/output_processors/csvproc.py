@@ -2,7 +2,7 @@ import sys
 
 from devlib.utils.csvutil import csvwriter
 
-from wa import OutputProcessor, Parameter
+from wa import OutputProcessor, Parameter, hostside
 from wa.framework.exception import ConfigError
 from wa.utils.types import list_of_strings
 
@@ -10,6 +10,9 @@ from wa.utils.types import list_of_strings
 class CsvReportProcessor(OutputProcessor):
 
     name = 'csv'
+
+    concurrent = True
+
     description = """
     Creates a ``results.csv`` in the output directory containing results for
     all iterations in CSV format, each line containing a single metric.
@@ -47,6 +50,7 @@ class CsvReportProcessor(OutputProcessor):
         self.outputs_so_far = []  # pylint: disable=attribute-defined-outside-init
         self.artifact_added = False
 
+    @hostside
     def process_job_output(self, output, target_info, run_output):
         self.outputs_so_far.append(output)
         self._write_outputs(self.outputs_so_far, run_output)
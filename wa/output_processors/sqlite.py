@@ -21,7 +21,7 @@ import uuid
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 
-from wa import OutputProcessor, Parameter, OutputProcessorError
+from wa import OutputProcessor, Parameter, OutputProcessorError, hostside
 from wa.utils.serializer import json
 from wa.utils.types import boolean
 
@@ -75,6 +75,9 @@ sqlite3.register_adapter(uuid.UUID, str)
 class SqliteResultProcessor(OutputProcessor):
 
     name = 'sqlite'
+
+    concurrent = True
+
     description = """
     Stores results in an sqlite database.
 
@@ -114,6 +117,7 @@ class SqliteResultProcessor(OutputProcessor):
         self._spec_oid = None
         self._run_initialized = False
 
+    @hostside
     def export_job_output(self, job_output, target_info, run_output):
         if not self._run_initialized:
             self._init_run(run_output)
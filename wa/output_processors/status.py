@@ -24,6 +24,10 @@ from wa.utils.misc import write_table
 
 class StatusTxtReporter(OutputProcessor):
     name = 'status'
+
+    concurrent = True
+    reads_results = False
+
     description = """
     Outputs a txt file containing general status information about which runs
     failed and which were successful
@@ -1,5 +1,5 @@
 
-from wa import OutputProcessor
+from wa import OutputProcessor, hostside
 from wa.utils.android import LogcatParser
 
 
@@ -7,6 +7,9 @@ class UxperfProcessor(OutputProcessor):
 
     name = 'uxperf'
 
+    concurrent = True
+    reads_results = False
+
     description = '''
     Parse logcat for UX_PERF markers to produce performance metrics for
     workload actions using specified instrumentation.
@@ -15,12 +18,13 @@ class UxperfProcessor(OutputProcessor):
     a agenda file by setting ``markers_enabled`` for the workload to ``True``.
     '''
 
+    @hostside
     def process_job_output(self, output, target_info, job_output):
         logcat = output.get_artifact('logcat')
         if not logcat:
             return
 
-        parser = LogcatParser()
+        parser = LogcatParser(tags=['UX_PERF'])
         start_times = {}
 
         filepath = output.get_path(logcat.path)
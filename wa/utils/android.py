@@ -18,7 +18,7 @@ class LogcatEvent(object):
     def __init__(self, timestamp, pid, tid, level, tag, message):
         self.timestamp = timestamp
         self.pid = pid
-        self.tid = pid
+        self.tid = tid
         self.level = level
         self.tag = tag
         self.message = message
@@ -34,6 +34,26 @@ class LogcatEvent(object):
 
 
 class LogcatParser(object):
+    """
+    Parser for logcat output in the default ``threadtime`` format, e.g. ::
+
+        06-24 17:05:12.345  2462  2470 D TextView: 5:05
+
+    :param tags: If specified, only lines with one of these tags will be
+                 parsed; all other lines are discarded before being split
+                 into fields.
+    :param year: The year to use for timestamps (logcat does not include
+                 it). Defaults to the current year.
+
+    """
+
+    columns = ['timestamp', 'pid', 'tid', 'level', 'tag', 'message']
+
+    _level_lookup = {c: LogcatLogLevel.levels[i] for i, c in enumerate(log_level_map)}
+
+    def __init__(self, tags=None, year=None):
+        self.tags = set(tags) if tags else None
+        self.year = year or datetime.now().year
 
     def parse(self, filepath):
         with open(filepath) as fh:
@@ -42,25 +62,72 @@ class LogcatParser(object):
                 if event:
                     yield event
 
+    def parse_columns(self, filepath):
+        """
+        Parse the specified logcat file in one go, returning the result as a
+        dict mapping each of ``LogcatParser.columns`` onto a list of values
+        (one per parsed line).
+
+        """
+        data = {c: [] for c in self.columns}
+        appenders = [data[c].append for c in self.columns]
+        parse_fields = self._parse_fields
+        with open(filepath) as fh:
+            for line in fh:
+                fields = parse_fields(line)
+                if fields:
+                    for append, value in zip(appenders, fields):
+                        append(value)
+        return data
+
     def parse_line(self, line):
+        fields = self._parse_fields(line)
+        if fields:
+            return LogcatEvent(*fields)
+        return None
+
+    def _parse_fields(self, line):
         line = line.strip()
-        if not line or line.startswith('-') or ': ' not in line:
+        if not line or line[0] == '-' or ': ' not in line:
             return None
 
-        metadata, message = line.split(': ', 1)
+        # Cheap substring test to discard the vast majority of uninteresting
+        # lines before paying for splitting; the tag is checked properly below.
+        if self.tags and not any(t in line for t in self.tags):
+            return None
 
-        parts = metadata.split(None, 5)
+        metadata, message = line.split(': ', 1)
         try:
-            ts = ' '.join([parts.pop(0), parts.pop(0)])
-            timestamp = datetime.strptime(ts, '%m-%d %H:%M:%S.%f').replace(year=datetime.now().year)
-            pid = int(parts.pop(0))
-            tid = int(parts.pop(0))
-            level = LogcatLogLevel.levels[log_level_map.index(parts.pop(0))]
-            tag = (parts.pop(0) if parts else '').strip()
-        except Exception as e:
+            timestamp, rest = self._parse_timestamp(metadata)
+            pid, tid, level, tag = (rest.split(None, 3) + [''])[:4]
+            tag = tag.strip()
+            if self.tags and tag not in self.tags:
+                return None
+            pid = int(pid)
+            tid = int(tid)
+            level = self._level_lookup[level]
+        except Exception as e:  # pylint: disable=broad-except
             message = 'Invalid metadata for line:\n\t{}\n\tgot: "{}"'
             logger.warning(message.format(line, e))
             return None
 
-        return LogcatEvent(timestamp, pid, tid, level, tag, message)
-
+        return timestamp, pid, tid, level, tag, message
+
+    def _parse_timestamp(self, metadata):
+        # Fixed-width "MM-DD HH:MM:SS.fff[fff]", decoded by slicing rather
+        # than strptime(), which dominates parsing time on large logs.
+        if (metadata[2] != '-' or metadata[5] != ' ' or metadata[8] != ':'
+                or metadata[11] != ':' or metadata[14] != '.'):
+            raise ValueError('unexpected timestamp format')
+        end = metadata.find(' ', 15)
+        if end == -1:
+            end = len(metadata)
+        fraction = metadata[15:end]
+        if not fraction.isdigit():
+            raise ValueError('unexpected timestamp format')
+        timestamp = datetime(self.year,
+                             int(metadata[0:2]), int(metadata[3:5]),
+                             int(metadata[6:8]), int(metadata[9:11]),
+                             int(metadata[12:14]),
+                             int(fraction[:6].ljust(6, '0')))
+        return timestamp, metadata[end:]
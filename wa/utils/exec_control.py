@@ -57,7 +57,7 @@ def once_per_instance(method):
     def wrapper(*args, **kwargs):
         if __active_environment is None:
             activate_environment('default')
-        func_id = repr(method.__hash__()) + repr(args[0].__hash__())
+        func_id = (repr(method.__hash__()), repr(args[0].__hash__()))
         if func_id in __environments[__active_environment]:
             return
         else:
@@ -66,6 +66,18 @@ def once_per_instance(method):
 
     return wrapper
 
+def forget_instance(instance):
+    """
+    Forget the ``once_per_instance`` methods that have been invoked on
+    ``instance`` in all environments. This should be done when ``instance``
+    is discarded, so that they will be invoked on a new instance that
+    happens to have the same hash.
+    """
+    instance_id = repr(instance.__hash__())
+    for name, func_ids in __environments.items():
+        __environments[name] = [f for f in func_ids
+                                if not (isinstance(f, tuple) and f[1] == instance_id)]
+
 def once_per_class(method):
     """
     The specified method will be invoked only once for all instances
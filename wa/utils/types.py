@@ -206,6 +206,29 @@ def regex(value):
         return re.compile(value)
 
 
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+DURATION_REGEX = re.compile(r'(\d+(?:\.\d*)?)\s*([smhd])', re.I)
+
+
+def duration(value):
+    """
+    A duration in seconds. This may be specified as a number of seconds, or
+    as a string with units, such as ``"90s"``, ``"1h30m"`` or ``"4h"``.
+
+    """
+    if isinstance(value, numbers.Number):
+        return float(value)
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if not value or DURATION_REGEX.sub('', value).strip():
+        raise ValueError('Invalid duration: "{}"'.format(value))
+    return float(sum(float(n) * DURATION_UNITS[u.lower()]
+                     for n, u in DURATION_REGEX.findall(value)))
+
+
 __counters = defaultdict(int)
 
 